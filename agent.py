@@ -1,51 +1,33 @@
-from typing import Dict, Any, List, TypedDict, Annotated
+from typing import Dict, Any, AsyncIterator, Iterator, List, TypedDict, Annotated
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from langchain_ollama import ChatOllama
+from langchain_core.runnables import RunnableLambda
 from langchain_core.tools import tool
 from datetime import datetime, timedelta
+import json
 import re
-import dateparser
-from vectorStore import QdrantVector
+from vectorStore import get_vector_store
+from extractors import extract_fields_fast, extraction_stats, has_booking_details
+from session_store import Session, SessionStore, create_session_store
+from metrics import stage, timed
 import operator
+import threading
 
 class ChatState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
     context: Dict[str, Any]
 
-class SessionStore:
-    def __init__(self):
-        self.data = {
-            "booking": {"name": None, "email": None, "phone": None, "date": None},
-            "booking_active": False,
-            "history": []
-        }
-    
-    def update_booking(self, field: str, value: str):
-        self.data["booking"][field] = value
-        print(f"Saved: {field} = {value}")
-    
-    def is_booking_complete(self) -> bool:
-        return all(self.data["booking"].values())
-    
-    def get_next_field(self) -> str:
-        for field in ["name", "email", "phone", "date"]:
-            if not self.data["booking"][field]:
-                return field
-        return None
-
-session = SessionStore()
-
 @tool
 def search_documents(query: str) -> str:
     """Search documents for relevant information."""
     try:
-        vector_store = QdrantVector(
+        vector_store = get_vector_store(
             qdrant_url="http://localhost:6333",
             collection_name="metacloud",
             embedding_model="llama3.2:3b"
         )
-        if not vector_store.connect_client():
+        if vector_store.client is None:
             return "Error: Could not connect to document database"
         results = vector_store.find_similar_texts(query, k=3)
         if not results:
@@ -54,45 +36,82 @@ def search_documents(query: str) -> str:
     except Exception as e:
         return f"Error: {str(e)}"
 
-@tool
-def extract_info(message: str, field_type: str) -> str:
-    """Extract specific information from user message using LLM."""
-    llm = ChatOllama(model="llama3.2:3b", temperature=0.1)
-    
-    prompts = {
-        "name": f"""Extract the person's full name from this message: "{message}"
-        Return ONLY the extracted name or "NOT_FOUND".""",
-        
-        "email": f"""Extract the email address from this message: "{message}"
-        Return ONLY the email or "NOT_FOUND".""",
-        
-        "phone": f"""Extract the phone number from this message: "{message}"
-        Return ONLY the phone number or "NOT_FOUND".""",
-        
-        "date": f"""Extract any date/time reference from this message: "{message}"
-        Return EXACT date/time phrase or "NOT_FOUND"."""
+async def asearch_documents(query: str) -> str:
+    """Async search_documents, for the async graph path."""
+    try:
+        vector_store = get_vector_store(
+            qdrant_url="http://localhost:6333",
+            collection_name="metacloud",
+            embedding_model="llama3.2:3b"
+        )
+        if vector_store.aclient is None:
+            return "Error: Could not connect to document database"
+        results = await vector_store.afind_similar_texts(query, k=3)
+        if not results:
+            return "No relevant information found."
+        return "\n\n".join([doc.page_content for doc in results])
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+_extraction_llm = None
+_extraction_llm_lock = threading.Lock()
+
+def _get_extraction_llm() -> ChatOllama:
+    # One client for all extraction calls instead of a new one per message
+    global _extraction_llm
+    if _extraction_llm is None:
+        with _extraction_llm_lock:
+            if _extraction_llm is None:
+                _extraction_llm = ChatOllama(model="llama3.2:3b", temperature=0.1)
+    return _extraction_llm
+
+_FIELD_HINTS = {
+    "name": "the person's full name",
+    "email": "the email address",
+    "phone": "the phone number",
+    "date": "the date/time phrase for the appointment, copied exactly",
+}
+
+def extract_booking_fields(message: str, fields: List[str]) -> Dict[str, str]:
+    """Pull several booking fields out of one message with a single JSON-constrained LLM call.
+
+    Returns {field: value} for the fields the model found; missing fields are left out.
+    """
+    schema = {
+        "type": "object",
+        "properties": {field: {"type": ["string", "null"]} for field in fields},
+        "required": list(fields),
     }
-    
-    response = llm.invoke([HumanMessage(content=prompts[field_type])])
-    result = response.content.strip()
-    
-    if field_type == "email":
-        match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', result)
-        result = match.group(0) if match else None
-    elif field_type == "phone":
-        match = re.search(r'[\+\d\-\(\)\s]{10,20}', result)
-        result = match.group(0) if match else None
-    elif result == "NOT_FOUND":
-        result = None
-    
-    return result.strip() if result else None
+    wanted = "\n".join(f'- "{field}": {_FIELD_HINTS[field]}' for field in fields)
+    prompt = f"""Extract these fields from the message below:
+    {wanted}
+    Use null for anything the message does not contain. Do not guess.
+
+    Message: "{message}"
+    """
+    extraction_stats.record_llm_call()
+    # format constrains Ollama's output to the schema, so the reply always parses
+    response = _get_extraction_llm().invoke([HumanMessage(content=prompt)], format=schema)
+    try:
+        data = json.loads(response.content)
+    except (TypeError, ValueError):
+        print(f"Could not parse extraction output: {response.content!r}")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return {f: str(data[f]).strip() for f in fields if data.get(f) and str(data[f]).strip().upper() != "NOT_FOUND"}
 
 @tool
 def parse_date(date_text: str) -> str:
     """Convert natural language date to YYYY-MM-DD format using dateparser."""
     if not date_text:
         return None
-    parsed = dateparser.parse(date_text)
+    # Imported here: loading dateparser's language data takes a noticeable part of startup
+    import dateparser
+    parsed = dateparser.parse(date_text, settings={"PREFER_DATES_FROM": "future"})
+    if parsed is None and date_text.strip().lower().startswith("next "):
+        # dateparser reads "friday" as the coming Friday but not "next friday"
+        parsed = dateparser.parse(date_text.strip()[5:], settings={"PREFER_DATES_FROM": "future"})
     if parsed:
         return parsed.strftime('%Y-%m-%d')
     return None
@@ -119,18 +138,31 @@ def validate_input(field: str, value: str) -> str:
     
     return "valid"
 
+# Used when a caller doesn't pass a session_id, e.g. the command-line loop below
+DEFAULT_SESSION = "default"
+
 class ChatBot:
-    def __init__(self):
+    def __init__(self, session_store: SessionStore | None = None):
         self.llm = ChatOllama(model="llama3.2:3b", temperature=0.1)
+        # Each session_id gets its own booking state and bounded history
+        self.sessions = session_store if session_store is not None else create_session_store()
         self.graph = self._create_graph()
     
     def _create_graph(self) -> StateGraph:
         workflow = StateGraph(ChatState)
         
-        workflow.add_node("router", self._router)
-        workflow.add_node("document_handler", self._handle_documents)
-        workflow.add_node("booking_handler", self._handle_booking)
-        workflow.add_node("general_handler", self._handle_general)
+        # Every node is timed as a "chat" stage named after it
+        workflow.add_node("router", timed("chat", "router")(self._router))
+        # Model-calling nodes get a native async variant for ainvoke/astream
+        workflow.add_node("document_handler", RunnableLambda(
+            timed("chat", "document_handler")(self._handle_documents),
+            afunc=timed("chat", "document_handler")(self._ahandle_documents),
+        ))
+        workflow.add_node("booking_handler", timed("chat", "booking_handler")(self._handle_booking))
+        workflow.add_node("general_handler", RunnableLambda(
+            timed("chat", "general_handler")(self._handle_general),
+            afunc=timed("chat", "general_handler")(self._ahandle_general),
+        ))
         
         workflow.set_entry_point("router")
         
@@ -152,6 +184,7 @@ class ChatBot:
     
     def _router(self, state: ChatState) -> ChatState:
         message = state["messages"][-1].content.lower()
+        session = state["context"]["session"]
         if session.data["booking_active"] or any(word in message for word in ["book", "appointment", "schedule"]):
             state["context"]["intent"] = "booking"
         elif any(word in message for word in ["document", "information", "about", "what", "how"]):
@@ -167,47 +200,37 @@ class ChatBot:
         query = state["messages"][-1].content
         doc_results = search_documents.invoke({"query": query})
         if "Error" in doc_results:
-            response = "Sorry, I couldn't access the documents right now."
-        else:
-            prompt = f"Based on this information: {doc_results}\nAnswer: {query}"
-            ai_response = self.llm.invoke([HumanMessage(content=prompt)])
-            response = ai_response.content
-        state["messages"].append(AIMessage(content=response))
-        return state
+            state["messages"].append(AIMessage(content="Sorry, I couldn't access the documents right now."))
+            return state
+        return self._generate(state, f"Based on this information: {doc_results}\nAnswer: {query}")
+
+    async def _ahandle_documents(self, state: ChatState) -> ChatState:
+        query = state["messages"][-1].content
+        doc_results = await asearch_documents(query)
+        if "Error" in doc_results:
+            state["messages"].append(AIMessage(content="Sorry, I couldn't access the documents right now."))
+            return state
+        return await self._agenerate(state, f"Based on this information: {doc_results}\nAnswer: {query}")
     
     def _handle_booking(self, state: ChatState) -> ChatState:
         message = state["messages"][-1].content
+        session = state["context"]["session"]
         if not session.data["booking_active"]:
             session.data["booking_active"] = True
-            response = "I'll help you book an appointment. Let's start with your full name."
+            # The opening message may already carry some or all of the details
+            saved, invalid = self._collect_booking_fields(session, message, opening=True)
+            if saved or invalid:
+                response = self._booking_progress(session, invalid)
+            else:
+                response = "I'll help you book an appointment. Let's start with your full name."
         else:
             next_field = session.get_next_field()
             if next_field:
-                # Special handling for date: try parsing the user's full message as date
-                if next_field == "date":
-                    extracted = parse_date(message)  # directly parse message
-                else:
-                    extracted = extract_info.invoke({"message": message, "field_type": next_field})
-                
-                if extracted:
-                    validation = validate_input(next_field, extracted)
-                    if validation == "valid":
-                        session.update_booking(next_field, extracted)
-                        if session.is_booking_complete():
-                            booking = session.data["booking"]
-                            response = (f"Booking Complete!\nName: {booking['name']}\nEmail: {booking['email']}"
-                                        f"\nPhone: {booking['phone']}\nDate: {booking['date']}\nYour appointment is confirmed!")
-                            session.data["booking_active"] = False
-                        else:
-                            next_field = session.get_next_field()
-                            prompts = {
-                                "email": "Great! Now I need your email address.",
-                                "phone": "Perfect! What's your phone number?",
-                                "date": "Excellent! When would you like your appointment? (e.g., 'tomorrow', 'next Monday')"
-                            }
-                            response = prompts.get(next_field, f"Now I need your {next_field}.")
-                    else:
-                        response = f"{validation}. Please provide a valid {next_field}."
+                saved, invalid = self._collect_booking_fields(session, message)
+                if next_field in invalid:
+                    response = f"{invalid[next_field]}. Please provide a valid {next_field}."
+                elif next_field in saved:
+                    response = self._booking_progress(session, invalid)
                 else:
                     field_prompts = {
                         "name": "I need your full name to proceed.",
@@ -220,29 +243,189 @@ class ChatBot:
                 response = "Your booking information is already complete!"
         state["messages"].append(AIMessage(content=response))
         return state
+
+    def _collect_booking_fields(self, session: Session, message: str, opening: bool = False):
+        """Extract, validate and save every missing booking field found in message.
+
+        Deterministic extractors run first. One structured LLM call then covers all fields
+        still missing, but only when the field being asked for wasn't found (or, for the
+        opening message, when it looks like it carries details). Returns (saved, invalid),
+        both keyed by field; invalid maps to the validation message.
+        """
+        missing = [field for field, value in session.data["booking"].items() if not value]
+        if not missing:
+            return {}, {}
+        values = extract_fields_fast(message, missing)
+        if missing[0] == "date" and "date" not in values:
+            # A reply to the date question is usually just the date phrase
+            values.update({"date": message} if parse_date.invoke({"date_text": message}) else {})
+        for field in values:
+            extraction_stats.record(field, "fast")
+
+        remaining = [field for field in missing if field not in values]
+        wanted = has_booking_details(message) if opening else missing[0] not in values
+        if remaining and wanted:
+            found = extract_booking_fields(message, remaining)
+            for field in remaining:
+                extraction_stats.record(field, "llm" if field in found else "missed")
+            values.update(found)
+
+        saved, invalid = {}, {}
+        for field, value in values.items():
+            if field == "date":
+                value = parse_date.invoke({"date_text": value})
+            validation = validate_input(field, value)
+            if validation == "valid":
+                session.update_booking(field, value)
+                saved[field] = value
+            else:
+                invalid[field] = validation
+        return saved, invalid
+
+    def _booking_progress(self, session: Session, invalid: Dict[str, str]) -> str:
+        """Confirm a complete booking, or ask for the next missing field."""
+        if session.is_booking_complete():
+            booking = session.data["booking"]
+            session.data["booking_active"] = False
+            return (f"Booking Complete!\nName: {booking['name']}\nEmail: {booking['email']}"
+                    f"\nPhone: {booking['phone']}\nDate: {booking['date']}\nYour appointment is confirmed!")
+        next_field = session.get_next_field()
+        if next_field in invalid:
+            return f"{invalid[next_field]}. Please provide a valid {next_field}."
+        prompts = {
+            "name": "Thanks! What's your full name?",
+            "email": "Great! Now I need your email address.",
+            "phone": "Perfect! What's your phone number?",
+            "date": "Excellent! When would you like your appointment? (e.g., 'tomorrow', 'next Monday')"
+        }
+        return prompts.get(next_field, f"Now I need your {next_field}.")
     
-    def _handle_general(self, state: ChatState) -> ChatState:
-        message = state["messages"][-1].content
-        prompt = f"""You are a helpful assistant. You can help with:
+    def _general_prompt(self, message: str) -> str:
+        return f"""You are a helpful assistant. You can help with:
                     1. Answering questions about documents
                     2. Booking appointments
 
                     User message: {message}
 
                     Respond helpfully and guide them to available services if appropriate."""
+
+    def _handle_general(self, state: ChatState) -> ChatState:
+        return self._generate(state, self._general_prompt(state["messages"][-1].content))
+
+    async def _ahandle_general(self, state: ChatState) -> ChatState:
+        return await self._agenerate(state, self._general_prompt(state["messages"][-1].content))
+
+    def _generate(self, state: ChatState, prompt: str) -> ChatState:
+        # A streaming caller generates the reply itself, after the graph has run
+        if state["context"].get("stream"):
+            state["context"]["prompt"] = prompt
+            return state
         response = self.llm.invoke([HumanMessage(content=prompt)])
         state["messages"].append(AIMessage(content=response.content))
         return state
-    
-    def chat(self, message: str) -> str:
-        session.data["history"].append({"role": "user", "content": message})
-        state = ChatState(messages=[HumanMessage(content=message)], context={})
+
+    async def _agenerate(self, state: ChatState, prompt: str) -> ChatState:
+        if state["context"].get("stream"):
+            state["context"]["prompt"] = prompt
+            return state
+        response = await self.llm.ainvoke([HumanMessage(content=prompt)])
+        state["messages"].append(AIMessage(content=response.content))
+        return state
+
+    def warmup(self) -> bool:
+        """Pay one-off costs before the first booking: dateparser's first parse loads its language data
+        (seconds), and the chat model is loaded into the model server."""
+        try:
+            parse_date.invoke({"date_text": "next friday"})
+            self.llm.invoke("Hi", options={"num_predict": 1})
+            return True
+        except Exception as e:
+            print(f"Error occurred while warming up chatbot: {e}")
+            return False
+
+    def chat(self, message: str, session_id: str = DEFAULT_SESSION) -> str:
+        session = self.sessions.get(session_id)
+        session.add_message("user", message)
+        state = ChatState(messages=[HumanMessage(content=message)], context={"session": session})
         result = self.graph.invoke(state)
         ai_messages = [msg for msg in result["messages"] if isinstance(msg, AIMessage)]
         response = ai_messages[-1].content if ai_messages else "I didn't understand that."
-        session.data["history"].append({"role": "assistant", "content": response})
+        session.add_message("assistant", response)
+        self.sessions.save(session)
+        return response
+
+    def chat_stream(self, message: str, session_id: str = DEFAULT_SESSION) -> Iterator[str]:
+        """Like chat(), but returns the reply as a stream of tokens.
+
+        Routing, document search and booking steps run before this returns, so their errors
+        raise here and the first token is the first generated one. Booking replies are not
+        generated by the model, so they arrive as a single piece.
+        """
+        session = self.sessions.get(session_id)
+        session.add_message("user", message)
+        state = ChatState(messages=[HumanMessage(content=message)], context={"session": session, "stream": True})
+        result = self.graph.invoke(state)
+        prompt = result["context"].get("prompt")
+
+        def tokens():
+            if prompt is None:
+                response = self._final_reply(result)
+                yield response
+            else:
+                parts = []
+                with stage("chat", "generate"):
+                    for chunk in self.llm.stream([HumanMessage(content=prompt)]):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield chunk.content
+                response = "".join(parts)
+            session.add_message("assistant", response)
+            self.sessions.save(session)
+        return tokens()
+
+    async def achat(self, message: str, session_id: str = DEFAULT_SESSION) -> str:
+        """Async chat(): runs the graph with ainvoke so model and search calls don't block the event loop."""
+        session = self.sessions.get(session_id)
+        session.add_message("user", message)
+        state = ChatState(messages=[HumanMessage(content=message)], context={"session": session})
+        result = await self.graph.ainvoke(state)
+        response = self._final_reply(result)
+        session.add_message("assistant", response)
+        self.sessions.save(session)
         return response
 
+    async def achat_stream(self, message: str, session_id: str = DEFAULT_SESSION) -> AsyncIterator[str]:
+        """Async chat_stream(): awaits the graph, then returns the async token stream."""
+        session = self.sessions.get(session_id)
+        session.add_message("user", message)
+        state = ChatState(messages=[HumanMessage(content=message)], context={"session": session, "stream": True})
+        result = await self.graph.ainvoke(state)
+        prompt = result["context"].get("prompt")
+
+        async def tokens():
+            if prompt is None:
+                response = self._final_reply(result)
+                yield response
+            else:
+                parts = []
+                with stage("chat", "generate"):
+                    async for chunk in self.llm.astream([HumanMessage(content=prompt)]):
+                        if chunk.content:
+                            parts.append(chunk.content)
+                            yield chunk.content
+                response = "".join(parts)
+            session.add_message("assistant", response)
+            self.sessions.save(session)
+        return tokens()
+
+    def extraction_stats(self) -> dict:
+        """How often booking fields were extracted without a model call."""
+        return extraction_stats.stats()
+
+    def _final_reply(self, result) -> str:
+        ai_messages = [msg for msg in (result or {}).get("messages", []) if isinstance(msg, AIMessage)]
+        return ai_messages[-1].content if ai_messages else "I didn't understand that."
+
 if __name__ == "__main__":
     bot = ChatBot()
     print("Chatbot Ready! Ask about documents or book appointments.")
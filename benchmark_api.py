@@ -0,0 +1,265 @@
+"""Latency and throughput of every API route, offline.
+
+main.app is served in-process (httpx's ASGI transport, no sockets) with Ollama
+replaced by fixed-latency stand-ins: hashed bag-of-words embeddings and a chat model
+with canned replies. Vectors live in Qdrant's in-memory mode (or the NumPy index with
+--backend numpy). Every request carries a fresh question, so caches only help as much
+as they would on distinct traffic.
+
+Each route is driven at each --concurrency level, and p50/p95/p99 latency and
+requests/s are reported. Results are saved as JSON under .cache/benchmarks/, tagged
+with the git commit. --compare prints the change against an earlier run.
+
+    python benchmark_api.py
+    python benchmark_api.py --concurrency 1 8 32 --requests 300 --routes rag_ask search_dense
+    python benchmark_api.py --compare latest
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_support import FixedLatencyChatModel, HashingEmbeddings, percentiles
+
+RESULTS_DIR = Path(__file__).resolve().parent / ".cache" / "benchmarks"
+
+VOCABULARY = (
+    "alpha beta gamma delta vector index query model chunk page river mountain system network "
+    "learning data training embedding token language retrieval answer context budget cache "
+    "latency storage search document summary section figure table method result"
+).split()
+
+
+class Workload:
+    """Deterministic request payloads: every call returns a question not asked before."""
+
+    def __init__(self, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.uploads = 0
+
+    def words(self, n: int) -> str:
+        return " ".join(self.rng.choice(VOCABULARY, size=n))
+
+    def question(self) -> str:
+        return f"What does the document say about {self.words(5)}?"
+
+    def corpus(self, paragraphs: int = 200) -> str:
+        return "\n\n".join(
+            " ".join(f"{self.words(int(self.rng.integers(8, 25))).capitalize()}." for _ in range(4))
+            for _ in range(paragraphs)
+        )
+
+    def upload(self) -> tuple:
+        self.uploads += 1
+        return f"bench-upload-{self.uploads}.txt", self.corpus(paragraphs=3).encode(), "text/plain"
+
+
+# (name, method, path, payload builder). Uploads run last: their ingest jobs keep working in the background
+ROUTES = [
+    ("health", "GET", "/health", lambda w: {}),
+    ("root", "GET", "/", lambda w: {}),
+    ("search_dense", "POST", "/documents/search", lambda w: {"json": {"query": w.question(), "k": 3}}),
+    ("search_lexical", "POST", "/documents/search",
+     lambda w: {"json": {"query": w.question(), "k": 3, "mode": "lexical"}}),
+    ("search_hybrid", "POST", "/documents/search",
+     lambda w: {"json": {"query": w.question(), "k": 3, "mode": "hybrid"}}),
+    ("search_batch", "POST", "/documents/search/batch",
+     lambda w: {"json": {"queries": [w.question() for _ in range(8)], "k": 3}}),
+    ("rag_ask", "POST", "/rag/ask", lambda w: {"json": {"question": w.question(), "k": 3}}),
+    ("rag_ask_stream", "POST", "/rag/ask/stream", lambda w: {"json": {"question": w.question(), "k": 3}}),
+    ("rag_ask_batch", "POST", "/rag/ask/batch",
+     lambda w: {"json": {"questions": [w.question() for _ in range(8)], "k": 3, "concurrency": 4}}),
+    ("chat", "POST", "/chat", lambda w: {"json": {"message": w.question()}}),
+    ("chat_stream", "POST", "/chat/stream", lambda w: {"json": {"message": w.question()}}),
+    ("jobs", "GET", "/documents/jobs", lambda w: {}),
+    ("upload", "POST", "/documents/upload", lambda w: {"files": {"files": w.upload()}}),
+]
+
+
+def build_app(args, workload: Workload):
+    """Import main with its services wired to the offline stand-ins; returns the FastAPI app."""
+    # Read at import time by vectorStore, so every get_vector_store() call lands on the same backend
+    os.environ["VECTOR_BACKEND"] = args.backend
+    import agent
+    import main
+    import rag_app
+    import vectorStore
+
+    embeddings = HashingEmbeddings(dim=args.dim, latency=args.embed_latency)
+    llm = FixedLatencyChatModel(latency=args.llm_latency, token_latency=args.token_latency)
+
+    vector = vectorStore.get_vector_store()
+    vector.embedding.embedding = embeddings
+    vector.embedding.cache = None
+
+    corpus = Path("corpus.txt")
+    corpus.write_text(workload.corpus(args.paragraphs), encoding="utf-8")
+    rag = rag_app.RAGApp(file_path=str(corpus))
+    rag.llm = llm
+    if not rag.setup():
+        raise SystemExit("RAG setup failed")
+
+    bot = agent.ChatBot()
+    bot.llm = llm
+    agent._extraction_llm = llm
+
+    main._vector, main._rag, main._chatbot = vector, rag, bot
+    return main.app
+
+
+async def drive(client, method: str, path: str, build, workload: Workload, concurrency: int, requests: int) -> dict:
+    latencies, errors = [], 0
+    remaining = [requests]
+
+    async def worker():
+        nonlocal errors
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            kwargs = build(workload)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "seconds": seconds,
+        "rps": requests / seconds if seconds > 0 else 0.0,
+        "mean_ms": float(np.mean(latencies)) if latencies else 0.0,
+        **{f"{k}_ms": v for k, v in percentiles(latencies).items()},
+    }
+
+
+async def run(app, args, workload: Workload, out) -> dict:
+    """Drive each route at each concurrency level; progress rows go to out, past any redirected stdout."""
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name, method, path, build in ROUTES:
+            if args.routes and name not in args.routes:
+                continue
+            results[name] = {}
+            for concurrency in args.concurrency:
+                await drive(client, method, path, build, workload, concurrency, args.warmup)
+                stats = await drive(client, method, path, build, workload, concurrency, args.requests)
+                results[name][str(concurrency)] = stats
+                print(f"{name:<16}{concurrency:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                      f"{stats['p99_ms']:>10.1f}{stats['rps']:>10.1f}{stats['errors']:>8}", file=out)
+    await settle_jobs()
+    return results
+
+
+async def settle_jobs():
+    """Wait for queued ingestion jobs, so uploads do not leave work running past the benchmark."""
+    import main
+
+    while any(job.status in ("queued", "running") for job in main._jobs.list_jobs()):
+        await asyncio.sleep(0.1)
+
+
+def git_commit() -> str:
+    try:
+        cwd = Path(__file__).resolve().parent
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                               capture_output=True, text=True).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except Exception:
+        return "unknown"
+
+
+def previous_run(spec: str, current: Path) -> Path | None:
+    if spec != "latest":
+        return Path(spec)
+    runs = sorted(p for p in RESULTS_DIR.glob("api-*.json") if p != current)
+    return runs[-1] if runs else None
+
+
+def compare(current: dict, previous: dict):
+    print(f"\nvs {previous['commit']} ({previous['timestamp']}): change in p95 latency and req/s")
+    for name, levels in current["routes"].items():
+        for concurrency, stats in levels.items():
+            before = previous["routes"].get(name, {}).get(concurrency)
+            if not before:
+                continue
+            p95 = (stats["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+            rps = (stats["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+            print(f"{name:<16}{concurrency:>6}{p95:>+9.1f}%{rps:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", nargs="+", choices=[r[0] for r in ROUTES], help="Default: all")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per route and level")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--backend", choices=["memory", "numpy"], default="memory")
+    parser.add_argument("--embed-latency", type=float, default=0.005, help="Seconds per embedding call")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Seconds between tokens")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--paragraphs", type=int, default=200, help="Size of the generated corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", help="Earlier result file, or 'latest'")
+    parser.add_argument("--verbose", action="store_true", help="Show the app's own output")
+    args = parser.parse_args()
+
+    workload = Workload(args.seed)
+    root = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="api-bench-")
+    # The app's caches, manifest and indexes are relative to the working directory
+    os.chdir(workdir)
+    try:
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            app = build_app(args, workload)
+        table = sys.stdout
+        print(f"{'route':<16}{'conc':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}")
+        print("-" * 70)
+        with quiet:
+            routes = asyncio.run(run(app, args, workload, table))
+    finally:
+        os.chdir(root)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("compare", "verbose")},
+        "routes": routes,
+    }
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f"api-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{result['commit']}.json"
+    path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        before = previous_run(args.compare, path)
+        if before is None:
+            print("No earlier run to compare with.")
+        else:
+            compare(result, json.loads(before.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
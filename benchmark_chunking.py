@@ -0,0 +1,164 @@
+"""Compare chunking strategies on a local corpus.
+
+Each strategy ingests the corpus into a scratch NumPy-backed collection and is measured
+on chunk count, ingest throughput, index size, and dense retrieval latency and
+recall. Queries are sentences sampled from the corpus with some words dropped; a query
+is answered when a retrieved chunk contains its whole source sentence, so strategies
+that cut sentences apart score lower.
+
+Embeddings are feature-hashed bag-of-words by default, so no Ollama server is needed;
+pass --embedding-model to use a real model instead.
+
+    python benchmark_chunking.py docs/*.pdf notes.txt
+    python benchmark_chunking.py docs/ --strategies recursive sentence --k 1 3 5
+    python benchmark_chunking.py docs/ --embedding-model llama3.2:3b --queries 50
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmark_support import HashingEmbeddings, percentiles
+from chunkers import CHUNKERS
+from document_processor import read_file
+from embedding_cache import CachedEmbeddings
+from vectorStore import QdrantVector
+
+SUPPORTED = (".txt", ".pdf", ".docx")
+_SENTENCE = re.compile(r"[^.!?\n]+[.!?]")
+
+
+def corpus_files(paths: list) -> list:
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(str(p) for p in path.rglob("*") if p.suffix.lower() in SUPPORTED))
+        elif path.suffix.lower() in SUPPORTED:
+            files.append(str(path))
+    return files
+
+
+def sample_queries(files: list, count: int, seed: int = 0, keep: float = 0.7) -> list:
+    """(query, sentence) pairs: random corpus sentences of 8 to 40 words, each query keeping
+    a random `keep` share of its sentence's words in order."""
+    sentences = []
+    for file_path in files:
+        text = read_file(file_path) or ""
+        for match in _SENTENCE.finditer(text):
+            sentence = " ".join(match.group(0).split())
+            if 8 <= len(sentence.split()) <= 40:
+                sentences.append(sentence)
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(sentences), size=min(count, len(sentences)), replace=False) if sentences else []
+    queries = []
+    for i in picks:
+        words = sentences[i].split()
+        mask = rng.random(len(words)) < keep
+        queries.append((" ".join(w for w, m in zip(words, mask) if m) or sentences[i], sentences[i]))
+    return queries
+
+
+def index_bytes(index_path: str, chunks: int, dim: int) -> int:
+    """float32 vectors plus the payload store. The vector file itself is preallocated, so its size says little."""
+    payloads = sum(p.stat().st_size for p in Path(index_path).rglob("*.sqlite*") if p.is_file())
+    return chunks * dim * 4 + payloads
+
+
+def run_strategy(name: str, files: list, queries: list, k_values: list, embedding, model_name: str) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"chunking-{name}-")
+    try:
+        vector = QdrantVector(
+            collection_name=f"chunking-{name}",
+            embedding_model=model_name,
+            embedding_cache_path=None,
+            manifest_path=os.path.join(workdir, "manifest.json"),
+            backend="numpy",
+            index_path=os.path.join(workdir, "vectors"),
+            dedup_path=None,
+            chunker=name,
+        )
+        # No chunk or query caching: every strategy pays for its own embeddings
+        vector.embedding = CachedEmbeddings(embedding, None, model_name=model_name, queries=None)
+        vector.connect_client()
+
+        started = time.perf_counter()
+        indexed = vector.add_files(files, max_workers=1)
+        ingest_seconds = time.perf_counter() - started
+        chunks = sum(indexed.values())
+        texts = [point.payload["page_content"] for point in vector.client.scroll(
+            vector.collection_name, limit=chunks or 1, with_payload=True)[0]]
+
+        limit = max(k_values)
+        latencies, hits = [], {k: 0 for k in k_values}
+        for query, sentence in queries:
+            started = time.perf_counter()
+            docs = vector.find_similar_texts(query, k=limit) or []
+            latencies.append((time.perf_counter() - started) * 1000)
+            normalised = [" ".join(doc.page_content.split()) for doc in docs]
+            for k in k_values:
+                hits[k] += any(sentence in text for text in normalised[:k])
+
+        # Queries whose sentence survives whole in some chunk: the ceiling for recall
+        whole = [" ".join(text.split()) for text in texts]
+        answerable = sum(any(sentence in text for text in whole) for _, sentence in queries)
+        return {
+            "chunks": chunks,
+            "mean_chars": float(np.mean([len(t) for t in texts])) if texts else 0.0,
+            "ingest_seconds": ingest_seconds,
+            "chunks_per_sec": chunks / ingest_seconds if ingest_seconds > 0 else 0.0,
+            "index_bytes": index_bytes(os.path.join(workdir, "vectors"), chunks, vector._embedding_dim()),
+            "latency_ms": percentiles(latencies),
+            "answerable": answerable / len(queries) if queries else 0.0,
+            "recall": {k: hits[k] / len(queries) if queries else 0.0 for k in k_values},
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories of .txt/.pdf/.docx documents")
+    parser.add_argument("--strategies", nargs="+", choices=list(CHUNKERS), default=list(CHUNKERS))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--embedding-model", help="Ollama model to embed with instead of hashed bag-of-words")
+    parser.add_argument("--dim", type=int, default=512, help="Dimension of the hashed embeddings")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = corpus_files(args.paths)
+    if not files:
+        parser.error("no .txt, .pdf or .docx files found")
+    corpus_mb = sum(os.path.getsize(f) for f in files) / 2**20
+    queries = sample_queries(files, args.queries, seed=args.seed)
+    if args.embedding_model:
+        from langchain_ollama import OllamaEmbeddings
+        embedding, model_name = OllamaEmbeddings(model=args.embedding_model), args.embedding_model
+    else:
+        embedding, model_name = HashingEmbeddings(args.dim), f"hashing-{args.dim}"
+
+    results = {}
+    for name in args.strategies:
+        print(f"Ingesting with '{name}' chunker...")
+        results[name] = run_strategy(name, files, queries, args.k, embedding, model_name)
+
+    print(f"\n{len(files)} files ({corpus_mb:.1f} MiB), {len(queries)} queries, embeddings: {model_name}\n")
+    header = (f"{'chunker':<12}{'chunks':>8}{'chars':>8}{'chunks/s':>10}{'MiB/s':>8}{'index MiB':>11}"
+              f"{'p50 ms':>8}{'p95 ms':>8}{'whole':>7}" + "".join(f"{f'R@{k}':>7}" for k in args.k))
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        mib_per_sec = corpus_mb / r["ingest_seconds"] if r["ingest_seconds"] > 0 else 0.0
+        recalls = "".join(f"{r['recall'][k]:>7.3f}" for k in args.k)
+        print(f"{name:<12}{r['chunks']:>8}{r['mean_chars']:>8.0f}{r['chunks_per_sec']:>10.1f}{mib_per_sec:>8.2f}"
+              f"{r['index_bytes'] / 2**20:>11.2f}{r['latency_ms']['p50']:>8.2f}{r['latency_ms']['p95']:>8.2f}"
+              f"{r['answerable']:>7.3f}{recalls}")
+
+
+if __name__ == "__main__":
+    main()
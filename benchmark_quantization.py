@@ -0,0 +1,197 @@
+"""Memory use against recall@k for the collection storage options in QdrantVector.
+
+By default the quantizers are emulated with NumPy on synthetic clustered vectors, so
+no Qdrant server or Ollama model is needed. Pass --qdrant-url to measure real Qdrant
+collections instead, and --file to use embeddings of a real document.
+
+The "est. RAM" column is computed from the storage layout (see resident_bytes), not
+measured. Against a Qdrant server, a measured column is added: how much the server's
+resident memory grew while the collection was built, from its /telemetry endpoint.
+
+    python benchmark_quantization.py --dim 3072 --points 10000 --k 3 10
+    python benchmark_quantization.py --qdrant-url http://localhost:6333 --file NepaliBert.pdf
+"""
+import argparse
+import json
+import time
+import urllib.request
+from uuid import uuid4
+
+import numpy as np
+
+CONFIGS = [
+    # (name, quantization, on_disk_vectors)
+    ("float32", None, False),
+    ("float32 on disk", None, True),
+    ("scalar int8", "scalar", False),
+    ("scalar int8 + on-disk originals", "scalar", True),
+    ("binary", "binary", False),
+    ("binary + on-disk originals", "binary", True),
+]
+
+
+def synthetic_vectors(points: int, queries: int, dim: int, seed: int = 0):
+    """Clustered unit vectors, with queries drawn near stored points so neighbours are meaningful."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(points // 50, 1), dim))
+    data = centers[rng.integers(len(centers), size=points)] + 0.5 * rng.normal(size=(points, dim))
+    picks = data[rng.integers(points, size=queries)]
+    query = picks + 0.3 * rng.normal(size=(queries, dim))
+    return _unit(data), _unit(query)
+
+
+def embedded_vectors(file_path: str, model: str, queries: int, seed: int = 0):
+    from langchain_ollama import OllamaEmbeddings
+    from ingestion import parse_file
+
+    texts = parse_file(file_path)
+    embedder = OllamaEmbeddings(model=model)
+    data = _unit(np.asarray(embedder.embed_documents(texts), dtype=np.float32))
+    # Use chunk prefixes as stand-in questions
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(texts), size=min(queries, len(texts)))
+    query = _unit(np.asarray(embedder.embed_documents([texts[i][:200] for i in picks]), dtype=np.float32))
+    return data, query
+
+
+def resident_bytes(points: int, dim: int, quantization: str | None, on_disk: bool) -> int:
+    """Vector bytes kept in RAM: quantized codes (always_ram) plus float32 originals unless on disk."""
+    quantized = {None: 0, "scalar": dim, "binary": (dim + 7) // 8}[quantization]
+    originals = 0 if on_disk else dim * 4
+    return points * (quantized + originals)
+
+
+def qdrant_resident_bytes(url: str) -> int | None:
+    """The Qdrant server's resident memory as reported by /telemetry, or None if it does not report it."""
+    try:
+        with urllib.request.urlopen(f"{url.rstrip('/')}/telemetry?details_level=1", timeout=10) as response:
+            telemetry = json.load(response)
+        return int(telemetry["result"]["memory"]["resident_bytes"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def emulate_search(data, query, limit: int, quantization: str | None, oversampling: float, rescore: bool):
+    if quantization is None:
+        return np.argsort(-(query @ data.T), axis=1)[:, :limit]
+    if quantization == "scalar":
+        # Qdrant's int8 scalar quantization: clip to the 0.99 quantile range, then 256 levels
+        lo, hi = np.quantile(data, [0.005, 0.995])
+        scale = (hi - lo) / 255
+        codes = np.round((np.clip(data, lo, hi) - lo) / scale)
+        approx = query @ (codes * scale + lo).T
+    else:
+        # Binary quantization keeps only the sign of each dimension
+        approx = np.sign(query) @ np.sign(data).T
+    depth = max(limit, int(limit * oversampling)) if rescore else limit
+    candidates = np.argsort(-approx, axis=1)[:, :depth]
+    if not rescore:
+        return candidates
+    exact = np.einsum("qd,qcd->qc", query, data[candidates])
+    order = np.argsort(-exact, axis=1)[:, :limit]
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def qdrant_search(url: str, data, query, limit: int, quantization: str | None, on_disk: bool,
+                  oversampling: float, rescore: bool):
+    """Search a scratch collection built with QdrantVector's settings.
+
+    Returns (ids, query seconds, resident bytes the server gained for the collection, or None).
+    The growth is measured after indexing, so it is noisy: allocator caching and other
+    collections on the same server move it too.
+    """
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import CollectionStatus, Distance, PointStruct, VectorParams
+    from vectorStore import quantization_config, quantized_search_params
+
+    client = QdrantClient(url=url)
+    name = f"quantization-bench-{uuid4().hex[:8]}"
+    before = qdrant_resident_bytes(url)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=VectorParams(size=data.shape[1], distance=Distance.COSINE, on_disk=on_disk),
+        quantization_config=quantization_config(quantization),
+    )
+    try:
+        for start in range(0, len(data), 256):
+            batch = data[start:start + 256]
+            client.upsert(
+                collection_name=name,
+                points=[PointStruct(id=start + i, vector=v.tolist()) for i, v in enumerate(batch)],
+            )
+        while client.get_collection(name).status != CollectionStatus.GREEN:
+            time.sleep(0.5)
+        after = qdrant_resident_bytes(url)
+        grown = after - before if before is not None and after is not None else None
+        params = quantized_search_params(quantization, rescore, oversampling)
+        ids = []
+        started = time.perf_counter()
+        for q in query:
+            response = client.query_points(collection_name=name, query=q.tolist(), limit=limit, search_params=params)
+            ids.append([point.id for point in response.points])
+        return ids, time.perf_counter() - started, grown
+    finally:
+        client.delete_collection(name)
+
+
+def recall_at_k(found, truth, k: int) -> float:
+    return float(np.mean([len(set(f[:k]) & set(t[:k])) / k for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=3072, help="llama3.2:3b embeddings are 3072-dimensional")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 10])
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--no-rescore", action="store_true")
+    parser.add_argument("--qdrant-url", help="Measure real Qdrant collections instead of emulating")
+    parser.add_argument("--file", help="Embed this document with Ollama instead of using synthetic vectors")
+    parser.add_argument("--embedding-model", default="llama3.2:3b")
+    args = parser.parse_args()
+
+    if args.file:
+        data, query = embedded_vectors(args.file, args.embedding_model, args.queries)
+    else:
+        data, query = synthetic_vectors(args.points, args.queries, args.dim)
+    points, dim = data.shape
+    limit = max(args.k)
+    rescore = not args.no_rescore
+    truth = np.argsort(-(query @ data.T), axis=1)[:, :limit].tolist()
+
+    source = f"Qdrant at {args.qdrant_url}" if args.qdrant_url else "NumPy emulation"
+    print(f"{points} vectors x {dim} dims, {len(query)} queries, {source}, "
+          f"rescore={rescore}, oversampling={args.oversampling}\n")
+    measured = f"{'Qdrant MiB':>12}" if args.qdrant_url else ""
+    header = (f"{'storage':<34}{'est. RAM MiB':>13}{'vs f32':>8}{measured}"
+              + "".join(f"{f'recall@{k}':>11}" for k in args.k))
+    print(header + f"{'ms/query':>10}")
+    print("-" * (len(header) + 10))
+    baseline = resident_bytes(points, dim, None, False)
+    for name, quantization, on_disk in CONFIGS:
+        if on_disk and not args.qdrant_url and quantization is None:
+            continue  # Emulation has no disk tier, so this would only repeat the float32 row
+        if args.qdrant_url:
+            found, seconds, grown = qdrant_search(
+                args.qdrant_url, data, query, limit, quantization, on_disk, args.oversampling, rescore
+            )
+            measured = f"{grown / 2**20:>12.1f}" if grown is not None else f"{'n/a':>12}"
+        else:
+            started = time.perf_counter()
+            found = emulate_search(data, query, limit, quantization, args.oversampling, rescore).tolist()
+            seconds = time.perf_counter() - started
+        per_query = seconds * 1000 / len(query)
+        ram = resident_bytes(points, dim, quantization, on_disk)
+        recalls = "".join(f"{recall_at_k(found, truth, k):>11.3f}" for k in args.k)
+        print(f"{name:<34}{ram / 2**20:>13.1f}{ram / baseline:>8.2f}{measured}{recalls}{per_query:>10.2f}")
+
+
+def _unit(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Offline stand-ins and helpers shared by the benchmark scripts."""
+import asyncio
+import re
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings (feature-hashed words and word pairs), no model needed.
+
+    Texts that share words get similar vectors, so retrieval quality is meaningful enough
+    to compare chunking or storage settings without an Ollama server. latency, in
+    seconds, is slept once per call to stand in for the model server's round trip.
+    """
+
+    def __init__(self, dim: int = 512, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        words = _TOKEN.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+
+class FixedLatencyChatModel(BaseChatModel):
+    """Chat model that answers with canned text after a fixed delay, standing in for Ollama.
+
+    latency is the wait before the first token and token_latency the wait between tokens,
+    so a reply of n tokens takes latency + n * token_latency. Calls made with a JSON schema
+    (format=...) get an empty JSON object, which the booking extractor reads as "nothing found".
+    """
+
+    reply: str = "Based on the context, the document covers this topic in some detail."
+    latency: float = 0.05
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fixed-latency"
+
+    def _content(self, kwargs: dict) -> str:
+        return "{}" if kwargs.get("format") else self.reply
+
+    def _tokens(self, kwargs: dict) -> List[str]:
+        return re.findall(r"\S+\s*", self._content(kwargs))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency + self.token_latency * len(self._tokens(kwargs)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._content(kwargs)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency + self.token_latency * len(self._tokens(kwargs)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._content(kwargs)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(kwargs):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(kwargs):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+def percentiles(samples: List[float], points=(50, 95, 99)) -> dict:
+    """{"p50": ..., "p95": ...} of samples, or zeros when there are none."""
+    if not samples:
+        return {f"p{p}": 0.0 for p in points}
+    values = np.percentile(np.asarray(samples, dtype=np.float64), points)
+    return {f"p{p}": float(v) for p, v in zip(points, values)}
@@ -0,0 +1,126 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from context_packer import estimate_tokens
+from document_processor import iter_file, iter_split
+
+# Paragraphs first, then sentence ends, so chunks break between sentences wherever one fits
+SENTENCE_SEPARATORS = ["\n\n", "\n", r"(?<=[.!?])\s+", r"(?<=[;:])\s+", " ", ""]
+
+
+class Chunker(ABC):
+    """How a file is cut into chunks before embedding.
+
+    Chunkers hold only plain settings, so they pickle into ProcessPoolExecutor workers.
+    key identifies the strategy and its settings; chunks made with different keys are
+    stored under different point IDs.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def split(self, segments: Iterable[str]) -> Iterator[str]:
+        ...
+
+    def split_file(self, file_path: str) -> Iterator[str]:
+        return self.split(iter_file(file_path))
+
+    @property
+    def key(self) -> str:
+        settings = "-".join(str(v) for v in vars(self).values())
+        return f"{self.name}-{settings}" if settings else self.name
+
+    def __repr__(self) -> str:
+        settings = ", ".join(f"{k}={v!r}" for k, v in vars(self).items())
+        return f"{type(self).__name__}({settings})"
+
+
+class RecursiveChunker(Chunker):
+    """Fixed-size character chunks, split at the coarsest separator that fits (the original behaviour)."""
+
+    name = "recursive"
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 20):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split(self, segments: Iterable[str]) -> Iterator[str]:
+        return iter_split(segments, chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+
+
+class TokenChunker(Chunker):
+    """Chunks sized in tokens, estimated the same way as the prompt's context budget."""
+
+    name = "token"
+
+    def __init__(self, chunk_tokens: int = 256, overlap_tokens: int = 32):
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def split(self, segments: Iterable[str]) -> Iterator[str]:
+        return iter_split(
+            segments,
+            chunk_size=self.chunk_tokens,
+            chunk_overlap=self.overlap_tokens,
+            length_function=estimate_tokens,
+        )
+
+
+class SentenceChunker(Chunker):
+    """Chunks made of whole paragraphs or sentences; a sentence is only cut when it alone exceeds chunk_size.
+
+    The overlap is filled with whole trailing sentences of the previous chunk.
+    """
+
+    name = "sentence"
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 150):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split(self, segments: Iterable[str]) -> Iterator[str]:
+        return iter_split(
+            segments,
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            separators=SENTENCE_SEPARATORS,
+            is_separator_regex=True,
+        )
+
+
+class PageChunker(Chunker):
+    """Chunks that never span a PDF page, so each one can be traced to a single page.
+
+    Pages shorter than chunk_size become one chunk. Formats without pages are
+    split as by RecursiveChunker.
+    """
+
+    name = "page"
+
+    def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 100):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split(self, segments: Iterable[str]) -> Iterator[str]:
+        for page in segments:
+            yield from iter_split([page], chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+
+    def split_file(self, file_path: str) -> Iterator[str]:
+        if Path(file_path).suffix.lower() == ".pdf":
+            return self.split(iter_file(file_path))
+        return iter_split(iter_file(file_path), chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+
+
+CHUNKERS = {cls.name: cls for cls in (RecursiveChunker, TokenChunker, SentenceChunker, PageChunker)}
+DEFAULT_CHUNKER = "recursive"
+
+
+def get_chunker(chunker: str | Chunker | None = None, **options) -> Chunker:
+    """Resolve a chunker name (with constructor options) or instance; None gives the default."""
+    if isinstance(chunker, Chunker):
+        return chunker
+    name = chunker or DEFAULT_CHUNKER
+    if name not in CHUNKERS:
+        raise ValueError(f"Unknown chunker '{name}', expected one of {tuple(CHUNKERS)}")
+    return CHUNKERS[name](**options)
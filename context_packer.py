@@ -0,0 +1,110 @@
+import math
+from typing import List
+
+from langchain_core.documents import Document
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer: ~4 characters per token for English text."""
+    return math.ceil(len(text) / 4)
+
+
+def _overlap(left: str, right: str, min_chars: int) -> int:
+    """Length of the longest suffix of left that is also a prefix of right (0 if under min_chars).
+
+    Only whole words count: the shared span must start a word in left and end one in right.
+    """
+    limit = min(len(left), len(right))
+    if limit < min_chars:
+        return 0
+    probe = right[:min_chars]
+    start = left.find(probe, len(left) - limit)
+    while start != -1:
+        size = len(left) - start
+        if (right.startswith(left[start:]) and (start == 0 or left[start - 1].isspace())
+                and (size == len(right) or right[size].isspace())):
+            return size
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _neighbours(a: Document, b: Document) -> bool:
+    """Whether two chunks may share a splitter overlap: same source and, when known, adjacent positions."""
+    if a.metadata.get("source") != b.metadata.get("source"):
+        return False
+    i, j = a.metadata.get("chunk"), b.metadata.get("chunk")
+    return not (isinstance(i, int) and isinstance(j, int)) or abs(i - j) == 1
+
+
+class ContextPacker:
+    """Fits retrieved chunks into a token budget for the prompt.
+
+    Duplicate chunks are dropped and the overlap between neighbouring chunks of a source
+    (the splitter's chunk_overlap, down to a single word) is cut, so no span is paid for twice. Chunks are
+    admitted in retrieval order until the budget is spent; the last one is cut at a
+    word boundary if at least min_tail_tokens of budget remain. The best chunk is always
+    kept, cut to the budget if it alone exceeds it. Admitted chunks are then
+    put back in document order (by source and chunk index) so adjacent text reads on.
+    """
+
+    def __init__(self, max_tokens: int = 2000, min_overlap_chars: int = 4, min_tail_tokens: int = 64):
+        self.max_tokens = max_tokens
+        self.min_overlap_chars = min_overlap_chars
+        self.min_tail_tokens = min_tail_tokens
+
+    def pack(self, docs: List[Document]) -> List[Document]:
+        kept: List[Document] = []
+        used = 0
+        for doc in docs:
+            text = self._dedupe(doc, kept)
+            if not text:
+                continue
+            tokens = estimate_tokens(text)
+            if used + tokens > self.max_tokens:
+                remaining = self.max_tokens - used
+                # The best chunk is cut to fit rather than leaving the prompt without context
+                if remaining >= self.min_tail_tokens or not kept:
+                    kept.append(Document(page_content=self._truncate(text, remaining), metadata=doc.metadata))
+                break
+            kept.append(Document(page_content=text, metadata=doc.metadata))
+            used += tokens
+        return sorted(kept, key=self._document_order(kept))
+
+    def _dedupe(self, doc: Document, kept: List[Document]) -> str:
+        text = doc.page_content.strip()
+        for other in kept:
+            existing = other.page_content
+            if text in existing:
+                return ""
+            if not _neighbours(doc, other):
+                continue
+            # Neighbouring chunks share the splitter's overlap at their boundary
+            cut = _overlap(existing, text, self.min_overlap_chars)
+            if cut:
+                text = text[cut:].lstrip()
+            cut = _overlap(text, existing, self.min_overlap_chars)
+            if cut:
+                text = text[:-cut].rstrip()
+            if not text:
+                return ""
+        return text
+
+    def _truncate(self, text: str, tokens: int) -> str:
+        # Room for the " …" marker, so the result stays within tokens
+        limit = max(1, tokens * 4 - 2)
+        cut = text.rfind(" ", 0, limit)
+        return text[: cut if cut > 0 else limit].rstrip() + " …"
+
+    def _document_order(self, kept: List[Document]):
+        rank = {id(doc): i for i, doc in enumerate(kept)}
+        source_rank: dict = {}
+        for doc in kept:
+            source_rank.setdefault(doc.metadata.get("source"), len(source_rank))
+
+        def key(doc: Document):
+            chunk = doc.metadata.get("chunk")
+            # Sources appear in order of their best chunk; chunks ingested before their
+            # position was recorded keep their retrieval rank
+            return (source_rank[doc.metadata.get("source")], chunk if isinstance(chunk, int) else math.inf,
+                    rank[id(doc)])
+        return key
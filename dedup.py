@@ -0,0 +1,243 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Word n-grams of the normalised text; texts shorter than size give one shingle."""
+    tokens = _TOKEN.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures with multiply-shift hashing, vectorised over shingles and permutations."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Odd multipliers keep every permutation a bijection on 64-bit words
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray | None:
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return None
+        hashes = np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index of ingested chunks, one namespace per collection.
+
+    Signatures are split into bands; chunks sharing any band bucket are candidates, and a
+    candidate is a near-duplicate when the estimated Jaccard similarity of their word
+    shingles reaches threshold. Skipped chunks are recorded, with their text, against the
+    chunk they duplicate: their point ID still resolves to stored content, and if that
+    chunk is removed they are handed back to be ingested in its place.
+
+    Chunks kept by filter() under a run ID are pending until confirm() reports them stored;
+    discard() then drops whatever the run never confirmed, e.g. after the embedder failed.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/minhash.sqlite",
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 32,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm=num_perm)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                collection TEXT NOT NULL, point_id TEXT NOT NULL, sig BLOB NOT NULL,
+                PRIMARY KEY (collection, point_id));
+            CREATE TABLE IF NOT EXISTS buckets (
+                collection TEXT NOT NULL, band INTEGER NOT NULL, bucket INTEGER NOT NULL, point_id TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (collection, band, bucket);
+            CREATE INDEX IF NOT EXISTS buckets_point ON buckets (collection, point_id);
+            CREATE TABLE IF NOT EXISTS duplicates (
+                collection TEXT NOT NULL, point_id TEXT NOT NULL, duplicate_of TEXT NOT NULL,
+                text TEXT NOT NULL, metadata TEXT, PRIMARY KEY (collection, point_id));
+            CREATE INDEX IF NOT EXISTS duplicates_of ON duplicates (collection, duplicate_of);
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(signatures)")]
+        if "pending" not in columns:
+            # Run ID of an ingest whose point is not stored yet; NULL once confirmed
+            self._conn.execute("ALTER TABLE signatures ADD COLUMN pending TEXT")
+        self._conn.commit()
+
+    def filter(
+        self,
+        collection: str,
+        chunks: Iterable[Tuple[str, str, dict]],
+        ignore: set | None = None,
+        stats: dict | None = None,
+        run: str | None = None,
+    ) -> Iterator[Tuple[str, str, dict]]:
+        """Yield only the chunks that are not near-duplicates of one already indexed.
+
+        Kept chunks are indexed as they pass, so copies within the same stream are caught too.
+        With a run ID they stay pending until confirm(), and only count as originals within
+        that run. ignore holds point IDs that must not count as originals, e.g. the chunks of
+        the previous version of the file being re-ingested. stats, if given, gets "kept" and
+        "skipped" counts.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("kept", 0)
+        stats.setdefault("skipped", 0)
+        ignore = {str(pid) for pid in ignore or ()}
+        try:
+            for i, (pid, text, meta) in enumerate(chunks, 1):
+                pid = str(pid)
+                sig = self.hasher.signature(text)
+                if sig is not None:
+                    original = self._find(collection, pid, sig, ignore, run)
+                    if original is not None:
+                        self._record_duplicate(collection, pid, original, text, meta)
+                        stats["skipped"] += 1
+                        continue
+                    self._add(collection, pid, sig, run)
+                stats["kept"] += 1
+                if i % 256 == 0:
+                    self._commit()
+                yield pid, text, meta
+        finally:
+            self._commit()
+
+    def confirm(self, collection: str, point_ids: Iterable):
+        """Mark kept chunks as stored: they now count as originals for every later ingest."""
+        rows = [(collection, str(pid)) for pid in point_ids]
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE signatures SET pending = NULL WHERE collection = ? AND point_id = ?", rows)
+            # A chunk once skipped as a copy now holds its own content
+            self._conn.executemany("DELETE FROM duplicates WHERE collection = ? AND point_id = ?", rows)
+            self._conn.commit()
+
+    def discard(self, collection: str, run: str) -> int:
+        """Forget the chunks of run that were never confirmed, and the copies skipped against them.
+
+        Returns how many were dropped.
+        """
+        with self._lock:
+            rows = [(collection, pid) for (pid,) in self._conn.execute(
+                "SELECT point_id FROM signatures WHERE collection = ? AND pending = ?", (collection, run))]
+            for table in ("signatures", "buckets"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE collection = ? AND point_id = ?", rows)
+            self._conn.executemany("DELETE FROM duplicates WHERE collection = ? AND duplicate_of = ?", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def resolve(self, collection: str, point_id: str) -> str:
+        """The stored point that holds point_id's content: itself, or the chunk it duplicated."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT duplicate_of FROM duplicates WHERE collection = ? AND point_id = ?",
+                (collection, str(point_id)),
+            ).fetchone()
+        return row[0] if row else str(point_id)
+
+    def remove(self, collection: str, point_ids: Iterable) -> list:
+        """Forget removed chunks. Returns (point_id, text, metadata) for skipped copies of them,
+        which are no longer backed by stored content and should be ingested again."""
+        rows = [(collection, str(pid)) for pid in point_ids]
+        removed = {pid for _, pid in rows}
+        orphans = []
+        with self._lock:
+            for row in rows:
+                orphans.extend(self._conn.execute(
+                    "SELECT point_id, text, metadata FROM duplicates WHERE collection = ? AND duplicate_of = ?", row
+                ).fetchall())
+            for table in ("signatures", "buckets", "duplicates"):
+                self._conn.executemany(f"DELETE FROM {table} WHERE collection = ? AND point_id = ?", rows)
+            self._conn.executemany("DELETE FROM duplicates WHERE collection = ? AND duplicate_of = ?", rows)
+            self._conn.commit()
+        return [(pid, text, json.loads(meta) if meta else {}) for pid, text, meta in orphans if pid not in removed]
+
+    def clear(self, collection: str):
+        with self._lock:
+            for table in ("signatures", "buckets", "duplicates"):
+                self._conn.execute(f"DELETE FROM {table} WHERE collection = ?", (collection,))
+            self._conn.commit()
+
+    def _band_keys(self, sig: np.ndarray) -> list:
+        keys = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(sig[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).digest()
+            keys.append((band, int.from_bytes(digest, "little", signed=True)))
+        return keys
+
+    def _find(self, collection: str, pid: str, sig: np.ndarray, ignore: set, run: str | None = None) -> str | None:
+        keys = self._band_keys(sig)
+        placeholders = ",".join("(?, ?)" for _ in keys)
+        params = [collection, run, *[v for key in keys for v in key]]
+        with self._lock:
+            # Pending chunks of other runs may never be stored, so they are not originals yet
+            candidates = self._conn.execute(
+                f"SELECT DISTINCT s.point_id, s.sig FROM buckets b JOIN signatures s "
+                f"ON s.collection = b.collection AND s.point_id = b.point_id "
+                f"WHERE b.collection = ? AND (s.pending IS NULL OR s.pending = ?) "
+                f"AND (b.band, b.bucket) IN (VALUES {placeholders})",
+                params,
+            ).fetchall()
+        best, best_score = None, self.threshold
+        for other_id, blob in candidates:
+            if other_id == pid or other_id in ignore:
+                continue
+            score = float(np.mean(np.frombuffer(blob, dtype=np.uint32) == sig))
+            if score >= best_score:
+                best, best_score = other_id, score
+        return best
+
+    def _add(self, collection: str, pid: str, sig: np.ndarray, run: str | None = None):
+        with self._lock:
+            # A chunk already stored (re-ingested content) stays confirmed
+            self._conn.execute(
+                "INSERT INTO signatures (collection, point_id, sig, pending) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (collection, point_id) DO UPDATE SET sig = excluded.sig",
+                (collection, pid, sig.tobytes(), run),
+            )
+            self._conn.execute("DELETE FROM buckets WHERE collection = ? AND point_id = ?", (collection, pid))
+            self._conn.executemany(
+                "INSERT INTO buckets (collection, band, bucket, point_id) VALUES (?, ?, ?, ?)",
+                [(collection, band, bucket, pid) for band, bucket in self._band_keys(sig)],
+            )
+            if run is None:
+                self._conn.execute("DELETE FROM duplicates WHERE collection = ? AND point_id = ?", (collection, pid))
+
+    def _record_duplicate(self, collection: str, pid: str, original: str, text: str, meta: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO duplicates (collection, point_id, duplicate_of, text, metadata) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (collection, pid, original, text, json.dumps(meta)),
+            )
+
+    def _commit(self):
+        with self._lock:
+            self._conn.commit()
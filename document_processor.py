@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Callable, Iterable, Iterator
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters.character import RecursiveCharacterTextSplitter
 import docx
@@ -19,6 +20,98 @@ def split_documents(text: str, chunk_size: int = 1000, chunk_overlap: int = 20):
         return []
 
 
+def iter_split(
+    segments: Iterable[str],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 20,
+    length_function: Callable[[str], int] = len,
+    **splitter_options,
+) -> Iterator[str]:
+    """Split a stream of text segments, yielding chunks as soon as they are complete.
+
+    Segments are joined with newlines, as read_file does. The last, possibly
+    incomplete chunk of each split is carried into the next one, so chunks that
+    span a segment boundary keep their overlap with the chunk before them.
+    chunk_size and chunk_overlap are measured with length_function; splitter_options
+    (e.g. separators) go to RecursiveCharacterTextSplitter.
+
+    Read errors from segments propagate: a file that is only partly read must not
+    look like a complete, shorter file.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+        **splitter_options,
+    )
+    buffer = ""
+    for segment in segments:
+        buffer = f"{buffer}\n{segment}" if buffer else segment
+        if length_function(buffer) <= chunk_size:
+            continue
+        chunks = text_splitter.split_text(buffer)
+        yield from chunks[:-1]
+        buffer = chunks[-1] if chunks else ""
+    if buffer:
+        yield from text_splitter.split_text(buffer)
+
+
+def iter_file(file_path: str) -> Iterator[str]:
+    """Yield a file's text page by page (PDF), paragraph by paragraph (DOCX) or in blocks of lines (TXT)."""
+    file_type = Path(file_path).suffix.lower()
+    if file_type == ".txt":
+        return iter_text(file_path)
+    elif file_type == ".pdf":
+        return iter_pdf(file_path)
+    elif file_type == ".docx":
+        return iter_doc(file_path)
+    else:
+        print(f"Unsupported file format: {file_type}")
+        return iter(())
+
+
+def iter_text(file_path: str, block_size: int = 64 * 1024) -> Iterator[str]:
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            lines = []
+            size = 0
+            for line in f:
+                lines.append(line)
+                size += len(line)
+                if size >= block_size:
+                    yield _drop_newline("".join(lines))
+                    lines, size = [], 0
+            if lines:
+                yield _drop_newline("".join(lines))
+    except Exception as e:
+        print(f"Error reading text file: {e}")
+        raise
+
+
+def _drop_newline(block: str) -> str:
+    # iter_split re-joins segments with a newline
+    return block[:-1] if block.endswith("\n") else block
+
+
+def iter_pdf(file_path: str) -> Iterator[str]:
+    try:
+        for doc in PyPDFLoader(file_path).lazy_load():
+            yield doc.page_content or ""
+    except Exception as e:
+        print(f"Error loading pdf: {e}")
+        raise
+
+
+def iter_doc(file_path: str) -> Iterator[str]:
+    try:
+        d = docx.Document(file_path)
+        for p in d.paragraphs:
+            yield p.text
+    except Exception as e:
+        print(f"Error reading docx file: {e}")
+        raise
+
+
 def read_file(file_path: str):
     file_type = Path(file_path).suffix.lower()
     if file_type == ".txt":
@@ -0,0 +1,259 @@
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import record_cache
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (embedding model, chunk hash) with LRU eviction."""
+
+    def __init__(self, path: str = ".cache/embeddings.sqlite", max_entries: int = 100_000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                   model TEXT NOT NULL,
+                   hash TEXT NOT NULL,
+                   vector BLOB NOT NULL,
+                   last_used REAL NOT NULL,
+                   PRIMARY KEY (model, hash)
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> dict:
+        """Return {hash: vector} for every hash already cached for this model."""
+        found = {}
+        if not hashes:
+            return found
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND hash = ?",
+                    [(now, model, h) for h in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, items: dict):
+        """Store {hash: vector} and evict least recently used entries beyond max_entries."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, h, array("f", vec).tobytes(), now) for h, vec in items.items()],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_query(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """In-process LRU of (model, normalized query) -> vector, with optional TTL."""
+
+    def __init__(self, max_size: int = 2048, ttl_seconds: float | None = 24 * 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: str, query: str) -> List[float] | None:
+        key = (model, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    record_cache("query_embedding", hits=1)
+                    return vector
+                del self._entries[key]
+            self.misses += 1
+            record_cache("query_embedding", misses=1)
+            return None
+
+    def put(self, model: str, query: str, vector: List[float]):
+        key = (model, normalize_query(query))
+        with self._lock:
+            self._entries[key] = (vector, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+# Shared by every QdrantVector in the process, so /documents/search, /rag/ask
+# and the agent's search_documents tool all benefit from each other's queries.
+query_cache = QueryEmbeddingCache()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves already-embedded chunks and repeated queries from cache."""
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        cache: EmbeddingCache | None,
+        model_name: str,
+        queries: QueryEmbeddingCache | None = query_cache,
+    ):
+        self.embedding = embedding
+        self.cache = cache
+        self.model_name = model_name
+        self.queries = queries
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.embedding.embed_documents(texts)
+        hashes = [text_hash(t) for t in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        record_cache("chunk_embedding", hits=len(cached), misses=len(missing))
+        if missing:
+            vectors = self.embedding.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model_name, fresh)
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.queries is None:
+            return self.embedding.embed_query(text)
+        vector = self.queries.get(self.model_name, text)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            self.queries.put(self.model_name, text, vector)
+        return vector
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed many queries with one embed_documents call for the ones not in the query cache."""
+        vectors, missing = self._cached_queries(texts)
+        if missing:
+            fresh = self.embedding.embed_documents(list(missing))
+            self._store_queries(vectors, missing, fresh)
+        return vectors
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return await self.embedding.aembed_documents(texts)
+        hashes = [text_hash(t) for t in texts]
+        cached = self.cache.get_many(self.model_name, hashes)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        record_cache("chunk_embedding", hits=len(cached), misses=len(missing))
+        if missing:
+            vectors = await self.embedding.aembed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model_name, fresh)
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._cached_queries(texts)
+        if missing:
+            fresh = await self.embedding.aembed_documents(list(missing))
+            self._store_queries(vectors, missing, fresh)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        if self.queries is None:
+            return await self.embedding.aembed_query(text)
+        vector = self.queries.get(self.model_name, text)
+        if vector is None:
+            vector = await self.embedding.aembed_query(text)
+            self.queries.put(self.model_name, text, vector)
+        return vector
+
+    def _cached_queries(self, texts: List[str]):
+        # Queries stay out of the on-disk chunk cache; only the in-memory query cache is consulted
+        vectors = [self.queries.get(self.model_name, t) if self.queries is not None else None for t in texts]
+        missing: dict = {}  # text -> positions, so repeated queries are embedded once
+        first: dict = {}  # normalized query -> the text it is embedded as
+        for i, (text, vector) in enumerate(zip(texts, vectors)):
+            if vector is None:
+                text = first.setdefault(normalize_query(text), text)
+                missing.setdefault(text, []).append(i)
+        return vectors, missing
+
+    def _store_queries(self, vectors: list, missing: dict, fresh: List[List[float]]):
+        for (text, positions), vector in zip(missing.items(), fresh):
+            if self.queries is not None:
+                self.queries.put(self.model_name, text, vector)
+            for i in positions:
+                vectors[i] = vector
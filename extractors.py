@@ -0,0 +1,140 @@
+import re
+import threading
+
+from metrics import REGISTRY, Counter
+
+# Deterministic extractors for booking fields, tried on the raw message before any LLM call
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}")
+PHONE = re.compile(r"(?<![\w@])\+?\(?\d[\d\s().-]{7,18}\d(?!\w)")
+# Dates and times look like phone numbers to PHONE: "2024-05-06 10:30", "06/05/2024"
+DATE = re.compile(r"\b\d{4}[-/.]\d{1,2}[-/.]\d{1,2}\b|\b\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}\b")
+# Cues that always introduce a name, however it is written ("my name is john doe")
+NAME_CUE = re.compile(
+    r"\b(?:my name is|my name's|name is|name\s*[:=-]|call me)\s+"
+    r"([A-Za-z][A-Za-z'-]*(?:\s+[A-Za-z][A-Za-z'-]*){0,3})",
+    re.IGNORECASE,
+)
+# Cues that often introduce something else ("I'm really keen", "for an hour"): only title-case words count
+WEAK_NAME_CUE = re.compile(r"\b(?i:i am|i'm|this is|for)\s+([A-Z][A-Za-z'-]*(?:\s+[A-Z][A-Za-z'-]*){0,3})")
+# A whole reply that is only a name ("John Doe"); like weak cues, only title-case words count
+BARE_NAME = re.compile(r"^[A-Z][A-Za-z'-]+(?:\s+[A-Z][A-Za-z'-]+){0,3}$")
+
+# Words that end a cued name ("I'm John Doe and ...") or rule out a bare reply being a name
+_NOT_NAME = {
+    "a", "an", "and", "the", "at", "on", "in", "to", "with", "my", "email", "phone", "number", "is",
+    "book", "booking", "appointment", "schedule", "please", "thanks", "thank", "you", "yes", "no",
+    "ok", "okay", "hi", "hello", "hey", "tomorrow", "today", "next", "monday", "tuesday", "wednesday",
+    "thursday", "friday", "saturday", "sunday", "here", "looking", "trying", "interested", "not", "sure",
+    "january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+    "november", "december", "i", "cancel", "stop", "wait", "sorry", "nevermind", "never", "mind", "why",
+    "what", "who", "how", "idk", "hmm", "um", "uh", "help", "nope", "yeah", "maybe",
+}
+
+
+def extract_email(message: str) -> str | None:
+    match = EMAIL.search(message)
+    return match.group(0) if match else None
+
+
+def extract_phone(message: str) -> str | None:
+    for match in PHONE.finditer(message):
+        candidate = match.group(0)
+        # A date, or digits running into a time ("... 10:30"), is not a phone number
+        if DATE.search(candidate) or message[match.end():match.end() + 1] == ":":
+            continue
+        digits = re.sub(r"\D", "", candidate)
+        if 10 <= len(digits) <= 15:
+            return candidate.strip()
+    return None
+
+
+def extract_name(message: str) -> str | None:
+    match = NAME_CUE.search(message) or WEAK_NAME_CUE.search(message)
+    if match:
+        words = []
+        for word in match.group(1).split():
+            if word.lower() in _NOT_NAME:
+                break
+            words.append(word)
+        if words and not (len(words) == 1 and words[0].islower()):
+            return " ".join(words)
+    # A short title-case reply, e.g. "John Doe" when asked for a name; anything else is left to the model
+    text = message.strip().strip(".!,")
+    if BARE_NAME.match(text) and not any(word.lower() in _NOT_NAME for word in text.split()):
+        return text
+    return None
+
+
+FAST_EXTRACTORS = {
+    "name": extract_name,
+    "email": extract_email,
+    "phone": extract_phone,
+}
+
+
+def extract_fields_fast(message: str, fields: list) -> dict:
+    """Run the deterministic extractor for each of fields; returns {field: value} for the hits."""
+    found = {}
+    for field in fields:
+        extractor = FAST_EXTRACTORS.get(field)
+        value = extractor(message) if extractor else None
+        if value:
+            found[field] = value
+    # A phone number must not double as the name, and an email's local part is not a name
+    if "name" in found and any(found["name"] in found.get(f, "") for f in ("email", "phone")):
+        del found["name"]
+    return found
+
+
+def has_booking_details(message: str) -> bool:
+    """Whether a message opening a booking carries details worth an extraction call,
+    e.g. "Book John Doe for Friday" rather than "I'd like to book an appointment"."""
+    words = re.findall(r"[A-Za-z][\w'-]*|\d+", message)
+    return any(
+        w[0].isdigit() or (w[0].isupper() and i > 0 and w.split("'")[0] != "I") for i, w in enumerate(words)
+    ) or bool(EMAIL.search(message))
+
+
+BOOKING_FIELDS_EXTRACTED = REGISTRY.register(Counter(
+    "chatbot_booking_fields_total", "Booking field extractions by outcome (fast, llm or missed).", ("field", "outcome")))
+EXTRACTION_LLM_CALLS = REGISTRY.register(Counter(
+    "chatbot_booking_extraction_llm_calls_total", "Model calls made to extract booking fields."))
+
+
+class ExtractionStats:
+    """Counts how each field was extracted (deterministic hit, LLM hit, or nothing found) and LLM calls made."""
+
+    def __init__(self):
+        self._counts: dict = {}
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, field: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(field, {"fast": 0, "llm": 0, "missed": 0})
+            counts[outcome] += 1
+        BOOKING_FIELDS_EXTRACTED.inc(field=field, outcome=outcome)
+
+    def record_llm_call(self):
+        with self._lock:
+            self.llm_calls += 1
+        EXTRACTION_LLM_CALLS.inc()
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for field, counts in self._counts.items():
+                total = sum(counts.values())
+                out[field] = {**counts, "fast_hit_rate": counts["fast"] / total if total else 0.0}
+            total = sum(sum(c.values()) for c in self._counts.values())
+            fast = sum(c["fast"] for c in self._counts.values())
+            out["overall"] = {"total": total, "fast_hit_rate": fast / total if total else 0.0, "llm_calls": self.llm_calls}
+            return out
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+            self.llm_calls = 0
+
+
+extraction_stats = ExtractionStats()
@@ -45,10 +45,13 @@ with tab_booking:
     if user_input:
         st.session_state.chat_history.append({"role": "user", "text": user_input})
         try:
-            resp = requests.post(f"{API_URL}/chat", json={"message": user_input}, timeout=30)
+            payload = {"message": user_input, "session_id": st.session_state.get("chat_session_id")}
+            resp = requests.post(f"{API_URL}/chat", json=payload, timeout=30)
             if resp.ok:
                 data = resp.json()
                 reply = data.get("reply", "")
+                # Keep the server-side booking state for the rest of this conversation
+                st.session_state.chat_session_id = data.get("session_id")
                 st.session_state.chat_history.append({"role": "assistant", "text": reply})
                 st.chat_message("assistant").markdown(reply)
             else:
@@ -63,6 +66,7 @@ with tab_booking:
     cols = st.columns(2)
     if cols[0].button("🧹 Clear conversation"):
         st.session_state.chat_history = []
+        st.session_state.chat_session_id = None
         st.rerun()
 
 # -------------------------------
@@ -70,7 +74,7 @@ with tab_booking:
 # -------------------------------
 with tab_docs:
     st.subheader("Add Documents")
-    st.caption("Upload files. Your backend calls `RAGApp.add_document(file_path)` per file.")
+    st.caption("Upload files. Your backend queues an ingestion job that calls `RAGApp.add_documents(file_paths)`.")
     files = st.file_uploader("Choose files", accept_multiple_files=True)
     if st.button("Upload"):
         if files:
@@ -78,8 +82,10 @@ with tab_docs:
                 payload = [("files", (f.name, f.getvalue(), getattr(f, "type", "application/octet-stream"))) for f in files]
                 resp = requests.post(f"{API_URL}/documents/upload", files=payload, timeout=120)
                 if resp.ok:
-                    st.success("Uploaded.")
-                    st.json(resp.json())
+                    body = resp.json()
+                    st.session_state.last_job_id = body.get("job_id", "")
+                    st.success(f"Uploaded. Ingestion job: {st.session_state.last_job_id}")
+                    st.json(body)
                 else:
                     st.error(f"Upload failed: {resp.status_code}")
                     st.code(resp.text)
@@ -88,6 +94,21 @@ with tab_docs:
         else:
             st.info("No files selected.")
 
+    job_id = st.text_input("Ingestion job ID", value=st.session_state.get("last_job_id", ""))
+    if st.button("Check job status"):
+        if job_id.strip():
+            try:
+                resp = requests.get(f"{API_URL}/documents/jobs/{job_id.strip()}", timeout=10)
+                if resp.ok:
+                    st.json(resp.json())
+                else:
+                    st.error(f"Job lookup failed: {resp.status_code}")
+                    st.code(resp.text)
+            except Exception as e:
+                st.error(f"Job request error: {e}")
+        else:
+            st.info("Enter a job ID.")
+
     st.divider()
 
     st.subheader("Ask Questions (RAG)")
@@ -0,0 +1,159 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import PointStruct
+from langchain_core.embeddings import Embeddings
+
+from chunkers import Chunker, RecursiveChunker
+from metrics import stage
+
+_DONE = object()
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parse_file(
+    file_path: str, chunk_size: int = 1000, chunk_overlap: int = 20, chunker: Chunker | None = None
+) -> List[str]:
+    """Read and split one file. Top-level so it can run in a ProcessPoolExecutor worker.
+
+    chunker, if given, replaces the default character splitter (chunk_size and chunk_overlap are then unused).
+    The whole file's chunks are returned, and pickled back to the parent, as one list, so memory
+    per file in flight is O(file size). Only reading and splitting stream; use
+    QdrantVector.add_texts_to_collection to ingest a very large file page by page.
+    """
+    chunker = chunker or RecursiveChunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return list(chunker.split_file(file_path))
+
+
+class IngestionPipeline:
+    """Embed and upsert chunks in batches, with bounded queues between stages.
+
+    The caller's iterable is the parse/split stage. Batches flow through a bounded
+    embed queue to a pool of embedding workers, then through a bounded upsert queue
+    to a single writer, so a slow stage blocks the ones before it instead of
+    letting chunks pile up in memory.
+    """
+
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        embedding: Embeddings,
+        batch_size: int = 64,
+        embed_workers: int = 4,
+        queue_size: int = 8,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.embedding = embedding
+        self.batch_size = max(1, batch_size)
+        self.embed_workers = max(1, embed_workers)
+        self.queue_size = max(1, queue_size)
+
+    def run(
+        self,
+        chunks: Iterable[Tuple[str, str, dict]],
+        on_upsert: Callable[[List[PointStruct]], None] | None = None,
+    ) -> dict:
+        """Ingest (point_id, text, metadata) triples and return counts and throughput.
+
+        on_upsert, if given, is called from the writer thread with the points of each written batch.
+        """
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        upsert_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        failed = threading.Event()
+        errors: list = []
+        written = [0]
+
+        def embed_worker():
+            while True:
+                item = embed_q.get()
+                if item is _DONE:
+                    upsert_q.put(_DONE)
+                    return
+                if failed.is_set():
+                    continue  # keep draining so the producer never blocks
+                ids, texts, metadatas = item
+                try:
+                    with stage("ingest", "embed"):
+                        vectors = self.embedding.embed_documents(texts)
+                    upsert_q.put((ids, texts, metadatas, vectors))
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+
+        def upsert_worker():
+            remaining = self.embed_workers
+            while remaining:
+                item = upsert_q.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                if failed.is_set():
+                    continue
+                ids, texts, metadatas, vectors = item
+                try:
+                    points = [
+                        PointStruct(id=pid, vector=vec, payload={"page_content": text, "metadata": meta})
+                        for pid, text, meta, vec in zip(ids, texts, metadatas, vectors)
+                    ]
+                    with stage("ingest", "upsert"):
+                        self.client.upsert(collection_name=self.collection_name, points=points)
+                    written[0] += len(points)
+                    if on_upsert:
+                        on_upsert(points)
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=embed_worker, daemon=True) for _ in range(self.embed_workers)]
+        threads.append(threading.Thread(target=upsert_worker, daemon=True))
+        for t in threads:
+            t.start()
+
+        batches = 0
+        try:
+            ids, texts, metadatas = [], [], []
+            for pid, text, meta in chunks:
+                if failed.is_set():
+                    break
+                ids.append(pid)
+                texts.append(text)
+                metadatas.append(meta)
+                if len(texts) >= self.batch_size:
+                    embed_q.put((ids, texts, metadatas))
+                    batches += 1
+                    ids, texts, metadatas = [], [], []
+            if texts and not failed.is_set():
+                embed_q.put((ids, texts, metadatas))
+                batches += 1
+        except Exception as e:
+            errors.append(e)
+            failed.set()
+        finally:
+            for _ in range(self.embed_workers):
+                embed_q.put(_DONE)
+            for t in threads:
+                t.join()
+
+        if errors:
+            raise errors[0]
+
+        seconds = time.perf_counter() - started
+        return {
+            "chunks": written[0],
+            "batches": batches,
+            "seconds": seconds,
+            "chunks_per_sec": written[0] / seconds if seconds > 0 else 0.0,
+        }
@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from uuid import uuid4
+
+
+class IngestError(Exception):
+    """Raised by job work when some files failed: {file: message} in errors, added_count for the rest."""
+
+    def __init__(self, errors: dict, added_count: int = 0):
+        super().__init__("; ".join(f"{name}: {message}" for name, message in errors.items()))
+        self.errors = errors
+        self.added_count = added_count
+
+
+class IngestJob:
+    def __init__(self, files: list):
+        self.id = uuid4().hex
+        self.files = files
+        self.status = "queued"
+        self.progress: dict = {}
+        self.added_count: int | None = None
+        self.error: str | None = None
+        self.errors: dict = {}
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    def to_dict(self) -> dict:
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "files": self.files,
+            "progress": self.progress,
+            "added_count": self.added_count,
+            "error": self.error,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queued_seconds": (self.started_at or end) - self.created_at,
+            "run_seconds": end - self.started_at if self.started_at else None,
+        }
+
+
+class JobManager:
+    """Runs ingestion jobs on a background executor and keeps their status for polling."""
+
+    def __init__(self, max_workers: int = 1, max_jobs: int = 200):
+        # Jobs run one at a time by default: each ingest already parses and embeds in parallel
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, files: list, work: Callable[[list, Callable[[dict], None]], int]) -> IngestJob:
+        """Queue work(files, progress) and return its job; work returns the number of files added."""
+        job = IngestJob(files)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job: IngestJob, work):
+        job.status = "running"
+        job.started_at = time.time()
+
+        def progress(update: dict):
+            job.progress = update
+
+        try:
+            job.added_count = work(job.files, progress)
+            job.status = "succeeded"
+        except IngestError as e:
+            job.added_count = e.added_count
+            job.errors = e.errors
+            job.error = str(e)
+            # "partial": some files were added and the rest are listed in errors
+            job.status = "partial" if e.added_count else "failed"
+            print(f"Ingestion job {job.id} {job.status}: {job.error}")
+        except Exception as e:
+            job.error = str(getattr(e, "detail", None) or e)
+            job.status = "failed"
+            print(f"Ingestion job {job.id} failed: {job.error}")
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        # Drop the oldest finished jobs once over the limit; queued and running jobs are kept
+        finished = [jid for jid, j in self._jobs.items() if j.finished_at is not None]
+        for jid in finished[: max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[jid]
@@ -0,0 +1,85 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory inverted index with Okapi BM25 scoring over ingested chunks."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict = {}  # term -> {doc_id: term frequency}
+        self._doc_len: dict = {}  # doc_id -> token count
+        self._docs: dict = {}  # doc_id -> (text, metadata)
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, doc_id, text: str, metadata: dict | None = None):
+        doc_id = str(doc_id)
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+            self._docs[doc_id] = (text, metadata or {})
+
+    def remove(self, doc_ids: Iterable):
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(str(doc_id))
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float, str, dict]]:
+        """Return up to k (doc_id, score, text, metadata), best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._doc_len)
+            if not n or not terms:
+                return []
+            avg_len = self._total_len / n
+            scores: dict = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [(doc_id, score, *self._docs[doc_id]) for doc_id, score in best]
+
+    def _remove(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for term in set(tokenize(entry[0])):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id, 0)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, c: int = 60) -> List[str]:
+    """Fuse ranked ID lists with RRF (score = sum of 1 / (c + rank)) and return the top k IDs."""
+    scores: dict = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (c + rank + 1)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]]
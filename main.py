@@ -1,31 +1,57 @@
 
 from __future__ import annotations
 
-from typing import Optional, List
+import asyncio
+import importlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import AsyncIterator, Literal, Optional, List
+from uuid import uuid4
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
+from jobs import IngestError, JobManager
+from metrics import CONTENT_TYPE, REGISTRY, TraceMiddleware
 
-try:
-    import agent  
-except Exception as e:
-    agent = None
-    _agent_err = e
+# agent.py, rag_app.py and vectorStore.py pull in LangGraph, LangChain, the Qdrant and
+# Ollama clients; they are imported on first use (or by the startup warmup), not here.
+_modules: dict = {}
 
-try:
-    import rag_app  
-except Exception as e:
-    rag_app = None
-    _rag_err = e
+def _load(name: str):
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except Exception as e:
+            raise HTTPException(500, f"Failed to import {name}.py: {e!s}")
+    return _modules[name]
+
+_warmup_stop = threading.Event()
 
-try:
-    import vectorStore  
-except Exception as e:
-    vectorStore = None
-    _vs_err = e
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # WARMUP=0 leaves every service to start on its first request, as before
+    if os.environ.get("WARMUP", "1") == "0":
+        _readiness["status"] = "ready"
+    else:
+        _warmup_stop.clear()
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
+    yield
+    _warmup_stop.set()
+    # The shared store (RAGApp's too) stops its parse worker processes with the server
+    if _vector is not None:
+        _vector.close()
 
-app = FastAPI(title="Agent Backend", version="1.0.1", description="Strict wiring to agent.py, vectorStore.py, rag_app.py")
+app = FastAPI(title="Agent Backend", version="1.0.1", description="Strict wiring to agent.py, vectorStore.py, rag_app.py",
+              lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -34,16 +60,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Trace ID per request (X-Trace-ID), request counts and latency for /metrics
+app.add_middleware(TraceMiddleware)
 
 _chatbot = None
 _rag = None
 _vector = None
+_rag_lock = threading.Lock()
+_jobs = JobManager()
 
 def get_chatbot():
     global _chatbot
     if _chatbot is None:
-        if agent is None:
-            raise HTTPException(500, f"Failed to import agent.py: {_agent_err!s}")
+        agent = _load("agent")
         try:
             _chatbot = agent.ChatBot()
         except Exception as e:
@@ -53,34 +82,90 @@ def get_chatbot():
 def get_rag():
     global _rag
     if _rag is None:
-        if rag_app is None:
-            raise HTTPException(500, f"Failed to import rag_app.py: {_rag_err!s}")
-        try:
-            _rag = rag_app.RAGApp()
-            _rag.setup()
-        except Exception as e:
-            raise HTTPException(500, f"Could not init RAGApp: {e!s}")
+        rag_app = _load("rag_app")
+        # Ingestion jobs, request threads and the warmup may race to the first call
+        with _rag_lock:
+            if _rag is None:
+                try:
+                    rag = rag_app.RAGApp()
+                    ok = rag.setup()
+                except Exception as e:
+                    raise HTTPException(500, f"Could not init RAGApp: {e!s}")
+                # Not cached, so the next call retries once Qdrant is reachable
+                if ok is False:
+                    raise HTTPException(503, "RAG setup failed: could not connect to the vector store")
+                _rag = rag
     return _rag
 
 def get_vector():
     global _vector
     if _vector is None:
-        if vectorStore is None:
-            raise HTTPException(500, f"Failed to import vectorStore.py: {_vs_err!s}")
+        vectorStore = _load("vectorStore")
         try:
-            _vector = vectorStore.QdrantVector()
-            # QdrantVector is expected to connect inside its methods or __init__.
-            # If it needs explicit connect, uncomment next line:
-            # _vector.connect_client()
+            # Same connected instance RAGApp and the agent use
+            _vector = vectorStore.get_vector_store()
         except Exception as e:
             raise HTTPException(500, f"Could not init QdrantVector: {e!s}")
     return _vector
 
+# Startup progress for /ready: status is "starting", "warming", "ready" or "failed"
+_readiness = {"status": "starting", "steps": {}}
+
+def _check_collection():
+    if not get_vector().check_collection():
+        raise RuntimeError(f"Collection '{get_vector().collection_name}' is not available")
+
+def _warm_models():
+    if not (get_rag().warmup() and get_chatbot().warmup()):
+        raise RuntimeError("Model warmup failed; see the log")
+
+# (name, function, required): the worker is ready once every required step has passed.
+# Model preloading is best effort; the first request loads whatever it missed.
+WARMUP_STEPS = [
+    ("vector_store", get_vector, True),
+    ("rag", get_rag, True),  # collection setup and ingestion of the default document
+    ("collection", _check_collection, True),
+    ("chatbot", get_chatbot, True),
+    ("models", _warm_models, False),
+]
+
+def warmup(retry_seconds: float | None = None):
+    """Run WARMUP_STEPS until the required ones pass, retrying every retry_seconds (WARMUP_RETRY_SECONDS)."""
+    if retry_seconds is None:
+        retry_seconds = float(os.environ.get("WARMUP_RETRY_SECONDS", "15"))
+    steps = _readiness["steps"]
+    while True:
+        _readiness["status"] = "warming"
+        for name, func, required in WARMUP_STEPS:
+            if steps.get(name, {}).get("ok"):
+                continue
+            started = time.perf_counter()
+            try:
+                func()
+                steps[name] = {"ok": True, "required": required, "seconds": round(time.perf_counter() - started, 3)}
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                print(f"Warmup step '{name}' failed: {detail}")
+                steps[name] = {"ok": False, "required": required, "error": detail,
+                               "seconds": round(time.perf_counter() - started, 3)}
+                if required:
+                    break
+        if all(steps.get(name, {}).get("ok") for name, _, required in WARMUP_STEPS if required):
+            _readiness["status"] = "ready"
+            print("Warmup complete: ready for traffic.")
+            return
+        _readiness["status"] = "failed"
+        if _warmup_stop.wait(retry_seconds):
+            return
+
 class ChatRequest(BaseModel):
     message: str
+    # Omit to start a new session; send the returned session_id back to continue it
+    session_id: Optional[str] = Field(None, min_length=1, max_length=128)
 
 class ChatResponse(BaseModel):
     reply: str
+    session_id: str
 
 class AskRequest(BaseModel):
     question: str
@@ -89,66 +174,201 @@ class AskRequest(BaseModel):
 class AskResponse(BaseModel):
     answer: str
 
+class AskBatchRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=1000)
+    k: int = 3
+    # Generations in flight at once; size to what the model server can run in parallel
+    concurrency: int = Field(4, ge=1, le=32)
+
+class AskBatchItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    cached: bool = False
+    seconds: float
+
+class AskBatchResponse(BaseModel):
+    results: List[AskBatchItem]
+    seconds: float
+
 class SearchRequest(BaseModel):
     query: str
     k: int = 3
+    # "lexical" answers from the local BM25 index without an embedding call; "hybrid" fuses both
+    mode: Literal["dense", "lexical", "hybrid"] = "dense"
 
 class SearchResponse(BaseModel):
     results: list
 
+class BatchSearchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=256)
+    k: int = 3
+    mode: Literal["dense", "lexical", "hybrid"] = "dense"
+
+class BatchSearchResponse(BaseModel):
+    # One result list per query, in request order
+    results: List[list]
+
+def _sse(tokens: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an async token iterator as server-sent events: one `data` event per token, then `done`."""
+    async def events():
+        try:
+            async for token in tokens:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        yield "event: done\ndata: {}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
-# Exact: agent.ChatBot.chat(message: str) -> str
+# Readiness probe for the load balancer: 503 until the startup warmup has connected the
+# vector store, ingested the default document and built the chatbot. /health only says the process is up.
+@app.get("/ready")
+def ready():
+    body = {"status": _readiness["status"], "steps": dict(_readiness["steps"])}
+    return JSONResponse(body, status_code=200 if body["status"] == "ready" else 503)
+
+# Prometheus scrape target: request and per-stage latency histograms, error and cache counters, in-flight gauges
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+# Exact: agent.ChatBot.achat(message: str, session_id: str) -> str
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     bot = get_chatbot()
+    session_id = req.session_id or uuid4().hex
     try:
-        reply = bot.chat(req.message)
+        reply = await bot.achat(req.message, session_id=session_id)
     except Exception as e:
         raise HTTPException(500, f"Chat error: {e!s}")
-    return ChatResponse(reply=reply)
+    return ChatResponse(reply=reply, session_id=session_id)
 
-# Upload + add via *existing* RAGApp.add_document(file_path)
-@app.post("/documents/upload")
+# Streams agent.ChatBot.achat_stream(message: str, session_id: str) as server-sent events;
+# the session ID is returned in the X-Session-ID header. Routing and retrieval are awaited
+# before the response starts, so their failures are HTTP errors; only generation is streamed.
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    bot = get_chatbot()
+    session_id = req.session_id or uuid4().hex
+    try:
+        tokens = await bot.achat_stream(req.message, session_id=session_id)
+    except Exception as e:
+        raise HTTPException(500, f"Chat error: {e!s}")
+    response = _sse(tokens)
+    response.headers["X-Session-ID"] = session_id
+    return response
+
+def _ingest(names: list, progress, paths: list, upload_dir: str) -> int:
+    # The job lists each upload by the name it is recorded under; paths are where it was saved
+    recorded = dict(zip(paths, names))
+    try:
+        errors = {}
+        added = get_rag().add_documents(paths, progress=progress, names=recorded, errors=errors)
+        if errors:
+            raise IngestError({recorded.get(p, p): message for p, message in errors.items()}, added)
+        return added
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+def _save_upload(upload_dir: str, name: str, data: bytes) -> str:
+    path = os.path.join(upload_dir, name)
+    if os.path.exists(path):
+        path = os.path.join(tempfile.mkdtemp(dir=upload_dir), name)
+    with open(path, "wb") as out:
+        out.write(data)
+    return path
+
+# Upload saves the files and queues an ingestion job; poll /documents/jobs/{job_id} for the result
+@app.post("/documents/upload", status_code=202)
 async def upload_documents(files: List[UploadFile] = File(...)) -> dict:
-    rag = get_rag()
-    saved = []
-    added = 0
+    # Each upload gets its own directory, removed when its job finishes, so uploads with the
+    # same file name cannot overwrite each other before ingestion reads them
+    upload_dir = await asyncio.to_thread(tempfile.mkdtemp, prefix="upload-")
+    saved, names = [], []
     for f in files:
         data = await f.read()
-        path = f"/tmp/{f.filename}"
-        with open(path, "wb") as out:
-            out.write(data)
-        saved.append(path)
-        try:
-            ok = rag.add_document(path)  # uses your existing method
-            if ok is not False:  # treat truthy/None as success
-                added += 1
-        except Exception as e:
-            raise HTTPException(500, f"add_document failed for {f.filename}: {e!s}")
-    return {"uploaded_files": saved, "added_count": added}
+        # Client-supplied names are reduced to their last component: no "../" out of upload_dir
+        name = os.path.basename(f.filename or "")
+        if name in ("", ".", ".."):
+            name = "upload"
+        # Disk writes stay off the event loop
+        saved.append(await asyncio.to_thread(_save_upload, upload_dir, name, data))
+        # Recorded under a stable name, so uploading a new version of a file replaces the old one
+        names.append(f"uploads/{name}")
+    job = _jobs.submit(names, partial(_ingest, paths=saved, upload_dir=upload_dir))
+    return {"job_id": job.id, "status": job.status, "uploaded_files": names}
 
-# Ask via RAGApp.ask(question: str, k: int = 3)
+@app.get("/documents/jobs")
+def list_jobs() -> dict:
+    return {"jobs": [j.to_dict() for j in _jobs.list_jobs()]}
+
+@app.get("/documents/jobs/{job_id}")
+def get_job(job_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"Unknown job: {job_id}")
+    return job.to_dict()
+
+# Ask via RAGApp.aask(question: str, k: int = 3)
 @app.post("/rag/ask", response_model=AskResponse)
-def rag_ask(req: AskRequest):
-    rag = get_rag()
+async def rag_ask(req: AskRequest):
+    # First call runs RAGApp.setup(), which is blocking, so keep it off the event loop
+    rag = await run_in_threadpool(get_rag)
     try:
-        ans = rag.ask(req.question, k=req.k)
+        ans = await rag.aask(req.question, k=req.k)
     except Exception as e:
         raise HTTPException(500, f"RAG ask failed: {e!s}")
     return AskResponse(answer=ans)
 
-# Search via QdrantVector.find_similar_texts(query: str, k: int = 3)
+# Streams RAGApp.aask_stream(question, k); retrieval completes before the response starts
+@app.post("/rag/ask/stream")
+async def rag_ask_stream(req: AskRequest):
+    rag = await run_in_threadpool(get_rag)
+    try:
+        tokens = await rag.aask_stream(req.question, k=req.k)
+    except Exception as e:
+        raise HTTPException(500, f"RAG ask failed: {e!s}")
+    return _sse(tokens)
+
+# Batch ask via RAGApp.aask_many(questions: list, k: int = 3, concurrency: int = 4)
+@app.post("/rag/ask/batch", response_model=AskBatchResponse)
+async def rag_ask_batch(req: AskBatchRequest):
+    rag = await run_in_threadpool(get_rag)
+    started = time.perf_counter()
+    try:
+        results = await rag.aask_many(req.questions, k=req.k, concurrency=req.concurrency)
+    except Exception as e:
+        raise HTTPException(500, f"RAG batch ask failed: {e!s}")
+    return AskBatchResponse(results=results, seconds=time.perf_counter() - started)
+
+# Search via QdrantVector.afind_similar_texts(query: str, k: int = 3, mode: str = "dense")
 @app.post("/documents/search", response_model=SearchResponse)
-def search(req: SearchRequest):
+async def search(req: SearchRequest):
+    vs = get_vector()
+    try:
+        res = await vs.afind_similar_texts(req.query, k=req.k, mode=req.mode)
+    except Exception as e:
+        raise HTTPException(500, f"Vector search failed: {e!s}")
+    return SearchResponse(results=_search_results(res))
+
+# Batch search via QdrantVector.afind_similar_texts_batch(queries: list[str], k: int = 3, mode: str = "dense")
+@app.post("/documents/search/batch", response_model=BatchSearchResponse)
+async def search_batch(req: BatchSearchRequest):
     vs = get_vector()
     try:
-        res = vs.find_similar_texts(req.query, k=req.k)
+        res = await vs.afind_similar_texts_batch(req.queries, k=req.k, mode=req.mode)
     except Exception as e:
         raise HTTPException(500, f"Vector search failed: {e!s}")
+    if res is None:
+        raise HTTPException(500, "Vector search failed")
+    return BatchSearchResponse(results=[_search_results(r) for r in res])
 
+def _search_results(res) -> list:
     # Normalize to plain list for JSON: if Documents, convert
     out = []
     for r in res or []:
@@ -160,8 +380,10 @@ def search(req: SearchRequest):
                 out.append(r)
         except Exception:
             out.append(str(r))
-    return SearchResponse(results=out)
+    return out
 
 @app.get("/")
 def root():
-    return {"routes": ["/chat", "/documents/upload", "/documents/search", "/rag/ask", "/health"]}
+    return {"routes": ["/chat", "/chat/stream", "/documents/upload", "/documents/jobs", "/documents/search",
+                       "/documents/search/batch", "/rag/ask", "/rag/ask/stream",
+                       "/rag/ask/batch", "/health", "/ready", "/metrics"]}
@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from uuid import NAMESPACE_URL, uuid5
+
+
+def file_sha256(file_path: str) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chunk_point_id(file_hash: str, chunk_index: int) -> str:
+    """Deterministic Qdrant point ID for a chunk, so re-ingesting a file upserts instead of duplicating."""
+    return str(uuid5(NAMESPACE_URL, f"{file_hash}:{chunk_index}"))
+
+
+class IngestManifest:
+    """JSON record of which files have been ingested into which collection, and with what content hash."""
+
+    def __init__(self, path: str = ".cache/manifest.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading manifest, starting empty: {e}")
+
+    def get(self, collection: str, file_path: str) -> dict | None:
+        with self._lock:
+            return self.data.get(collection, {}).get(os.path.abspath(file_path))
+
+    def find_hash(self, collection: str, file_hash: str) -> dict | None:
+        """Return the entry of any file in the collection with this content hash."""
+        with self._lock:
+            for entry in self.data.get(collection, {}).values():
+                if entry["hash"] == file_hash:
+                    return entry
+        return None
+
+    def paths_with_hash(self, collection: str, file_hash: str) -> list:
+        """Absolute paths of the files in the collection whose content has this hash."""
+        with self._lock:
+            return [path for path, entry in self.data.get(collection, {}).items() if entry["hash"] == file_hash]
+
+    def record(self, collection: str, file_path: str, file_hash: str, chunks: int):
+        with self._lock:
+            self.data.setdefault(collection, {})[os.path.abspath(file_path)] = {
+                "hash": file_hash,
+                "chunks": chunks,
+                "ingested_at": time.time(),
+            }
+            self._save()
+
+    def remove(self, collection: str, file_path: str):
+        with self._lock:
+            self.data.get(collection, {}).pop(os.path.abspath(file_path), None)
+            self._save()
+
+    def clear(self, collection: str):
+        with self._lock:
+            self.data.pop(collection, None)
+            self._save()
+
+    def _save(self):
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,275 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+from typing import Iterable, List, Tuple
+from uuid import uuid4
+
+# Upper bounds in seconds: sub-millisecond cache hits up to minute-long generations
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _samples(self, key: Tuple, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value)
+
+    def _samples(self, key: Tuple, value) -> List[str]:
+        counts, total = value
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+        labels = _format_labels(self.labels, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: dict = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add metric, or return the one already registered under its name (e.g. on module reload)."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_stage_duration_seconds", "Time spent in each stage of a request.", ("component", "stage")))
+STAGE_ERRORS = REGISTRY.register(Counter(
+    "chatbot_stage_errors_total", "Stages that raised an exception.", ("component", "stage")))
+STAGE_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbot_stage_in_flight", "Stages currently running.", ("component", "stage")))
+CACHE_LOOKUPS = REGISTRY.register(Counter(
+    "chatbot_cache_lookups_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result")))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "chatbot_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status")))
+HTTP_SECONDS = REGISTRY.register(Histogram(
+    "chatbot_http_request_duration_seconds", "HTTP request time, to the last byte of the body.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbot_http_requests_in_flight", "HTTP requests being served.", ("method",)))
+
+# The current request's trace ID and the (stage, seconds) timings recorded under it
+_trace: ContextVar = ContextVar("trace", default=None)
+
+
+def start_trace(trace_id: str | None = None):
+    """Begin a trace in the current context; returns a token for end_trace()."""
+    return _trace.set((trace_id or uuid4().hex, []))
+
+
+def end_trace(token):
+    _trace.reset(token)
+
+
+def current_trace_id() -> str | None:
+    trace = _trace.get()
+    return trace[0] if trace else None
+
+
+def trace_stages() -> list:
+    """(component.stage, seconds) for each stage finished under the current trace, in order."""
+    trace = _trace.get()
+    return list(trace[1]) if trace else []
+
+
+@contextmanager
+def stage(component: str, name: str):
+    """Time a block as one stage: observed in the histogram, counted on error, tracked while in flight."""
+    labels = {"component": component, "stage": name}
+    STAGE_IN_FLIGHT.inc(**labels)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(**labels)
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_IN_FLIGHT.dec(**labels)
+        STAGE_SECONDS.observe(seconds, **labels)
+        trace = _trace.get()
+        if trace:
+            trace[1].append((f"{component}.{name}", seconds))
+
+
+def timed(component: str, name: str):
+    """Decorator form of stage() for sync and async functions."""
+    def decorate(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage(component, name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(component, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0):
+    if hits:
+        CACHE_LOOKUPS.inc(hits, cache=cache, result="hit")
+    if misses:
+        CACHE_LOOKUPS.inc(misses, cache=cache, result="miss")
+
+
+class TraceMiddleware:
+    """ASGI middleware: gives each HTTP request a trace ID and records request metrics.
+
+    The ID is taken from an incoming X-Trace-ID header (or a W3C traceparent) when
+    present, returned in X-Trace-ID, and visible to stage() calls made for the request.
+    Requests slower than SLOW_REQUEST_SECONDS are logged with their stage breakdown.
+    """
+
+    def __init__(self, app, slow_seconds: float | None = None):
+        self.app = app
+        self.slow_seconds = slow_seconds if slow_seconds is not None else float(
+            os.environ.get("SLOW_REQUEST_SECONDS", "5"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = start_trace(self._incoming_trace_id(scope))
+        trace_id = current_trace_id()
+        status = [500]
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", trace_id.encode())]
+            await send(message)
+
+        method = scope["method"]
+        # The matched route is only known once routing has run, so in-flight requests are counted by method
+        HTTP_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            seconds = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method=method)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_REQUESTS.inc(method=method, route=route, status=status[0])
+            HTTP_SECONDS.observe(seconds, method=method, route=route)
+            if seconds >= self.slow_seconds:
+                breakdown = ", ".join(f"{name}={s:.3f}s" for name, s in trace_stages())
+                print(f"Slow request {method} {scope['path']} took {seconds:.2f}s "
+                      f"[trace {trace_id}]: {breakdown or 'no stages recorded'}")
+            end_trace(token)
+
+    def _incoming_trace_id(self, scope) -> str | None:
+        headers = dict(scope.get("headers") or [])
+        value = headers.get(b"x-trace-id")
+        if value:
+            return value.decode("latin-1")[:64]
+        parent = headers.get(b"traceparent", b"").decode("latin-1").split("-")
+        return parent[1] if len(parent) == 4 and len(parent[1]) == 32 else None
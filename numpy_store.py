@@ -0,0 +1,280 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from qdrant_client.http.models import (
+    CollectionDescription,
+    CollectionsResponse,
+    CountResult,
+    Distance,
+    QueryResponse,
+    Record,
+    ScoredPoint,
+)
+
+
+class _Collection:
+    """One collection: a memory-mapped float32 matrix of unit vectors plus an SQLite chunk table."""
+
+    def __init__(self, path: Path, dim: int | None = None):
+        self.path = path
+        path.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path / "chunks.sqlite", check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS points (id TEXT PRIMARY KEY, row INTEGER NOT NULL, payload TEXT)")
+        stored = self.db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if stored is None:
+            if dim is None:
+                raise ValueError(f"No vector dimension recorded for the index at {path}")
+            self.db.execute("INSERT INTO meta VALUES ('dim', ?)", (str(dim),))
+            self.db.commit()
+        elif dim is not None and int(stored[0]) != dim:
+            # The vector file is laid out in rows of the stored dim; mapping it with another would scramble it
+            raise ValueError(f"Index at {path} holds {stored[0]}-dimensional vectors, not {dim}; "
+                             f"delete the collection to change the embedding model")
+        self.dim = int(stored[0]) if stored else dim
+
+        self.row_of: dict = {}
+        self.id_of: dict = {}
+        for pid, row in self.db.execute("SELECT id, row FROM points"):
+            self.row_of[pid] = row
+            self.id_of[row] = pid
+        self.size = max(self.id_of, default=-1) + 1
+        self.free = sorted(set(range(self.size)) - set(self.id_of), reverse=True)
+        self.valid = np.zeros(max(self.size, 1), dtype=bool)
+        self.valid[list(self.id_of)] = True
+        self.matrix = self._open(max(self.size, 1024))
+
+    def _open(self, capacity: int) -> np.memmap:
+        file = self.path / "vectors.f32"
+        needed = capacity * self.dim * 4
+        if not file.exists() or file.stat().st_size < needed:
+            with open(file, "ab") as f:
+                f.truncate(needed)
+        rows = file.stat().st_size // (self.dim * 4)
+        return np.memmap(file, dtype=np.float32, mode="r+", shape=(rows, self.dim))
+
+    def _grow(self, rows: int):
+        if rows <= self.matrix.shape[0]:
+            return
+        self.matrix.flush()
+        self.matrix = self._open(max(rows, self.matrix.shape[0] * 2))
+
+    def upsert(self, points: list):
+        for point in points:
+            if len(point.vector) != self.dim:
+                raise ValueError(f"Vector of point {point.id} has {len(point.vector)} dimensions, expected {self.dim}")
+        rows = []
+        for point in points:
+            pid = str(point.id)
+            row = self.row_of.get(pid)
+            if row is None:
+                row = self.free.pop() if self.free else self.size
+                self.size = max(self.size, row + 1)
+                self.row_of[pid] = row
+                self.id_of[row] = pid
+            rows.append(row)
+        self._grow(self.size)
+        if self.valid.shape[0] < self.size:
+            self.valid = np.concatenate([self.valid, np.zeros(self.size - self.valid.shape[0], dtype=bool)])
+        self.matrix[rows] = np.stack([_unit(p.vector) for p in points])
+        self.valid[rows] = True
+        self.matrix.flush()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO points (id, row, payload) VALUES (?, ?, ?)",
+            [(str(p.id), row, json.dumps(p.payload)) for p, row in zip(points, rows)],
+        )
+        self.db.commit()
+
+    def delete(self, ids: list):
+        for pid in map(str, ids):
+            row = self.row_of.pop(pid, None)
+            if row is None:
+                continue
+            del self.id_of[row]
+            self.valid[row] = False
+            self.free.append(row)
+        self.free.sort(reverse=True)
+        self.db.executemany("DELETE FROM points WHERE id = ?", [(str(pid),) for pid in ids])
+        self.db.commit()
+
+    def payloads(self, ids: list) -> dict:
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = self.db.execute(f"SELECT id, payload FROM points WHERE id IN ({placeholders})", ids).fetchall()
+        return {pid: json.loads(payload) if payload else None for pid, payload in rows}
+
+    def top_k(self, queries: np.ndarray, k: int) -> List[list]:
+        """Batched cosine top-k: one matrix product for every query, then a partial sort per row."""
+        if not self.row_of or k <= 0:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self.matrix[: self.size].T
+        scores[:, ~self.valid[: self.size]] = -np.inf
+        k = min(k, len(self.row_of))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for qi, rows in enumerate(top):
+            rows = rows[np.argsort(-scores[qi, rows], kind="stable")]
+            results.append([(self.id_of[int(r)], float(scores[qi, r])) for r in rows])
+        return results
+
+
+class NumpyIndexClient:
+    """In-process stand-in for the subset of QdrantClient that QdrantVector uses.
+
+    Each collection is a memory-mapped float32 matrix of unit-normalised vectors
+    (cosine similarity, as the Qdrant collections use) with an SQLite table of
+    chunk IDs and payloads. Searches are vectorised matrix products, so small and
+    medium collections need no network round trip and no Qdrant server at all.
+    """
+
+    def __init__(self, path: str = ".cache/vectors"):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._collections: dict = {}
+        self._lock = threading.RLock()
+
+    def _get(self, collection_name: str) -> _Collection:
+        with self._lock:
+            collection = self._collections.get(collection_name)
+            if collection is None:
+                if not (self.path / collection_name / "chunks.sqlite").exists():
+                    raise ValueError(f"Collection {collection_name} not found")
+                collection = _Collection(self.path / collection_name)
+                self._collections[collection_name] = collection
+            return collection
+
+    def get_collections(self) -> CollectionsResponse:
+        names = sorted(p.name for p in self.path.iterdir() if (p / "chunks.sqlite").exists())
+        return CollectionsResponse(collections=[CollectionDescription(name=n) for n in names])
+
+    def collection_exists(self, collection_name: str) -> bool:
+        return (self.path / collection_name / "chunks.sqlite").exists()
+
+    def create_collection(self, collection_name: str, vectors_config, **kwargs):
+        if vectors_config.distance != Distance.COSINE:
+            raise ValueError("The NumPy index only supports cosine distance")
+        with self._lock:
+            self._collections[collection_name] = _Collection(self.path / collection_name, dim=vectors_config.size)
+        return True
+
+    def update_collection(self, collection_name: str, **kwargs):
+        # The matrix is already memory-mapped from disk and is not quantized; storage options are accepted and ignored
+        self._get(collection_name)
+        return True
+
+    def delete_collection(self, collection_name: str, **kwargs):
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection is not None:
+                collection.db.close()
+            target = self.path / collection_name
+            if target.exists():
+                for file in target.iterdir():
+                    file.unlink()
+                target.rmdir()
+        return True
+
+    def upsert(self, collection_name: str, points: list, **kwargs):
+        with self._lock:
+            self._get(collection_name).upsert(points)
+
+    def delete(self, collection_name: str, points_selector: list, **kwargs):
+        with self._lock:
+            self._get(collection_name).delete(list(points_selector))
+
+    def retrieve(self, collection_name: str, ids: list, with_payload: bool = True, with_vectors: bool = False, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            found = [str(pid) for pid in ids if str(pid) in collection.row_of]
+            payloads = collection.payloads(found) if with_payload else {}
+            return [
+                Record(
+                    id=pid,
+                    payload=payloads.get(pid) if with_payload else None,
+                    vector=collection.matrix[collection.row_of[pid]].tolist() if with_vectors else None,
+                )
+                for pid in found
+            ]
+
+    def scroll(self, collection_name: str, limit: int = 10, offset=None, with_payload: bool = True,
+               with_vectors: bool = False, **kwargs):
+        with self._lock:
+            collection = self._get(collection_name)
+            ids = sorted(collection.row_of)
+            start = int(offset or 0)
+            page = ids[start:start + limit]
+        records = self.retrieve(collection_name, page, with_payload=with_payload, with_vectors=with_vectors)
+        next_offset = start + limit if start + limit < len(ids) else None
+        return records, next_offset
+
+    def count(self, collection_name: str, **kwargs) -> CountResult:
+        with self._lock:
+            return CountResult(count=len(self._get(collection_name).row_of))
+
+    def query_points(self, collection_name: str, query, limit: int = 10, with_payload: bool = True, **kwargs):
+        return self.query_matrix(collection_name, np.asarray([query], dtype=np.float32), limit, with_payload)[0]
+
+    def query_batch_points(self, collection_name: str, requests: list, **kwargs) -> List[QueryResponse]:
+        # Requests sharing a limit are answered by one matrix product
+        responses: list = [None] * len(requests)
+        by_limit: dict = {}
+        for i, request in enumerate(requests):
+            by_limit.setdefault(request.limit, []).append(i)
+        for limit, positions in by_limit.items():
+            queries = np.asarray([requests[i].query for i in positions], dtype=np.float32)
+            for i, response in zip(positions, self.query_matrix(collection_name, queries, limit)):
+                responses[i] = response
+        return responses
+
+    def query_matrix(self, collection_name: str, queries: np.ndarray, limit: int = 10,
+                     with_payload: bool = True) -> List[QueryResponse]:
+        """Top-k for a whole batch of query vectors with one matrix product."""
+        queries = np.asarray(queries, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        with self._lock:
+            collection = self._get(collection_name)
+            hits = collection.top_k(queries, limit)
+            payloads = collection.payloads(list({pid for row in hits for pid, _ in row})) if with_payload else {}
+        return [
+            QueryResponse(points=[
+                ScoredPoint(id=pid, version=0, score=score, payload=payloads.get(pid) if with_payload else None)
+                for pid, score in row
+            ])
+            for row in hits
+        ]
+
+
+class AsyncNumpyIndexClient:
+    """Async face of NumpyIndexClient for QdrantVector's async search path.
+
+    Also wraps Qdrant's in-process QdrantClient(location=":memory:"), whose data an
+    AsyncQdrantClient could not share.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    async def query_points(self, collection_name: str, query, limit: int = 10, with_payload: bool = True, **kwargs):
+        # Matrix products release the GIL, so run them off the event loop
+        return await asyncio.to_thread(
+            self.client.query_points,
+            collection_name=collection_name, query=query, limit=limit, with_payload=with_payload, **kwargs,
+        )
+
+    async def query_batch_points(self, collection_name: str, requests: list, **kwargs):
+        return await asyncio.to_thread(
+            self.client.query_batch_points, collection_name=collection_name, requests=requests, **kwargs
+        )
+
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
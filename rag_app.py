@@ -1,7 +1,15 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from langchain_ollama import ChatOllama
-from vectorStore import QdrantVector
+from vectorStore import get_vector_store
+from semantic_cache import SemanticAnswerCache
+from context_packer import ContextPacker, estimate_tokens
 from document_processor import read_file
+from metrics import stage
 import sys
+from typing import AsyncIterator, Iterator
 
 
 class RAGApp:
@@ -11,18 +19,31 @@ class RAGApp:
         collection_name: str = "metacloud",
         embedding_model: str = "llama3.2:3b",
         chat_model: str = "llama3.2:3b",
-        qdrant_url: str = "http://localhost:6333"
+        qdrant_url: str = "http://localhost:6333",
+        answer_cache_threshold: float = 0.95,
+        answer_cache_size: int = 512,
+        vector_backend: str | None = None,
+        context_token_budget: int = 2000
     ):
         self.file_path = file_path
-        self.vector_store = QdrantVector(
+        # Shared with the agent and the API so the Qdrant client and embedder are reused
+        self.vector_store = get_vector_store(
             qdrant_url=qdrant_url,
             collection_name=collection_name,
             embedding_model=embedding_model,
-            file_path=file_path
+            backend=vector_backend
         )
         self.llm = ChatOllama(model=chat_model, temperature=0.7)
+        # Caps the retrieved context in every prompt, whatever k is
+        self.packer = ContextPacker(max_tokens=context_token_budget)
         self.setup_complete = False
 
+        # Answers to semantically equivalent questions are reused until a source chunk changes
+        self.answer_cache = None
+        if answer_cache_size:
+            self.answer_cache = SemanticAnswerCache(threshold=answer_cache_threshold, max_entries=answer_cache_size)
+            self.vector_store.add_change_listener(self.answer_cache.invalidate_sources)
+
     def setup(self):
         """Initialize the RAG system by connecting to Qdrant and setting up the vector store."""
         print("Setting up RAG system...")
@@ -34,30 +55,51 @@ class RAGApp:
         
         # Create collection and add documents
         self.vector_store.create_collection()
-        self.vector_store.add_texts_to_collection()
+        self.vector_store.add_texts_to_collection(self.file_path)
         
         self.setup_complete = True
         print("RAG system setup complete!")
         return True
 
-    def ask(self, question: str, k: int = 3) -> str:
-        """Ask a question and get an answer based on the document content."""
-        if not self.setup_complete:
-            return "Error: RAG system not set up. Call setup() first."
-        
+    def warmup(self) -> bool:
+        """Load the embedding and chat models into the model server, so the first question does not wait for them."""
         try:
-            # Retrieve relevant documents
-            print(f"Searching for relevant information...")
+            with stage("rag", "warmup"):
+                self.vector_store.embedding.embed_query("warmup")
+                # One generated token is enough to load the weights
+                self.llm.invoke("Hi", options={"num_predict": 1})
+            return True
+        except Exception as e:
+            print(f"Error occurred while warming up models: {e}")
+            return False
+
+    def _retrieve(self, question: str, k: int):
+        """Return (prompt, None, source_ids), or (None, message, []) when nothing relevant was found."""
+        print(f"Searching for relevant information...")
+        with stage("rag", "retrieve"):
             similar_docs = self.vector_store.find_similar_texts(question, k=k)
-            
-            if not similar_docs:
-                return "No relevant information found in the document."
-            
-            # Combine retrieved content
-            context = "\n\n".join([doc.page_content for doc in similar_docs])
-            
-            # Create prompt
-            prompt = f"""Based on the following context from the document, please answer the question.
+        return self._build_prompt(question, similar_docs)
+
+    async def _aretrieve(self, question: str, k: int):
+        with stage("rag", "retrieve"):
+            similar_docs = await self.vector_store.afind_similar_texts(question, k=k)
+        return self._build_prompt(question, similar_docs)
+
+    def _build_prompt(self, question: str, similar_docs):
+        if not similar_docs:
+            return None, "No relevant information found in the document.", []
+        
+        # Combine retrieved content, without repeated spans and within the token budget
+        with stage("rag", "build_prompt"):
+            packed = self.packer.pack(similar_docs)
+        if not packed:
+            return None, "No relevant information found in the document.", []
+        context = "\n\n".join([doc.page_content for doc in packed])
+        source_ids = [doc.metadata.get("_id") for doc in packed if doc.metadata.get("_id") is not None]
+        print(f"Packed {len(packed)} of {len(similar_docs)} chunks into ~{estimate_tokens(context)} context tokens.")
+        
+        # Create prompt
+        prompt = f"""Based on the following context from the document, please answer the question.
 
                         Context:
                         {context}
@@ -67,15 +109,229 @@ class RAGApp:
                         Answer: Please provide a comprehensive answer based only on the information provided in the context above. 
                         If the context doesn't contain enough information to answer the question, please say so.
                         """
+        return prompt, None, source_ids
+
+    def _cached_answer(self, question: str, k: int):
+        """Return (cached answer or None, question vector). The vector is reused by retrieval via the query cache."""
+        if self.answer_cache is None:
+            return None, None
+        with stage("rag", "answer_cache"):
+            vector = self.vector_store.embedding.embed_query(question)
+            return self.answer_cache.lookup(vector, k), vector
+
+    async def _acached_answer(self, question: str, k: int):
+        if self.answer_cache is None:
+            return None, None
+        with stage("rag", "answer_cache"):
+            vector = await self.vector_store.embedding.aembed_query(question)
+            return self.answer_cache.lookup(vector, k), vector
+
+    def _remember(self, vector, k: int, answer: str, source_ids: list):
+        if self.answer_cache is not None and vector is not None and answer and source_ids:
+            self.answer_cache.put(vector, k, answer, source_ids)
+
+    def ask(self, question: str, k: int = 3) -> str:
+        """Ask a question and get an answer based on the document content."""
+        if not self.setup_complete:
+            return "Error: RAG system not set up. Call setup() first."
+        
+        try:
+            cached, vector = self._cached_answer(question, k)
+            if cached is not None:
+                return cached
+
+            prompt, message, source_ids = self._retrieve(question, k)
+            if prompt is None:
+                return message
 
             # Generate response
             print("Generating answer...")
-            response = self.llm.invoke(prompt)
+            with stage("rag", "generate"):
+                response = self.llm.invoke(prompt)
+            self._remember(vector, k, response.content, source_ids)
             return response.content
             
         except Exception as e:
             return f"Error processing question: {e}"
 
+    def ask_stream(self, question: str, k: int = 3) -> Iterator[str]:
+        """Like ask(), but returns the answer as a stream of tokens.
+
+        Retrieval runs before this returns, so the first token is the first generated one.
+        """
+        if not self.setup_complete:
+            return iter(["Error: RAG system not set up. Call setup() first."])
+        
+        try:
+            cached, vector = self._cached_answer(question, k)
+            if cached is not None:
+                return iter([cached])
+            prompt, message, source_ids = self._retrieve(question, k)
+        except Exception as e:
+            return iter([f"Error processing question: {e}"])
+        if prompt is None:
+            return iter([message])
+
+        def tokens():
+            parts = []
+            with stage("rag", "generate"):
+                for chunk in self.llm.stream(prompt):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield chunk.content
+            self._remember(vector, k, "".join(parts), source_ids)
+
+        print("Generating answer...")
+        return tokens()
+
+    async def aask(self, question: str, k: int = 3) -> str:
+        """Async ask(): embedding, search and generation all await instead of blocking."""
+        if not self.setup_complete:
+            return "Error: RAG system not set up. Call setup() first."
+        
+        try:
+            cached, vector = await self._acached_answer(question, k)
+            if cached is not None:
+                return cached
+
+            prompt, message, source_ids = await self._aretrieve(question, k)
+            if prompt is None:
+                return message
+            with stage("rag", "generate"):
+                response = await self.llm.ainvoke(prompt)
+            self._remember(vector, k, response.content, source_ids)
+            return response.content
+        except Exception as e:
+            return f"Error processing question: {e}"
+
+    async def aask_stream(self, question: str, k: int = 3) -> AsyncIterator[str]:
+        """Async ask_stream(): awaits retrieval, then returns the async token stream."""
+        async def single(text: str):
+            yield text
+
+        if not self.setup_complete:
+            return single("Error: RAG system not set up. Call setup() first.")
+        
+        try:
+            cached, vector = await self._acached_answer(question, k)
+            if cached is not None:
+                return single(cached)
+            prompt, message, source_ids = await self._aretrieve(question, k)
+        except Exception as e:
+            return single(f"Error processing question: {e}")
+        if prompt is None:
+            return single(message)
+
+        async def tokens():
+            parts = []
+            with stage("rag", "generate"):
+                async for chunk in self.llm.astream(prompt):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield chunk.content
+            self._remember(vector, k, "".join(parts), source_ids)
+        return tokens()
+
+    def ask_many(self, questions: list, k: int = 3, concurrency: int = 4) -> list:
+        """Answer many questions: one batched retrieval, then generation on up to `concurrency` threads.
+
+        Returns one dict per question, in order: question, answer, error, cached and seconds
+        (time from the start of the batch until that answer was ready).
+        """
+        if not self.setup_complete:
+            return self._failed_items(questions, "RAG system not set up. Call setup() first.")
+        started = time.perf_counter()
+        try:
+            with stage("rag", "answer_cache"):
+                vectors = self.vector_store.embedding.embed_queries(questions) if self.answer_cache else None
+                items, pending = self._cached_items(questions, vectors, k, started)
+            with stage("rag", "retrieve"):
+                results = self.vector_store.find_similar_texts_batch(
+                    [questions[i] for i in pending], k=k
+                ) if pending else []
+            jobs = self._prompt_items(items, pending, results, started)
+        except Exception as e:
+            return self._failed_items(questions, f"Error processing questions: {e}")
+
+        def generate(job):
+            i, prompt, source_ids = job
+            try:
+                with stage("rag", "generate"):
+                    items[i]["answer"] = self.llm.invoke(prompt).content
+                self._remember(vectors[i] if vectors else None, k, items[i]["answer"], source_ids)
+            except Exception as e:
+                items[i]["error"] = f"Error processing question: {e}"
+            items[i]["seconds"] = time.perf_counter() - started
+
+        if jobs:
+            # Each worker runs in a copy of this context, so its stages count towards the caller's trace
+            contexts = [copy_context() for _ in jobs]
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(jobs)))) as pool:
+                list(pool.map(lambda context, job: context.run(generate, job), contexts, jobs))
+        return items
+
+    async def aask_many(self, questions: list, k: int = 3, concurrency: int = 4) -> list:
+        """Async ask_many(): generation runs as concurrent ainvoke calls, at most `concurrency` at a time."""
+        if not self.setup_complete:
+            return self._failed_items(questions, "RAG system not set up. Call setup() first.")
+        started = time.perf_counter()
+        try:
+            with stage("rag", "answer_cache"):
+                vectors = await self.vector_store.embedding.aembed_queries(questions) if self.answer_cache else None
+                items, pending = self._cached_items(questions, vectors, k, started)
+            with stage("rag", "retrieve"):
+                results = await self.vector_store.afind_similar_texts_batch(
+                    [questions[i] for i in pending], k=k
+                ) if pending else []
+            jobs = self._prompt_items(items, pending, results, started)
+        except Exception as e:
+            return self._failed_items(questions, f"Error processing questions: {e}")
+
+        # The model server, not the HTTP layer, sets the pace: cap in-flight generations
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def generate(job):
+            i, prompt, source_ids = job
+            async with semaphore:
+                try:
+                    with stage("rag", "generate"):
+                        items[i]["answer"] = (await self.llm.ainvoke(prompt)).content
+                    self._remember(vectors[i] if vectors else None, k, items[i]["answer"], source_ids)
+                except Exception as e:
+                    items[i]["error"] = f"Error processing question: {e}"
+            items[i]["seconds"] = time.perf_counter() - started
+
+        await asyncio.gather(*(generate(job) for job in jobs))
+        return items
+
+    def _cached_items(self, questions: list, vectors, k: int, started: float):
+        """Build the result items, filling in cached answers; return (items, indices still to answer)."""
+        items, pending = [], []
+        for i, question in enumerate(questions):
+            cached = self.answer_cache.lookup(vectors[i], k) if vectors else None
+            items.append({"question": question, "answer": cached, "error": None,
+                          "cached": cached is not None, "seconds": time.perf_counter() - started})
+            if cached is None:
+                pending.append(i)
+        return items, pending
+
+    def _prompt_items(self, items: list, pending: list, results, started: float) -> list:
+        """Return (index, prompt, source_ids) for every pending item that has context to answer from."""
+        if results is None:
+            raise RuntimeError("vector search failed")
+        jobs = []
+        for i, docs in zip(pending, results):
+            prompt, message, source_ids = self._build_prompt(items[i]["question"], docs)
+            if prompt is None:
+                items[i]["answer"] = message
+                items[i]["seconds"] = time.perf_counter() - started
+            else:
+                jobs.append((i, prompt, source_ids))
+        return jobs
+
+    def _failed_items(self, questions: list, error: str) -> list:
+        return [{"question": q, "answer": None, "error": error, "cached": False, "seconds": 0.0} for q in questions]
+
     def chat_loop(self):
         """Start an interactive chat session."""
         if not self.setup_complete:
@@ -112,15 +368,7 @@ class RAGApp:
             return False
         
         try:
-            # Temporarily change file path
-            original_path = self.vector_store.file_path
-            self.vector_store.file_path = new_file_path
-            
-            # Add new document
-            self.vector_store.add_texts_to_collection()
-            
-            # Restore original path
-            self.vector_store.file_path = original_path
+            self.vector_store.add_texts_to_collection(new_file_path)
             
             print(f"Successfully added document: {new_file_path}")
             return True
@@ -129,6 +377,20 @@ class RAGApp:
             print(f"Error adding document: {e}")
             return False
 
+    def add_documents(self, file_paths: list, progress=None, names: dict | None = None, errors: dict | None = None) -> int:
+        """Add several documents at once, parsing them in parallel. Returns how many were added.
+
+        names and errors are passed to QdrantVector.add_files: errors receives the files that
+        failed, and vector store or embedding failures raise.
+        """
+        if not self.setup_complete:
+            raise RuntimeError("RAG system is not set up")
+
+        indexed = self.vector_store.add_files(file_paths, progress=progress, names=names, errors=errors)
+        for path in indexed:
+            print(f"Successfully added document: {path}")
+        return len(indexed)
+
 
 def main():
     # Configuration
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List
+
+import numpy as np
+
+from metrics import record_cache
+
+
+class SemanticAnswerCache:
+    """Bounded cache of question embedding -> (answer, source chunk IDs).
+
+    A lookup hits when a cached question for the same k has cosine similarity at
+    or above the threshold. Entries are dropped when any of their source chunks is
+    re-ingested or deleted, and least recently used entries are evicted past max_entries.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float | None = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()  # entry_id -> dict
+        self._by_source: dict = {}  # chunk_id -> {entry_id}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, vector: List[float], k: int) -> str | None:
+        query = _unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, self.threshold
+            expired = []
+            for entry_id, entry in self._entries.items():
+                if self.ttl_seconds is not None and now - entry["stored_at"] >= self.ttl_seconds:
+                    expired.append(entry_id)
+                    continue
+                if entry["k"] != k or entry["vector"].shape != query.shape:
+                    continue
+                score = float(entry["vector"] @ query)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            for entry_id in expired:
+                self._drop(entry_id)
+            if best_id is None:
+                self.misses += 1
+                record_cache("answer", misses=1)
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            record_cache("answer", hits=1)
+            return self._entries[best_id]["answer"]
+
+    def put(self, vector: List[float], k: int, answer: str, source_ids: Iterable):
+        sources = {str(s) for s in source_ids}
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "vector": _unit(vector),
+                "k": k,
+                "answer": answer,
+                "sources": sources,
+                "stored_at": time.monotonic(),
+            }
+            for source in sources:
+                self._by_source.setdefault(source, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_sources(self, source_ids: Iterable):
+        """Drop every answer built from any of these chunk IDs."""
+        with self._lock:
+            for source in source_ids:
+                for entry_id in list(self._by_source.get(str(source), ())):
+                    self._drop(entry_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_source.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        for source in entry["sources"]:
+            ids = self._by_source.get(source)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._by_source[source]
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
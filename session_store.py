@@ -0,0 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+
+BOOKING_FIELDS = ["name", "email", "phone", "date"]
+
+
+class Session:
+    """One chat user's booking state and recent history.
+
+    History is a ring buffer: only the last history_size messages are kept.
+    """
+
+    def __init__(self, session_id: str, data: dict | None = None, history_size: int = 50):
+        self.id = session_id
+        data = data or {}
+        self.data = {
+            "booking": {field: (data.get("booking") or {}).get(field) for field in BOOKING_FIELDS},
+            "booking_active": bool(data.get("booking_active", False)),
+            "history": deque(data.get("history") or [], maxlen=history_size),
+        }
+
+    def update_booking(self, field: str, value: str):
+        self.data["booking"][field] = value
+        print(f"Saved: {field} = {value}")
+
+    def is_booking_complete(self) -> bool:
+        return all(self.data["booking"].values())
+
+    def get_next_field(self) -> str:
+        for field in BOOKING_FIELDS:
+            if not self.data["booking"][field]:
+                return field
+        return None
+
+    def add_message(self, role: str, content: str):
+        self.data["history"].append({"role": role, "content": content})
+
+    def to_dict(self) -> dict:
+        return {**self.data, "history": list(self.data["history"])}
+
+
+class SessionStore(ABC):
+    """Where sessions live between requests. get() returns a fresh Session for unknown or expired IDs."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Session:
+        ...
+
+    @abstractmethod
+    def save(self, session: Session):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process store: least recently used sessions are evicted past max_sessions, idle ones after the TTL."""
+
+    def __init__(self, max_sessions: int = 10_000, ttl_seconds: float | None = 24 * 3600, history_size: int = 50):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+        self._sessions: OrderedDict = OrderedDict()  # session_id -> (Session, last_used)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and (self.ttl_seconds is None or now - entry[1] < self.ttl_seconds):
+                self._sessions[session_id] = (entry[0], now)
+                self._sessions.move_to_end(session_id)
+                return entry[0]
+            session = Session(session_id, history_size=self.history_size)
+            self._put(session, now)
+            return session
+
+    def save(self, session: Session):
+        with self._lock:
+            self._put(session, time.monotonic())
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _put(self, session: Session, now: float):
+        self._sessions[session.id] = (session, now)
+        self._sessions.move_to_end(session.id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions as JSON rows in SQLite, shared by every worker process that opens the same file."""
+
+    def __init__(self, path: str = ".cache/sessions.sqlite", ttl_seconds: float | None = 24 * 3600,
+                 history_size: int = 50):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        # WAL lets readers in other workers proceed while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, "
+                           "updated_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+        self._conn.commit()
+        self._saves = 0
+
+    def get(self, session_id: str) -> Session:
+        with self._lock:
+            row = self._conn.execute("SELECT data, updated_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None or self._expired(row[1], time.time()):
+            return Session(session_id, history_size=self.history_size)
+        return Session(session_id, json.loads(row[0]), history_size=self.history_size)
+
+    def save(self, session: Session):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, updated_at) VALUES (?, ?, ?)",
+                (session.id, json.dumps(session.to_dict()), now),
+            )
+            self._saves += 1
+            # Sweep idle sessions now and then rather than on every write
+            if self.ttl_seconds is not None and self._saves % 100 == 0:
+                self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl_seconds,))
+            self._conn.commit()
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    def _expired(self, updated_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - updated_at >= self.ttl_seconds
+
+
+def create_session_store() -> SessionStore:
+    """Build the store selected by SESSION_BACKEND ("memory", the default, or "sqlite")."""
+    backend = os.environ.get("SESSION_BACKEND", "memory")
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.environ.get("SESSION_DB", ".cache/sessions.sqlite"))
+    if backend != "memory":
+        raise ValueError(f"Unknown session backend '{backend}', expected 'memory' or 'sqlite'")
+    return MemorySessionStore()
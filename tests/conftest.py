@@ -12,16 +12,37 @@ if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 # ---- Dummy implementations strictly matching your method signatures ----
-# agent.ChatBot.chat(self, message: str) -> str
+# agent.ChatBot.chat(self, message: str, session_id: str = "default") -> str,
+# chat_stream(self, message: str, session_id: str = "default") -> Iterator[str],
+# their async twins achat / achat_stream (awaited, returns an async iterator), and warmup() -> bool
 class _DummyChatBot:
     def __init__(self):
         self.calls = []
 
-    def chat(self, message: str) -> str:
-        self.calls.append(message)
+    def chat(self, message: str, session_id: str = "default") -> str:
+        self.calls.append((session_id, message))
         return f"echo: {message}"
 
-# rag_app.RAGApp.setup(), ask(question: str, k: int = 3), add_document(new_file_path: str)
+    def chat_stream(self, message: str, session_id: str = "default"):
+        self.calls.append((session_id, message))
+        return iter(["echo: ", message])
+
+    async def achat(self, message: str, session_id: str = "default") -> str:
+        return self.chat(message, session_id=session_id)
+
+    async def achat_stream(self, message: str, session_id: str = "default"):
+        async def tokens():
+            for token in self.chat_stream(message, session_id=session_id):
+                yield token
+        return tokens()
+
+    def warmup(self) -> bool:
+        return True
+
+# rag_app.RAGApp.setup(), ask(question: str, k: int = 3), ask_stream(question: str, k: int = 3),
+# add_document(new_file_path: str),
+# add_documents(file_paths: list, progress=None, names=None, errors=None) -> int, async aask / aask_stream,
+# ask_many(questions: list, k: int = 3, concurrency: int = 4) / aask_many(...), and warmup() -> bool
 class _DummyRAG:
     def __init__(self):
         self.documents = []
@@ -30,20 +51,75 @@ class _DummyRAG:
     def setup(self):
         self.setup_called = True
 
+    def warmup(self) -> bool:
+        return True
+
     def ask(self, question: str, k: int = 3):
         return f"answer({k}): {question}"
 
+    def ask_stream(self, question: str, k: int = 3):
+        return iter([f"answer({k}): ", question])
+
+    async def aask(self, question: str, k: int = 3):
+        return self.ask(question, k=k)
+
+    async def aask_stream(self, question: str, k: int = 3):
+        async def tokens():
+            for token in self.ask_stream(question, k=k):
+                yield token
+        return tokens()
+
+    def ask_many(self, questions: list, k: int = 3, concurrency: int = 4):
+        return [
+            {"question": q, "answer": self.ask(q, k=k), "error": None, "cached": False, "seconds": 0.0}
+            for q in questions
+        ]
+
+    async def aask_many(self, questions: list, k: int = 3, concurrency: int = 4):
+        return self.ask_many(questions, k=k, concurrency=concurrency)
+
     def add_document(self, new_file_path: str):
         self.documents.append(new_file_path)
         return True
 
-# vectorStore.QdrantVector.find_similar_texts(self, query: str, k: int = 3)
+    def add_documents(self, file_paths: list, progress=None, names=None, errors=None):
+        added = 0
+        for path in file_paths:
+            # Files starting with "FAIL" stand in for ones that cannot be parsed
+            with open(path, "rb") as f:
+                if f.read(4) == b"FAIL":
+                    if errors is not None:
+                        errors[path] = "cannot parse"
+                    continue
+            self.add_document(path)
+            added += 1
+        return added
+
+# vectorStore.QdrantVector.find_similar_texts(self, query: str, k: int = 3, mode: str = "dense"), afind_similar_texts(...)
+# find_similar_texts_batch(self, queries: list, k: int = 3, mode: str = "dense") / afind_similar_texts_batch(...),
+# check_collection() -> bool and close()
 class _DummyVector:
     def __init__(self):
-        pass
+        self.collection_name = "metacloud"
+        self.closed = False
+
+    def check_collection(self) -> bool:
+        return True
+
+    def close(self):
+        self.closed = True
+
+    def find_similar_texts(self, query: str, k: int = 3, mode: str = "dense"):
+        return [{"text": f"match: {query}", "k": k, "mode": mode}]
+
+    async def afind_similar_texts(self, query: str, k: int = 3, mode: str = "dense"):
+        return self.find_similar_texts(query, k=k, mode=mode)
+
+    def find_similar_texts_batch(self, queries: list, k: int = 3, mode: str = "dense"):
+        return [self.find_similar_texts(query, k=k, mode=mode) for query in queries]
 
-    def find_similar_texts(self, query: str, k: int = 3):
-        return [{"text": f"match: {query}", "k": k}]
+    async def afind_similar_texts_batch(self, queries: list, k: int = 3, mode: str = "dense"):
+        return self.find_similar_texts_batch(queries, k=k, mode=mode)
 
 @pytest.fixture(autouse=True)
 def inject_dummy_modules(monkeypatch):
@@ -56,6 +132,7 @@ def inject_dummy_modules(monkeypatch):
 
     m_vs = types.ModuleType("vectorStore")
     m_vs.QdrantVector = _DummyVector
+    m_vs.get_vector_store = lambda **kwargs: _DummyVector()
 
     monkeypatch.setitem(sys.modules, "agent", m_agent)
     monkeypatch.setitem(sys.modules, "rag_app", m_rag)
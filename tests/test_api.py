@@ -1,6 +1,11 @@
 
 import io
 import json
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
 
 def test_health(client):
     r = client.get("/health")
@@ -22,6 +27,41 @@ def test_chat_echo(client):
     assert "reply" in data
     assert data["reply"] == "echo: hello bot"
 
+def test_chat_session_id(client):
+    first = client.post("/chat", json={"message": "hi"}).json()
+    assert first["session_id"]
+    again = client.post("/chat", json={"message": "hi", "session_id": first["session_id"]}).json()
+    assert again["session_id"] == first["session_id"]
+    other = client.post("/chat", json={"message": "hi"}).json()
+    assert other["session_id"] != first["session_id"]
+    r = client.post("/chat/stream", json={"message": "hi", "session_id": "abc"})
+    assert r.headers["x-session-id"] == "abc"
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines.get("event", "message"), json.loads(lines["data"])))
+    return events
+
+def test_chat_stream(client):
+    r = client.post("/chat/stream", json={"message": "hello bot"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(r.text)
+    assert "".join(data["token"] for name, data in events if name == "message") == "echo: hello bot"
+    assert events[-1][0] == "done"
+
+def test_chat_stream_failure_before_streaming_is_an_http_error(app, client, monkeypatch):
+    from conftest import _DummyChatBot
+
+    async def failing(self, message, session_id="default"):
+        raise ConnectionError("vector store unreachable")
+    monkeypatch.setattr(_DummyChatBot, "achat_stream", failing)
+    r = client.post("/chat/stream", json={"message": "what is this about?"})
+    assert r.status_code == 500
+    assert "vector store unreachable" in r.json()["detail"]
+
 def test_rag_ask_default_k(client):
     payload = {"question": "What is policy?"}
     r = client.post("/rag/ask", json=payload)
@@ -36,6 +76,13 @@ def test_rag_ask_custom_k(client):
     assert r.status_code == 200
     assert r.json()["answer"] == "answer(7): Explain refunds"
 
+def test_rag_ask_stream(client):
+    r = client.post("/rag/ask/stream", json={"question": "Explain refunds", "k": 5})
+    assert r.status_code == 200
+    events = _sse_events(r.text)
+    assert "".join(data["token"] for name, data in events if name == "message") == "answer(5): Explain refunds"
+    assert events[-1][0] == "done"
+
 def test_documents_search_default_k(client):
     payload = {"query": "refund policy"}
     r = client.post("/documents/search", json=payload)
@@ -53,18 +100,56 @@ def test_documents_search_custom_k(client):
     data = r.json()
     assert data["results"][0]["k"] == 10
 
+def test_documents_search_modes(client):
+    r = client.post("/documents/search", json={"query": "ERR-404", "mode": "lexical"})
+    assert r.status_code == 200
+    assert r.json()["results"][0]["mode"] == "lexical"
+    assert client.post("/documents/search", json={"query": "q"}).json()["results"][0]["mode"] == "dense"
+    assert client.post("/documents/search", json={"query": "q", "mode": "fuzzy"}).status_code == 422
+
+def test_rag_ask_batch(client):
+    r = client.post("/rag/ask/batch", json={"questions": ["What is X?", "What is Y?"], "k": 2})
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert [item["answer"] for item in body["results"]] == ["answer(2): What is X?", "answer(2): What is Y?"]
+    assert all(item["error"] is None for item in body["results"])
+    assert body["seconds"] >= 0
+    assert client.post("/rag/ask/batch", json={"questions": ["q"], "concurrency": 0}).status_code == 422
+
+def test_documents_search_batch(client):
+    payload = {"queries": ["refund policy", "cancellations"], "k": 5, "mode": "hybrid"}
+    r = client.post("/documents/search/batch", json=payload)
+    assert r.status_code == 200, r.text
+    results = r.json()["results"]
+    assert [res[0]["text"] for res in results] == ["match: refund policy", "match: cancellations"]
+    assert results[1][0]["k"] == 5 and results[1][0]["mode"] == "hybrid"
+    assert client.post("/documents/search/batch", json={"queries": []}).status_code == 422
+
+def _wait_for_job(client, job_id, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        r = client.get(f"/documents/jobs/{job_id}")
+        assert r.status_code == 200, r.text
+        job = r.json()
+        if job["status"] in ("succeeded", "partial", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
 def test_documents_upload_single_file(client):
     # Build a small in-memory text file
     f = io.BytesIO(b"hello world")
     f.name = "doc.txt"
     files = [("files", ("doc.txt", f, "text/plain"))]
     r = client.post("/documents/upload", files=files)
-    assert r.status_code == 200, r.text
+    assert r.status_code == 202, r.text
     body = r.json()
     assert "uploaded_files" in body
-    assert "added_count" in body
-    assert body["added_count"] == 1
+    assert "job_id" in body
     assert len(body["uploaded_files"]) == 1
+    job = _wait_for_job(client, body["job_id"])
+    assert job["status"] == "succeeded"
+    assert job["added_count"] == 1
 
 def test_documents_upload_multiple_files(client):
     f1 = io.BytesIO(b"alpha")
@@ -76,7 +161,106 @@ def test_documents_upload_multiple_files(client):
         ("files", ("b.txt", f2, "text/plain")),
     ]
     r = client.post("/documents/upload", files=files)
-    assert r.status_code == 200, r.text
+    assert r.status_code == 202, r.text
     body = r.json()
-    assert body["added_count"] == 2
     assert len(body["uploaded_files"]) == 2
+    job = _wait_for_job(client, body["job_id"])
+    assert job["added_count"] == 2
+    assert job["files"] == body["uploaded_files"]
+
+def test_documents_jobs_list_and_unknown(client):
+    f = io.BytesIO(b"gamma")
+    r = client.post("/documents/upload", files=[("files", ("c.txt", f, "text/plain"))])
+    job_id = r.json()["job_id"]
+    _wait_for_job(client, job_id)
+    listed = client.get("/documents/jobs").json()["jobs"]
+    assert job_id in [j["job_id"] for j in listed]
+    assert client.get("/documents/jobs/does-not-exist").status_code == 404
+
+def test_documents_upload_reports_failed_files(client):
+    files = [
+        ("files", ("good.txt", io.BytesIO(b"fine"), "text/plain")),
+        ("files", ("bad.txt", io.BytesIO(b"FAIL"), "text/plain")),
+    ]
+    job = _wait_for_job(client, client.post("/documents/upload", files=files).json()["job_id"])
+    assert job["status"] == "partial"
+    assert job["added_count"] == 1
+    assert job["errors"] == {"uploads/bad.txt": "cannot parse"}
+
+    r = client.post("/documents/upload", files=[("files", ("bad.txt", io.BytesIO(b"FAIL"), "text/plain"))])
+    job = _wait_for_job(client, r.json()["job_id"])
+    assert job["status"] == "failed"
+    assert "bad.txt" in job["error"]
+
+def test_documents_upload_failing_ingest_fails_job(app, client, monkeypatch):
+    import main
+
+    def broken_rag():
+        raise RuntimeError("Qdrant is down")
+    monkeypatch.setattr(main, "get_rag", broken_rag)
+    job = _wait_for_job(client, client.post(
+        "/documents/upload", files=[("files", ("a.txt", io.BytesIO(b"alpha"), "text/plain"))]).json()["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "Qdrant is down"
+
+def test_documents_upload_isolates_files(app, client):
+    import main
+
+    # Same name twice, and a name trying to escape the upload directory
+    bodies = [
+        client.post("/documents/upload", files=[("files", (name, io.BytesIO(b"x"), "text/plain"))]).json()
+        for name in ("same.txt", "same.txt", "../../escape.txt")
+    ]
+    # The response names files as they are recorded, not by their temporary paths
+    assert [body["uploaded_files"] for body in bodies] == [["uploads/same.txt"], ["uploads/same.txt"],
+                                                           ["uploads/escape.txt"]]
+    for body in bodies:
+        assert _wait_for_job(client, body["job_id"])["status"] == "succeeded"
+    paths = main.get_rag().documents
+    assert len(set(paths)) == 3
+    assert [os.path.basename(p) for p in paths] == ["same.txt", "same.txt", "escape.txt"]
+    assert all(os.path.dirname(p) != tempfile.gettempdir() for p in paths)
+    # Each job's directory is removed once it has run
+    assert not any(os.path.exists(p) for p in paths)
+
+def test_metrics_and_trace_id(client):
+    r = client.get("/health")
+    assert len(r.headers["x-trace-id"]) == 32
+    r = client.get("/health", headers={"X-Trace-ID": "abc123"})
+    assert r.headers["x-trace-id"] == "abc123"
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'chatbot_http_requests_total{method="GET",route="/health",status="200"}' in r.text
+    assert 'chatbot_http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}' in r.text
+
+def _wait_for_ready(client, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        r = client.get("/ready")
+        if r.json()["status"] == status:
+            return r
+        time.sleep(0.01)
+    raise AssertionError(f"/ready never reached {status}: {r.json()}")
+
+def test_ready_after_startup_warmup(app, client):
+    # Without the lifespan (no `with`), nothing has warmed up yet
+    r = client.get("/ready")
+    assert r.status_code == 503
+    assert r.json()["status"] == "starting"
+    with TestClient(app) as started:
+        r = _wait_for_ready(started, "ready")
+        assert r.status_code == 200
+        steps = r.json()["steps"]
+        assert all(step["ok"] for step in steps.values())
+        assert {"vector_store", "rag", "collection", "chatbot", "models"} <= set(steps)
+    assert client.get("/health").status_code == 200
+
+def test_ready_reports_failed_step(app, client, monkeypatch):
+    from conftest import _DummyVector
+    monkeypatch.setattr(_DummyVector, "check_collection", lambda self: False)
+    with TestClient(app) as started:
+        r = _wait_for_ready(started, "failed")
+        assert r.status_code == 503
+        step = r.json()["steps"]["collection"]
+        assert step["ok"] is False and "metacloud" in step["error"]
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from chunkers import (
+    CHUNKERS,
+    Chunker,
+    PageChunker,
+    RecursiveChunker,
+    SentenceChunker,
+    TokenChunker,
+    get_chunker,
+)
+from context_packer import estimate_tokens
+
+WORDS = ["booking", "room", "guest", "check-in", "breakfast", "parking", "pool", "late", "the", "a"]
+
+
+def sentences(count: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    out = []
+    for i in range(count):
+        words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))
+        out.append(words.capitalize() + rng.choice([".", "!", "?"]))
+        if i % 7 == 6:
+            out.append("\n\n")
+    return " ".join(out)
+
+
+# An unbroken run longer than any chunk, so chunkers must cut inside a word
+SEGMENTS = [sentences(200, seed=1), "x" * 5000, sentences(50, seed=2)]
+
+SMALL = {
+    "recursive": dict(chunk_size=200, chunk_overlap=20),
+    "token": dict(chunk_tokens=40, overlap_tokens=5),
+    "sentence": dict(chunk_size=200, chunk_overlap=40),
+    "page": dict(chunk_size=300, chunk_overlap=30),
+}
+
+
+def size_limit(chunker: Chunker) -> tuple:
+    if isinstance(chunker, TokenChunker):
+        return estimate_tokens, chunker.chunk_tokens
+    return len, chunker.chunk_size
+
+
+def test_chunker_is_abstract():
+    with pytest.raises(TypeError):
+        Chunker()
+
+
+@pytest.mark.parametrize("name", sorted(CHUNKERS))
+@pytest.mark.parametrize("options", ["default", "small"])
+def test_chunks_stay_within_size_limit(name, options):
+    chunker = get_chunker(name, **(SMALL[name] if options == "small" else {}))
+    measure, limit = size_limit(chunker)
+
+    chunks = list(chunker.split(SEGMENTS))
+
+    assert len(chunks) > 1
+    assert all(chunk.strip() for chunk in chunks)
+    assert max(measure(chunk) for chunk in chunks) <= limit
+
+
+def test_page_chunks_do_not_span_pages():
+    pages = [f"page{i} " + sentences(10, seed=i) for i in range(5)]
+    chunks = list(PageChunker(chunk_size=150, chunk_overlap=20).split(pages))
+
+    for chunk in chunks:
+        assert sum(chunk in page for page in pages) >= 1
+
+
+@pytest.mark.parametrize(
+    "cls,changes",
+    [
+        (RecursiveChunker, [dict(chunk_size=500), dict(chunk_overlap=0)]),
+        (TokenChunker, [dict(chunk_tokens=128), dict(overlap_tokens=0)]),
+        (SentenceChunker, [dict(chunk_size=500), dict(chunk_overlap=0)]),
+        (PageChunker, [dict(chunk_size=500), dict(chunk_overlap=0)]),
+    ],
+)
+def test_key_changes_with_settings(cls, changes):
+    default = cls()
+    keys = {default.key} | {cls(**change).key for change in changes}
+
+    assert len(keys) == len(changes) + 1
+    assert cls().key == default.key
+    assert all(key.startswith(cls.name) for key in keys)
+
+
+def test_keys_differ_between_strategies():
+    assert len({cls().key for cls in CHUNKERS.values()}) == len(CHUNKERS)
+    # Same settings, different strategy
+    assert RecursiveChunker(1000, 150).key != SentenceChunker(1000, 150).key
+
+
+def test_get_chunker():
+    assert isinstance(get_chunker(), RecursiveChunker)
+    assert get_chunker("sentence", chunk_size=300).chunk_size == 300
+    chunker = TokenChunker()
+    assert get_chunker(chunker) is chunker
+    with pytest.raises(ValueError, match="Unknown chunker"):
+        get_chunker("nope")
@@ -0,0 +1,90 @@
+import random
+
+from langchain_core.documents import Document
+
+from chunkers import RecursiveChunker
+from context_packer import ContextPacker, estimate_tokens
+
+
+def doc(text: str, source: str = "a.pdf", chunk: int | None = None) -> Document:
+    metadata = {"source": source}
+    if chunk is not None:
+        metadata["chunk"] = chunk
+    return Document(page_content=text, metadata=metadata)
+
+
+def words(n: int, start: int = 0) -> str:
+    return " ".join(f"word{i}" for i in range(start, start + n))
+
+
+def total_tokens(packed) -> int:
+    return sum(estimate_tokens(d.page_content) for d in packed)
+
+
+def test_budget_is_never_exceeded():
+    docs = [doc(words(40, start=i * 100), chunk=i) for i in range(20)]
+    for budget in (10, 64, 100, 333, 1000):
+        packed = ContextPacker(max_tokens=budget, min_tail_tokens=16).pack(docs)
+        assert packed
+        assert total_tokens(packed) <= budget
+
+
+def test_oversized_best_chunk_is_cut_not_dropped():
+    big = doc(words(500), chunk=0)
+    packed = ContextPacker(max_tokens=50, min_tail_tokens=64).pack([big, doc("small", chunk=1)])
+    assert len(packed) == 1
+    assert packed[0].page_content.startswith("word0 word1")
+    assert packed[0].page_content.endswith(" …")
+    assert estimate_tokens(packed[0].page_content) <= 50
+
+
+def test_tail_chunk_needs_min_tail_tokens():
+    first, second = doc(words(30), chunk=0), doc(words(100, start=500), chunk=1)
+    budget = estimate_tokens(first.page_content) + 20
+    assert len(ContextPacker(max_tokens=budget, min_tail_tokens=64).pack([first, second])) == 1
+    packed = ContextPacker(max_tokens=budget, min_tail_tokens=10).pack([first, second])
+    assert len(packed) == 2 and packed[1].page_content.endswith(" …")
+
+
+def test_duplicates_and_contained_chunks_are_dropped():
+    text = words(30)
+    packed = ContextPacker().pack([doc(text, chunk=0), doc(text, chunk=0), doc(words(5, start=3), chunk=0)])
+    assert [d.page_content for d in packed] == [text]
+
+
+def test_overlap_between_neighbouring_chunks_is_removed():
+    rng = random.Random(0)
+    vocabulary = "the guest booked a room with late check-in and parking near the pool".split()
+    text = " ".join(rng.choice(vocabulary) for _ in range(2000))
+    chunks = list(RecursiveChunker().split([text]))
+    docs = [doc(chunk, chunk=i) for i, chunk in enumerate(chunks)]
+    rng.shuffle(docs)
+
+    packed = ContextPacker(max_tokens=10_000).pack(docs)
+
+    # Every chunk is kept and, with the overlaps cut, they join back into the original text
+    assert len(packed) == len(chunks)
+    assert " ".join(d.page_content for d in packed) == text
+
+
+def test_overlap_is_only_cut_between_neighbours():
+    first, second = "booked a late room", "late room with parking"
+    for other in (doc(second, "b.pdf", 1), doc(second, chunk=5)):
+        packed = ContextPacker().pack([doc(first, chunk=0), other])
+        assert [d.page_content for d in packed] == [first, second]
+    # Part of a word is not an overlap
+    packed = ContextPacker().pack([doc("the parking", chunk=0), doc("king size bed", chunk=1)])
+    assert [d.page_content for d in packed] == ["the parking", "king size bed"]
+
+
+def test_packed_chunks_read_in_document_order():
+    docs = [doc("third part here", "a.pdf", 2), doc("other file text", "b.pdf", 0),
+            doc("first part here", "a.pdf", 0), doc("no position text", "a.pdf")]
+    packed = ContextPacker().pack(docs)
+    assert [d.page_content for d in packed] == ["first part here", "third part here", "no position text",
+                                                "other file text"]
+
+
+def test_empty_input_packs_nothing():
+    assert ContextPacker().pack([]) == []
+    assert ContextPacker().pack([doc("   ")]) == []
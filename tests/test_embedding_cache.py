@@ -0,0 +1,147 @@
+import pytest
+
+import embedding_cache
+from benchmark_support import HashingEmbeddings
+from embedding_cache import CachedEmbeddings, EmbeddingCache, QueryEmbeddingCache, normalize_query, text_hash
+from metrics import CACHE_LOOKUPS
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self, dim: int = 8):
+        super().__init__(dim=dim)
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().embed_documents(texts)
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        self.now += 1
+        return self.now
+
+
+def lookups(cache: str) -> tuple:
+    values = CACHE_LOOKUPS._values
+    return values.get((cache, "hit"), 0), values.get((cache, "miss"), 0)
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_vectors_are_keyed_by_model(cache):
+    h = text_hash("the same chunk")
+    cache.put_many("model-a", {h: [1.0, 0.0]})
+    cache.put_many("model-b", {h: [0.0, 1.0]})
+
+    assert cache.get_many("model-a", [h]) == {h: [1.0, 0.0]}
+    assert cache.get_many("model-b", [h]) == {h: [0.0, 1.0]}
+    assert cache.get_many("model-c", [h]) == {}
+    assert len(cache) == 2
+
+
+def test_same_text_under_two_models_is_embedded_by_each(cache):
+    first, second = CountingEmbeddings(dim=8), CountingEmbeddings(dim=4)
+    a = CachedEmbeddings(first, cache, model_name="model-a", queries=None)
+    b = CachedEmbeddings(second, cache, model_name="model-b", queries=None)
+
+    assert len(a.embed_documents(["chunk"])[0]) == 8
+    assert len(b.embed_documents(["chunk"])[0]) == 4
+    assert len(a.embed_documents(["chunk"])[0]) == 8
+    assert first.embedded == ["chunk"] and second.embedded == ["chunk"]
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(embedding_cache.time, "time", Clock())
+    for name in ("a", "b", "c"):
+        cache.put_many("m", {name: [1.0]})
+    # Reading a makes b the least recently used
+    assert cache.get_many("m", ["a"]) == {"a": [1.0]}
+    cache.put_many("m", {"d": [1.0]})
+
+    assert len(cache) == 3
+    assert set(cache.get_many("m", ["a", "b", "c", "d"])) == {"a", "c", "d"}
+
+
+def test_cache_survives_reopening(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache(path)
+    cache.put_many("m", {"a": [0.5, 0.25]})
+    cache.close()
+    cache = EmbeddingCache(path)
+    assert cache.get_many("m", ["a"]) == {"a": [0.5, 0.25]}
+    cache.close()
+
+
+def test_hits_and_misses_are_counted(cache):
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, cache, model_name="m", queries=None)
+    hits, misses = lookups("chunk_embedding")
+
+    first = embeddings.embed_documents(["one", "two", "one"])
+    assert lookups("chunk_embedding") == (hits, misses + 2)
+    second = embeddings.embed_documents(["one", "two", "three"])
+    assert lookups("chunk_embedding") == (hits + 2, misses + 3)
+
+    # Repeated and cached texts are never sent to the model again, and order is kept
+    assert inner.embedded == ["one", "two", "three"]
+    assert first[0] == first[2] == second[0]
+    assert first[1] == second[1]
+
+
+@pytest.mark.parametrize("query", ["What is Qdrant?", "  what is qdrant?", "WHAT IS\n\tQDRANT?", "what  is qdrant? "])
+def test_queries_are_normalized(query):
+    assert normalize_query(query) == "what is qdrant?"
+    queries = QueryEmbeddingCache()
+    queries.put("m", "What is Qdrant?", [1.0])
+    assert queries.get("m", query) == [1.0]
+    assert queries.get("other-model", query) is None
+
+
+def test_query_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now[0])
+    queries = QueryEmbeddingCache(ttl_seconds=60)
+    queries.put("m", "q", [1.0])
+    now[0] += 59
+    assert queries.get("m", "q") == [1.0]
+    now[0] += 1
+    assert queries.get("m", "q") is None
+    assert queries.stats()["size"] == 0
+
+    forever = QueryEmbeddingCache(ttl_seconds=None)
+    forever.put("m", "q", [1.0])
+    now[0] += 10 ** 9
+    assert forever.get("m", "q") == [1.0]
+
+
+def test_query_cache_evicts_least_recently_used():
+    queries = QueryEmbeddingCache(max_size=2)
+    queries.put("m", "a", [1.0])
+    queries.put("m", "b", [2.0])
+    assert queries.get("m", "a") == [1.0]
+    queries.put("m", "c", [3.0])
+
+    assert queries.get("m", "b") is None
+    assert queries.get("m", "a") == [1.0]
+    assert queries.get("m", "c") == [3.0]
+    assert queries.stats() == {"hits": 3, "misses": 1, "size": 2, "max_size": 2, "hit_rate": 0.75}
+
+
+def test_repeated_queries_are_embedded_once():
+    inner = CountingEmbeddings()
+    embeddings = CachedEmbeddings(inner, None, model_name="m", queries=QueryEmbeddingCache())
+    vector = embeddings.embed_query("Where is the pool?")
+    batch = embeddings.embed_queries(["where is the pool?", "Is there parking?", "is there  parking?"])
+
+    assert batch[0] == vector and batch[1] == batch[2]
+    # Queries that only differ in case or spacing are embedded once, in one batch call
+    assert inner.embedded == ["Is there parking?"]
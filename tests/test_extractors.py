@@ -0,0 +1,78 @@
+import pytest
+
+from extractors import ExtractionStats, extract_fields_fast, has_booking_details
+
+FIELDS = ["name", "email", "phone"]
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("My name is John Doe", {"name": "John Doe"}),
+    ("my name is john doe", {"name": "john doe"}),
+    ("Name: Maria Garcia", {"name": "Maria Garcia"}),
+    ("I'm Priya and my email is priya@example.com", {"name": "Priya", "email": "priya@example.com"}),
+    ("I am John Doe, phone +1 (555) 123-4567", {"name": "John Doe", "phone": "+1 (555) 123-4567"}),
+    ("This is Maria", {"name": "Maria"}),
+    ("Book an appointment for Jane Smith on Friday", {"name": "Jane Smith"}),
+    ("John O'Brien", {"name": "John O'Brien"}),
+    ("call me at 555-123-4567", {"phone": "555-123-4567"}),
+    ("reach me on 9876543210 or j.doe+work@mail.co.uk", {"phone": "9876543210", "email": "j.doe+work@mail.co.uk"}),
+])
+def test_extracts(message, expected):
+    assert extract_fields_fast(message, FIELDS) == expected
+
+
+@pytest.mark.parametrize("message, field", [
+    # Weak cues followed by ordinary words
+    ("I'm really keen to book an appointment", "name"),
+    ("I am interested in a booking", "name"),
+    ("this is about my appointment", "name"),
+    ("I'd like a slot for an hour", "name"),
+    ("It's Friday", "name"),
+    ("for March 5th please", "name"),
+    ("I'd like to book an appointment", "name"),
+    ("yes please", "name"),
+    # Short replies that are not names are left to the model
+    ("hmm", "name"),
+    ("cancel", "name"),
+    ("nevermind", "name"),
+    ("sorry", "name"),
+    ("why", "name"),
+    ("idk", "name"),
+    ("stop it", "name"),
+    ("Cancel that", "name"),
+    ("Sorry", "name"),
+    ("john doe", "name"),
+    # Dates and times are not phone numbers
+    ("meeting on 2024-05-06 10:30", "phone"),
+    ("06/05/2024 at 10:30 works", "phone"),
+    ("on 5.6.2024 9:00", "phone"),
+    ("order 12345", "phone"),
+    # The local part of an address is not a name
+    ("johndoe@example.com", "name"),
+])
+def test_does_not_extract(message, field):
+    assert field not in extract_fields_fast(message, FIELDS)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Book John Doe for Friday", True),
+    ("book for 2024-05-06", True),
+    ("I'd like to book an appointment", False),
+    ("I want to schedule something", False),
+    ("book, my email is a@b.io", True),
+])
+def test_has_booking_details(message, expected):
+    assert has_booking_details(message) is expected
+
+
+def test_extraction_stats():
+    stats = ExtractionStats()
+    stats.record("name", "fast")
+    stats.record("name", "llm")
+    stats.record("email", "fast")
+    stats.record_llm_call()
+    out = stats.stats()
+    assert out["name"] == {"fast": 1, "llm": 1, "missed": 0, "fast_hit_rate": 0.5}
+    assert out["overall"] == {"total": 3, "fast_hit_rate": 2 / 3, "llm_calls": 1}
+    stats.clear()
+    assert stats.stats()["overall"]["total"] == 0
@@ -0,0 +1,60 @@
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.add("1", "Qdrant stores vectors and payloads")
+    index.add("2", "The booking form asks for a phone number")
+    index.add("3", "Vectors vectors everywhere: dense vectors for every chunk")
+    index.add("4", "Phone bookings are confirmed by email", {"source": "faq.txt"})
+    return index
+
+
+def test_tokenize_lowercases_and_drops_punctuation():
+    assert tokenize("Hello, World! It's 2024.") == ["hello", "world", "it", "s", "2024"]
+
+
+def test_search_ranks_by_bm25():
+    index = make_index()
+    # Term frequency: doc 3 says "vectors" three times
+    assert [hit[0] for hit in index.search("vectors", k=5)] == ["3", "1"]
+    # Matching both query terms beats matching one
+    assert index.search("phone email", k=1)[0][0] == "4"
+    doc_id, score, text, metadata = index.search("phone email", k=1)[0]
+    assert score > 0 and text.startswith("Phone") and metadata == {"source": "faq.txt"}
+
+
+def test_rare_terms_weigh_more():
+    index = make_index()
+    index.add("5", "qdrant phone")
+    # "qdrant" appears in 2 of 5 docs, "phone" in 3: the rarer term has the higher idf
+    assert index.search("qdrant", k=1)[0][1] > index.search("phone", k=5)[-1][1]
+
+
+def test_search_without_matches_or_terms():
+    index = make_index()
+    assert index.search("nothing matches this", k=3) == []
+    assert index.search("", k=3) == []
+    assert BM25Index().search("vectors") == []
+
+
+def test_remove_and_replace():
+    index = make_index()
+    index.remove(["3", "missing"])
+    assert len(index) == 3
+    assert [hit[0] for hit in index.search("vectors", k=5)] == ["1"]
+    assert "everywhere" not in index._postings
+
+    # add() with an existing ID replaces the document and its terms
+    index.add("1", "Nothing about storage here")
+    assert index.search("vectors", k=5) == []
+    assert index._total_len == sum(index._doc_len.values())
+
+
+def test_reciprocal_rank_fusion_order():
+    # b: 1/62 + 1/61, a: 1/61 + 1/63, c: 1/63 + 1/62
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]], k=3) == ["b", "a", "c"]
+    # An ID near the top of both rankings beats one that tops only one of them
+    assert reciprocal_rank_fusion([["x", "y"], ["z", "y"]], k=1) == ["y"]
+    assert reciprocal_rank_fusion([["a", "b", "c"], []], k=2) == ["a", "b"]
+    assert reciprocal_rank_fusion([], k=3) == []
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, QueryRequest, VectorParams
+
+from numpy_store import NumpyIndexClient
+
+DIM = 16
+
+
+def points(vectors, start: int = 0) -> list:
+    return [PointStruct(id=start + i, vector=v.tolist(), payload={"n": start + i}) for i, v in enumerate(vectors)]
+
+
+def brute_force(vectors: dict, query: np.ndarray, k: int) -> list:
+    """(id, cosine) of the k stored vectors most similar to query."""
+    ids = list(vectors)
+    matrix = np.array([vectors[i] for i in ids], dtype=np.float64)
+    scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [(ids[i], float(scores[i])) for i in order]
+
+
+@pytest.fixture()
+def client(tmp_path):
+    client = NumpyIndexClient(str(tmp_path))
+    client.create_collection("c", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    return client
+
+
+def test_top_k_matches_brute_force_cosine(client):
+    rng = np.random.default_rng(0)
+    stored = dict(enumerate(rng.normal(size=(300, DIM))))
+    client.upsert("c", points(list(stored.values())))
+    # Overwrites and deletes leave holes and reused rows in the matrix
+    replaced = rng.normal(size=(20, DIM))
+    client.upsert("c", points(replaced, start=50))
+    stored.update({50 + i: v for i, v in enumerate(replaced)})
+    client.delete("c", list(range(100, 140)))
+    for i in range(100, 140):
+        del stored[i]
+    added = rng.normal(size=(10, DIM))
+    client.upsert("c", points(added, start=1000))
+    stored.update({1000 + i: v for i, v in enumerate(added)})
+
+    queries = rng.normal(size=(25, DIM))
+    responses = client.query_batch_points("c", [QueryRequest(query=q.tolist(), limit=10) for q in queries])
+    for query, response in zip(queries, responses):
+        expected = brute_force(stored, query, 10)
+        # Point IDs come back as strings, as QdrantVector's UUIDs are
+        assert [p.id for p in response.points] == [str(pid) for pid, _ in expected]
+        assert np.allclose([p.score for p in response.points], [s for _, s in expected], atol=1e-5)
+        assert [str(p.payload["n"]) for p in response.points] == [p.id for p in response.points]
+
+
+def test_top_k_matches_qdrant(client):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(200, DIM))
+    qdrant = QdrantClient(location=":memory:")
+    qdrant.create_collection("c", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    qdrant.upsert("c", points(vectors))
+    client.upsert("c", points(vectors))
+    for query in rng.normal(size=(10, DIM)).tolist():
+        ours = client.query_points("c", query=query, limit=5).points
+        theirs = qdrant.query_points("c", query=query, limit=5).points
+        assert [p.id for p in ours] == [str(p.id) for p in theirs]
+        assert np.allclose([p.score for p in ours], [p.score for p in theirs], atol=1e-5)
+
+
+def test_reopen_keeps_vectors_and_rejects_other_dim(client, tmp_path):
+    vectors = np.eye(DIM)[:3]
+    client.upsert("c", points(vectors))
+
+    reopened = NumpyIndexClient(str(tmp_path))
+    assert reopened.query_points("c", query=vectors[2].tolist(), limit=1).points[0].id == "2"
+    # Same dim: creating again is allowed and keeps the data
+    reopened.create_collection("c", vectors_config=VectorParams(size=DIM, distance=Distance.COSINE))
+    assert reopened.count("c").count == 3
+
+    with pytest.raises(ValueError, match="16-dimensional"):
+        NumpyIndexClient(str(tmp_path)).create_collection(
+            "c", vectors_config=VectorParams(size=DIM * 2, distance=Distance.COSINE))
+    with pytest.raises(ValueError, match="expected 16"):
+        reopened.upsert("c", [PointStruct(id=9, vector=[1.0] * (DIM + 1), payload={})])
@@ -0,0 +1,143 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+import rag_app
+from benchmark_support import HashingEmbeddings
+
+QUESTIONS = [f"What is item {i} about?" for i in range(8)]
+
+
+class StandInEmbeddings(HashingEmbeddings):
+    def embed_queries(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    async def aembed_queries(self, texts):
+        return self.embed_queries(texts)
+
+
+class StandInVectorStore:
+    """Returns one context chunk per question, named after it."""
+
+    def __init__(self):
+        self.embedding = StandInEmbeddings(dim=64)
+        self.batches = []
+
+    def add_change_listener(self, listener):
+        pass
+
+    def find_similar_texts_batch(self, queries, k=3, mode="dense"):
+        self.batches.append(list(queries))
+        return [[Document(page_content=f"Context for {q}", metadata={"source": q, "_id": q})] for q in queries]
+
+    async def afind_similar_texts_batch(self, queries, k=3, mode="dense"):
+        return self.find_similar_texts_batch(queries, k=k, mode=mode)
+
+
+class StandInLLM:
+    """Answers with the question from the prompt after a delay, recording how many calls overlap.
+
+    Earlier questions take longer, so answers finish out of order. Prompts mentioning
+    "item 3" fail.
+    """
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _start(self, prompt: str) -> float:
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        index = int(prompt.split("item ")[1].split(" ")[0])
+        return self.delay * (len(QUESTIONS) - index)
+
+    def _finish(self, prompt: str):
+        with self._lock:
+            self.active -= 1
+        if "item 3" in prompt:
+            raise RuntimeError("model server went away")
+        question = prompt.split("Question: ")[1].split("\n")[0]
+        return SimpleNamespace(content=f"answer to {question}")
+
+    def invoke(self, prompt, **kwargs):
+        time.sleep(self._start(prompt))
+        return self._finish(prompt)
+
+    async def ainvoke(self, prompt, **kwargs):
+        await asyncio.sleep(self._start(prompt))
+        return self._finish(prompt)
+
+
+@pytest.fixture()
+def rag(monkeypatch):
+    monkeypatch.setattr(rag_app, "get_vector_store", lambda **kwargs: StandInVectorStore())
+    app = rag_app.RAGApp()
+    app.llm = StandInLLM()
+    app.setup_complete = True
+    return app
+
+
+def ask_many(rag, mode: str, questions=QUESTIONS, concurrency: int = 3):
+    if mode == "sync":
+        return rag.ask_many(questions, concurrency=concurrency)
+    return asyncio.run(rag.aask_many(questions, concurrency=concurrency))
+
+
+@pytest.fixture(params=["sync", "async"])
+def mode(request):
+    return request.param
+
+
+def test_answers_keep_question_order(rag, mode):
+    items = ask_many(rag, mode)
+    assert [item["question"] for item in items] == QUESTIONS
+    for item in items:
+        if item["error"] is None:
+            assert item["answer"] == f"answer to {item['question']}"
+    # One batched retrieval for the whole request
+    assert rag.vector_store.batches == [QUESTIONS]
+
+
+def test_failing_item_reports_its_own_error(rag, mode):
+    items = ask_many(rag, mode)
+    failed = [item for item in items if item["error"]]
+    assert [item["question"] for item in failed] == [QUESTIONS[3]]
+    assert "model server went away" in failed[0]["error"]
+    assert failed[0]["answer"] is None
+    assert all(item["answer"] for item in items if item is not failed[0])
+
+
+def test_cached_answers_are_flagged(rag, mode):
+    first = ask_many(rag, mode)
+    assert not any(item["cached"] for item in first)
+    calls = rag.llm.calls
+
+    second = ask_many(rag, mode)
+    # Every answered question is served from the cache; the failed one is asked again
+    assert [item["cached"] for item in second] == [i != 3 for i in range(len(QUESTIONS))]
+    assert [item["answer"] for item in second if item["cached"]] == [
+        item["answer"] for item in first if item["error"] is None]
+    assert rag.llm.calls == calls + 1
+    assert rag.vector_store.batches[-1] == [QUESTIONS[3]]
+
+
+@pytest.mark.parametrize("concurrency", [1, 3])
+def test_generation_concurrency_is_bounded(rag, mode, concurrency):
+    ask_many(rag, mode, concurrency=concurrency)
+    assert rag.llm.calls == len(QUESTIONS)
+    assert rag.llm.peak == concurrency
+
+
+def test_not_set_up_fails_every_item(rag, mode):
+    rag.setup_complete = False
+    items = ask_many(rag, mode, questions=QUESTIONS[:2])
+    assert [item["error"] for item in items] == ["RAG system not set up. Call setup() first."] * 2
@@ -0,0 +1,122 @@
+import pytest
+
+import semantic_cache
+from manifest import chunk_point_id, file_sha256
+from semantic_cache import SemanticAnswerCache
+from test_vector_store import PARAGRAPHS, make_store, write
+
+QUESTION = [1.0, 0.0, 0.0]
+# cos 0.99 and 0.8 to QUESTION
+PARAPHRASE = [0.99, 0.141, 0.0]
+OTHER = [0.8, 0.6, 0.0]
+
+
+def test_hit_at_or_above_threshold_and_miss_below():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put(QUESTION, 3, "answer", ["a"])
+
+    assert cache.lookup(QUESTION, 3) == "answer"
+    assert cache.lookup(PARAPHRASE, 3) == "answer"
+    assert cache.lookup(OTHER, 3) is None
+    # Scale does not matter, only direction
+    assert cache.lookup([5.0, 0.0, 0.0], 3) == "answer"
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 1, "max_entries": 512, "hit_rate": 0.75}
+
+
+def test_best_match_wins():
+    cache = SemanticAnswerCache(threshold=0.5)
+    cache.put(OTHER, 3, "other", ["a"])
+    cache.put(PARAPHRASE, 3, "paraphrase", ["b"])
+    assert cache.lookup(QUESTION, 3) == "paraphrase"
+
+
+def test_miss_when_k_differs():
+    cache = SemanticAnswerCache()
+    cache.put(QUESTION, 3, "answer with three chunks", ["a"])
+    assert cache.lookup(QUESTION, 5) is None
+    cache.put(QUESTION, 5, "answer with five chunks", ["a"])
+    assert cache.lookup(QUESTION, 5) == "answer with five chunks"
+    assert cache.lookup(QUESTION, 3) == "answer with three chunks"
+
+
+def test_miss_when_dimensions_differ():
+    cache = SemanticAnswerCache()
+    cache.put(QUESTION, 3, "answer", ["a"])
+    assert cache.lookup([1.0, 0.0], 3) is None
+
+
+def test_invalidate_sources_drops_only_answers_built_from_them():
+    cache = SemanticAnswerCache()
+    cache.put(QUESTION, 3, "from a and b", ["a", "b"])
+    cache.put(OTHER, 3, "from c", ["c"])
+    cache.invalidate_sources(["b"])
+    assert cache.lookup(QUESTION, 3) is None
+    assert cache.lookup(OTHER, 3) == "from c"
+
+
+def test_lru_eviction_past_max_entries():
+    cache = SemanticAnswerCache(threshold=0.99, max_entries=2)
+    first, second, third = [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]
+    cache.put(first, 3, "first", ["a"])
+    cache.put(second, 3, "second", ["b"])
+    # A hit makes first the most recently used, so second is evicted
+    assert cache.lookup(first, 3) == "first"
+    cache.put(third, 3, "third", ["c"])
+
+    assert cache.stats()["size"] == 2
+    assert cache.lookup(second, 3) is None
+    assert cache.lookup(first, 3) == "first"
+    assert cache.lookup(third, 3) == "third"
+    # Evicted entries leave nothing behind in the source index
+    assert set(cache._by_source) == {"a", "c"}
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(semantic_cache.time, "monotonic", lambda: now[0])
+    cache = SemanticAnswerCache(ttl_seconds=60)
+    cache.put(QUESTION, 3, "answer", ["a"])
+    now[0] += 59
+    assert cache.lookup(QUESTION, 3) == "answer"
+    now[0] += 1
+    assert cache.lookup(QUESTION, 3) is None
+    assert cache.stats()["size"] == 0
+
+
+@pytest.fixture()
+def store(tmp_path):
+    store = make_store(tmp_path)
+    yield store
+    store.close()
+
+
+def test_reingesting_a_source_invalidates_answers_through_the_change_listener(tmp_path, store):
+    cache = SemanticAnswerCache()
+    store.add_change_listener(cache.invalidate_sources)
+    path = write(tmp_path / "doc.txt", PARAGRAPHS)
+    store.add_texts_to_collection(path)
+    sources = [chunk_point_id(file_sha256(path), 0)]
+    cache.put(QUESTION, 3, "built from doc.txt", sources)
+    cache.put(OTHER, 3, "built from elsewhere", ["unrelated"])
+
+    # Unchanged file: nothing is rewritten, the answer stays
+    store.add_texts_to_collection(path)
+    assert cache.lookup(QUESTION, 3) == "built from doc.txt"
+
+    # Changed file: its old chunks are deleted, and answers built from them go too
+    write(tmp_path / "doc.txt", ["The refund policy changed last week."])
+    store.add_texts_to_collection(path)
+    assert cache.lookup(QUESTION, 3) is None
+    assert cache.lookup(OTHER, 3) == "built from elsewhere"
+
+
+def test_rewritten_points_invalidate_answers_through_the_change_listener(tmp_path, store):
+    cache = SemanticAnswerCache()
+    store.add_change_listener(cache.invalidate_sources)
+    path = write(tmp_path / "doc.txt", PARAGRAPHS)
+    point_id = chunk_point_id(file_sha256(path), 0)
+    cache.put(QUESTION, 3, "answer", [point_id])
+
+    # A write to a point an answer was built from (e.g. a restored copy) also drops it
+    store.add_files([path], max_workers=1)
+    assert cache.lookup(QUESTION, 3) is None
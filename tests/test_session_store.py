@@ -0,0 +1,116 @@
+import pytest
+
+import session_store
+from session_store import MemorySessionStore, Session, SessionStore, SQLiteSessionStore
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store.time, "monotonic", clock)
+    monkeypatch.setattr(session_store.time, "time", clock)
+    return clock
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+    class Partial(SessionStore):
+        def get(self, session_id):
+            return Session(session_id)
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_history_is_a_ring_buffer():
+    session = Session("s", history_size=3)
+    for i in range(5):
+        session.add_message("user", f"m{i}")
+    assert [m["content"] for m in session.data["history"]] == ["m2", "m3", "m4"]
+    # Reloading a longer history keeps only the newest messages
+    reloaded = Session("s", session.to_dict(), history_size=2)
+    assert [m["content"] for m in reloaded.data["history"]] == ["m3", "m4"]
+
+
+def test_memory_store_returns_same_session_until_ttl(clock):
+    store = MemorySessionStore(ttl_seconds=60)
+    session = store.get("a")
+    session.update_booking("name", "Jane")
+    clock.now += 59
+    assert store.get("a") is session
+    # get() refreshes last use, so the TTL counts from the latest access
+    clock.now += 59
+    assert store.get("a") is session
+    clock.now += 60
+    fresh = store.get("a")
+    assert fresh is not session and fresh.data["booking"]["name"] is None
+
+
+def test_memory_store_evicts_least_recently_used(clock):
+    store = MemorySessionStore(max_sessions=2, ttl_seconds=None)
+    a, b = store.get("a"), store.get("b")
+    store.get("a")
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is a
+    assert store.get("b") is not b
+
+    store.delete("a")
+    assert store.get("a") is not a
+
+
+def test_memory_store_history_size():
+    store = MemorySessionStore(history_size=2)
+    session = store.get("a")
+    for i in range(4):
+        session.add_message("user", str(i))
+    store.save(session)
+    assert [m["content"] for m in store.get("a").data["history"]] == ["2", "3"]
+
+
+def test_sqlite_store_persists_across_instances(tmp_path, clock):
+    path = str(tmp_path / "sessions.sqlite")
+    session = SQLiteSessionStore(path).get("a")
+    session.update_booking("email", "jane@example.com")
+    session.data["booking_active"] = True
+    session.add_message("user", "hi")
+    SQLiteSessionStore(path).save(session)
+
+    loaded = SQLiteSessionStore(path).get("a")
+    assert loaded is not session
+    assert loaded.to_dict() == session.to_dict()
+
+    SQLiteSessionStore(path).delete("a")
+    assert SQLiteSessionStore(path).get("a").to_dict() == Session("a").to_dict()
+
+
+def test_sqlite_store_expires_idle_sessions(tmp_path, clock):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite"), ttl_seconds=60, history_size=5)
+    session = store.get("a")
+    session.add_message("user", "hi")
+    store.save(session)
+    clock.now += 59
+    assert len(store.get("a").data["history"]) == 1
+    clock.now += 1
+    assert len(store.get("a").data["history"]) == 0
+
+
+def test_create_session_store(monkeypatch, tmp_path):
+    monkeypatch.delenv("SESSION_BACKEND", raising=False)
+    assert isinstance(session_store.create_session_store(), MemorySessionStore)
+    monkeypatch.setenv("SESSION_BACKEND", "sqlite")
+    monkeypatch.setenv("SESSION_DB", str(tmp_path / "s.sqlite"))
+    assert isinstance(session_store.create_session_store(), SQLiteSessionStore)
+    monkeypatch.setenv("SESSION_BACKEND", "redis")
+    with pytest.raises(ValueError):
+        session_store.create_session_store()
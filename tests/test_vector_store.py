@@ -0,0 +1,217 @@
+import asyncio
+import random
+import threading
+
+import pytest
+from qdrant_client.http.models import PointStruct
+
+import vectorStore
+from benchmark_support import HashingEmbeddings
+from chunkers import RecursiveChunker
+from embedding_cache import CachedEmbeddings
+from manifest import chunk_point_id, file_sha256
+
+PARAGRAPHS = [
+    "Qdrant stores one vector per chunk together with its payload.",
+    "The booking assistant asks for a name, an email, a phone number and a date.",
+    "Retrieval packs the best chunks into a fixed token budget before generation.",
+    "Near-duplicate chunks are detected with MinHash signatures and skipped.",
+]
+
+
+class FailingEmbeddings(HashingEmbeddings):
+    """Hashed embeddings that raise once `fail_after` documents have been embedded."""
+
+    def __init__(self, fail_after: int, dim: int = 64):
+        super().__init__(dim=dim)
+        self.fail_after = fail_after
+        self.embedded = 0
+
+    def embed_documents(self, texts):
+        if self.embedded + len(texts) > self.fail_after:
+            raise ConnectionError("embedding server went away")
+        self.embedded += len(texts)
+        return super().embed_documents(texts)
+
+
+def make_store(tmp_path, **kwargs) -> vectorStore.QdrantVector:
+    """QdrantVector on the local NumPy backend with hashed embeddings: no Qdrant or Ollama needed."""
+    store = vectorStore.QdrantVector(
+        collection_name="test",
+        embedding_cache_path=None,
+        manifest_path=str(tmp_path / "manifest.json"),
+        backend="numpy",
+        index_path=str(tmp_path / "vectors"),
+        dedup_path=str(tmp_path / "minhash.sqlite"),
+        **kwargs,
+    )
+    store.embedding = CachedEmbeddings(HashingEmbeddings(dim=64), None, model_name="hashing-64", queries=None)
+    assert store.connect_client() is not None
+    return store
+
+
+def write(path, paragraphs) -> str:
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    return str(path)
+
+
+def stored(store, ids) -> set:
+    return {point.id for point in store.client.retrieve(store.collection_name, ids=list(ids), with_payload=False)}
+
+
+def test_copy_under_new_path_keeps_shared_points(tmp_path):
+    store = make_store(tmp_path)
+    original = write(tmp_path / "a.txt", PARAGRAPHS)
+    store.add_texts_to_collection(original)
+    old_hash = file_sha256(original)
+
+    copy = write(tmp_path / "b.txt", PARAGRAPHS)
+    assert store.add_files([copy], max_workers=1) == {copy: 1}
+    assert store.manifest.get("test", copy)["hash"] == old_hash
+
+    # Rewriting the original must not delete the points the copy still relies on
+    write(tmp_path / "a.txt", ["Completely different text about invoices and refunds."])
+    store.add_texts_to_collection(original)
+    assert stored(store, [chunk_point_id(old_hash, 0)])
+
+
+def test_partly_read_file_is_not_recorded(tmp_path):
+    store = make_store(tmp_path)
+    path = tmp_path / "broken.txt"
+    # A full 64 KiB block parses before the invalid UTF-8 further on is reached
+    block = ("\n\n".join(PARAGRAPHS) + "\n") * 300
+    path.write_bytes(block.encode() + b"\xff\xfe broken tail\n")
+    store.add_texts_to_collection(str(path))
+    assert store.manifest.get("test", str(path)) is None
+
+    # Once the file is readable it is ingested, not skipped as unchanged
+    path.write_text(block, encoding="utf-8")
+    store.add_texts_to_collection(str(path))
+    assert store.manifest.get("test", str(path))["chunks"] > 0
+
+
+def test_add_files_raises_on_pipeline_failure(tmp_path):
+    store = make_store(tmp_path)
+    store.embedding.embedding = FailingEmbeddings(fail_after=0)
+    path = write(tmp_path / "a.txt", PARAGRAPHS)
+    with pytest.raises(ConnectionError):
+        store.add_files([path], max_workers=1)
+    assert store.manifest.get("test", path) is None
+
+
+def test_add_files_reports_unreadable_files(tmp_path):
+    store = make_store(tmp_path)
+    good = write(tmp_path / "good.txt", PARAGRAPHS)
+    bad = tmp_path / "bad.txt"
+    bad.write_bytes(b"\xff\xfe not utf-8")
+    missing = str(tmp_path / "missing.txt")
+    errors = {}
+    indexed = store.add_files([good, str(bad), missing], max_workers=2, names={good: "uploads/good.txt"},
+                              errors=errors)
+    assert indexed == {good: 1}
+    assert set(errors) == {str(bad), missing}
+    # Recorded under its name rather than the path it was read from
+    assert store.manifest.get("test", "uploads/good.txt")["chunks"] == 1
+
+
+def test_add_files_reuses_one_forkserver_pool(tmp_path):
+    store = make_store(tmp_path)
+    first = write(tmp_path / "first.txt", ["alpha beta gamma " * 20])
+    second = write(tmp_path / "second.txt", ["delta epsilon zeta " * 20])
+    try:
+        assert store.add_files([first]) == {first: 1}
+        pool = store._parse_pool
+        assert store.add_files([second]) == {second: 1}
+        assert store._parse_pool is pool
+        # Workers are never forked from the multi-threaded server process
+        assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        store.close()
+    assert store._parse_pool is None
+
+
+def test_lexical_index_keeps_writes_made_during_its_build(tmp_path):
+    store = make_store(tmp_path)
+    store.add_texts_to_collection(write(tmp_path / "a.txt", PARAGRAPHS))
+    late = PointStruct(id=chunk_point_id("late", 0), vector=[0.0] * 64,
+                       payload={"page_content": "zebra crossing schedule", "metadata": {}})
+    scroll = store.client.scroll
+
+    def scroll_with_concurrent_write(*args, **kwargs):
+        # A chunk written by an ingest while the index is being built from the collection
+        store._on_written([late])
+        return scroll(*args, **kwargs)
+
+    store.client.scroll = scroll_with_concurrent_write
+    hits = store.find_similar_texts("zebra", k=1, mode="lexical")
+    assert hits[0].metadata["_id"] == late.id
+
+
+def test_async_lexical_search_builds_index_off_the_event_loop(tmp_path):
+    store = make_store(tmp_path)
+    store.add_texts_to_collection(write(tmp_path / "a.txt", PARAGRAPHS))
+    loop_thread = threading.get_ident()
+    build_threads = []
+    scroll = store.client.scroll
+
+    def recording_scroll(*args, **kwargs):
+        build_threads.append(threading.get_ident())
+        return scroll(*args, **kwargs)
+
+    store.client.scroll = recording_scroll
+    hits = asyncio.run(store.afind_similar_texts("MinHash signatures", k=1, mode="lexical"))
+    assert "MinHash" in hits[0].page_content
+    assert build_threads and loop_thread not in build_threads
+
+
+def test_failed_ingest_leaves_no_dedup_originals(tmp_path):
+    rng = random.Random(0)
+    vocabulary = [f"term{i}" for i in range(500)]
+    paragraphs = [" ".join(rng.choice(vocabulary) for _ in range(40)) + "." for _ in range(24)]
+    store = make_store(tmp_path, chunker=RecursiveChunker(chunk_size=300, chunk_overlap=0),
+                       embed_batch_size=4, embed_workers=1)
+    embedding = FailingEmbeddings(fail_after=8)
+    store.embedding.embedding = embedding
+
+    # The embedding server goes away halfway through the first file
+    first = write(tmp_path / "a.txt", paragraphs)
+    store.add_texts_to_collection(first)
+    assert store.manifest.get("test", first) is None
+
+    # A near-copy (its file hash differs) must not be skipped against chunks that were never stored
+    embedding.fail_after = float("inf")
+    second = write(tmp_path / "b.txt", paragraphs + ["A closing line added to the copy."])
+    store.add_texts_to_collection(second)
+    entry = store.manifest.get("test", second)
+    ids = [store.dedup.resolve("test", chunk_point_id(entry["hash"], i)) for i in range(entry["chunks"])]
+    assert len(stored(store, ids)) == len(set(ids))
+
+
+def test_near_duplicate_file_is_skipped_and_restored_when_the_original_goes(tmp_path):
+    rng = random.Random(1)
+    vocabulary = [f"term{i}" for i in range(500)]
+    paragraphs = [" ".join(rng.choice(vocabulary) for _ in range(40)) + "." for _ in range(12)]
+    store = make_store(tmp_path, chunker=RecursiveChunker(chunk_size=300, chunk_overlap=0))
+    original = write(tmp_path / "a.txt", paragraphs)
+    store.add_texts_to_collection(original)
+    original_ids = [chunk_point_id(store.manifest.get("test", original)["hash"], i)
+                    for i in range(store.manifest.get("test", original)["chunks"])]
+
+    copy = write(tmp_path / "b.txt", paragraphs + ["A closing line added to the copy."])
+    assert store.add_files([copy], max_workers=1) == {copy: len(original_ids) + 1}
+    entry = store.manifest.get("test", copy)
+    copy_ids = [chunk_point_id(entry["hash"], i) for i in range(entry["chunks"])]
+
+    # Only the new closing line is stored; the copied chunks resolve to the original's points
+    assert stored(store, copy_ids) == {copy_ids[-1]}
+    assert [store.dedup.resolve("test", pid) for pid in copy_ids[:-1]] == original_ids
+    assert store.client.count("test").count == len(original_ids) + 1
+
+    # Once the original is replaced, its copies are stored under their own IDs
+    write(tmp_path / "a.txt", ["Completely different text about invoices and refunds."])
+    store.add_texts_to_collection(original)
+    assert not stored(store, original_ids)
+    assert stored(store, copy_ids) == set(copy_ids)
+    assert [store.dedup.resolve("test", pid) for pid in copy_ids] == copy_ids
+    hits = store.find_similar_texts(paragraphs[0], k=1)
+    assert hits[0].metadata["source"] == copy
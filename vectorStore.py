@@ -1,11 +1,44 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
 from uuid import uuid4
 
+from langchain_core.documents import Document
 from langchain_ollama import OllamaEmbeddings
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
-from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    Distance,
+    QuantizationSearchParams,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
 
-from document_processor import read_file, split_documents
+from chunkers import Chunker, RecursiveChunker, get_chunker
+from dedup import NearDuplicateIndex
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from ingestion import IngestionPipeline, available_cpus, parse_file
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from manifest import IngestManifest, chunk_point_id, file_sha256
+from metrics import stage
+from numpy_store import AsyncNumpyIndexClient, NumpyIndexClient
+
+
+SEARCH_MODES = ("dense", "lexical", "hybrid")
+BACKENDS = ("qdrant", "numpy", "memory")
+DEFAULT_BACKEND = os.environ.get("VECTOR_BACKEND", "qdrant")
+QUANTIZATION_MODES = ("scalar", "binary")
 
 
 class QdrantVector:
@@ -15,22 +48,104 @@ class QdrantVector:
         collection_name: str = "metacloud",
         embedding_model: str = "llama3.2:3b",
         file_path: str = "NepaliBert.pdf",
+        embedding_cache_path: str | None = ".cache/embeddings.sqlite",
+        embedding_cache_size: int = 100_000,
+        manifest_path: str = ".cache/manifest.json",
+        embed_batch_size: int = 64,
+        embed_workers: int = 4,
+        ingest_queue_size: int = 8,
+        backend: str = "qdrant",
+        index_path: str = ".cache/vectors",
+        quantization: str | None = None,
+        on_disk_vectors: bool = False,
+        rescore: bool = True,
+        oversampling: float = 2.0,
+        dedup_path: str | None = ".cache/minhash.sqlite",
+        dedup_threshold: float = 0.9,
+        chunker: str | Chunker | None = None,
     ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown vector backend '{backend}', expected one of {BACKENDS}")
+        if quantization is not None and quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
         self.qdrant_url = qdrant_url
         self.collection_name = collection_name
-        self.embedding = OllamaEmbeddings(model=embedding_model)
+        # Chunks embedded on a previous run are read back from disk instead of re-embedded,
+        # and repeated queries are answered from the process-wide query cache
+        cache = EmbeddingCache(embedding_cache_path, max_entries=embedding_cache_size) if embedding_cache_path else None
+        self.embedding = CachedEmbeddings(OllamaEmbeddings(model=embedding_model), cache, model_name=embedding_model)
         self.file_path = file_path
+        self.manifest = IngestManifest(manifest_path)
+        # Near-duplicate chunks (boilerplate, lightly edited copies) are dropped before embedding
+        self.dedup = NearDuplicateIndex(dedup_path, threshold=dedup_threshold) if dedup_path else None
+        # How files are cut into chunks: a name from chunkers.CHUNKERS or a configured Chunker
+        self.chunker = get_chunker(chunker)
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.ingest_queue_size = ingest_queue_size
+        self.backend = backend
+        self.index_path = index_path
+        # Quantized vectors stay in RAM for the first pass; with on_disk_vectors the float32
+        # originals live on disk and are only read to rescore the oversampled candidates
+        self.quantization = quantization
+        self.on_disk_vectors = on_disk_vectors
+        self.rescore = rescore
+        self.oversampling = oversampling
         self.client: QdrantClient | None = None
+        self.aclient: AsyncQdrantClient | None = None
+        self._lock = threading.Lock()
+        self._change_listeners: list = []
+        self._lexical: BM25Index | None = None
+        # Writes that arrive while the lexical index is being built, replayed onto it before it is used
+        self._lexical_backlog: list | None = None
+        self._lexical_lock = threading.Lock()
+        # Parse workers outlive a single ingest, so each upload does not pay for starting processes
+        self._parse_pool: ProcessPoolExecutor | None = None
 
     def connect_client(self):
+        if self.client is not None:
+            # Keep the existing client and its HTTP connection pool
+            return self.client
         try:
+            if self.backend == "numpy":
+                # In-process index on local disk: no Qdrant server, no network hop per query
+                self.client = NumpyIndexClient(self.index_path)
+                self.aclient = AsyncNumpyIndexClient(self.client)
+                return self.client
+            if self.backend == "memory":
+                # Qdrant's local mode, held in this process only: for tests and benchmarks
+                self.client = QdrantClient(location=":memory:")
+                self.aclient = AsyncNumpyIndexClient(self.client)
+                return self.client
             self.client = QdrantClient(url=self.qdrant_url)
+            # Used by the async search path; shares nothing with the sync client but the URL
+            self.aclient = AsyncQdrantClient(url=self.qdrant_url)
             return self.client
         except Exception as e:
             print(f"Error occurred while connecting to Qdrant client: {e}")
             self.client = None
             return None
 
+    def close(self):
+        """Stop the parse worker processes; a later ingest starts new ones."""
+        with self._lock:
+            pool, self._parse_pool = self._parse_pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def _parser_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._parse_pool is None:
+                self._parse_pool = _process_pool(available_cpus())
+            return self._parse_pool
+
+    def _drop_parser_pool(self, pool: ProcessPoolExecutor):
+        # A broken pool accepts no more work; the next ingest starts a fresh one
+        with self._lock:
+            if self._parse_pool is pool:
+                self._parse_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
     def _ensure_connected(self):
         if self.client is None:
             raise RuntimeError("Qdrant client is not connected. Call connect_client() first.")
@@ -48,57 +163,593 @@ class QdrantVector:
                 size = self._embedding_dim()
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=size, distance=Distance.COSINE),
+                    vectors_config=VectorParams(size=size, distance=Distance.COSINE, on_disk=self.on_disk_vectors),
+                    quantization_config=self._quantization_config(),
                 )
+                if self.dedup is not None:
+                    # Signatures of a previous incarnation of the collection point at nothing
+                    self.dedup.clear(self.collection_name)
                 print(f"Collection '{self.collection_name}' created with size={size}.")
             else:
                 print("Collection already exists.")
         except Exception as e:
             print(f"Error occurred while creating collection: {e}")
 
-    def add_texts_to_collection(self):
+    def check_collection(self) -> bool:
+        """Whether the server answers and the collection exists; used by the readiness check."""
         try:
             self._ensure_connected()
+            return bool(self.client.collection_exists(self.collection_name))
+        except Exception as e:
+            print(f"Error occurred while checking collection: {e}")
+            return False
 
-            texts = self._get_texts()
-            if not texts:
-                print("No texts to add (empty or failed to read).")
+    def _quantization_config(self):
+        return quantization_config(self.quantization)
+
+    def _search_params(self) -> SearchParams | None:
+        return quantized_search_params(self.quantization, self.rescore, self.oversampling)
+
+    def migrate_storage(self) -> bool:
+        """Apply this instance's quantization and on_disk_vectors settings to an existing collection.
+
+        Qdrant rebuilds the quantized index from the stored vectors in the background,
+        so nothing is re-embedded. With quantization=None, existing quantization is removed.
+        """
+        try:
+            self._ensure_connected()
+            self.client.update_collection(
+                collection_name=self.collection_name,
+                vectors_config={"": VectorParamsDiff(on_disk=self.on_disk_vectors)},
+                quantization_config=self._quantization_config() or Disabled.DISABLED,
+            )
+            print(f"Collection '{self.collection_name}' updated: quantization={self.quantization}, "
+                  f"on_disk_vectors={self.on_disk_vectors}.")
+            return True
+        except Exception as e:
+            print(f"Error occurred while migrating collection storage: {e}")
+            return False
+
+    def add_texts_to_collection(self, file_path: str | None = None):
+        file_path = file_path or self.file_path
+        try:
+            self._ensure_connected()
+
+            file_hash = self._content_key(file_sha256(file_path))
+            if self._is_indexed(file_hash):
+                print(f"'{file_path}' is unchanged since last ingest, skipping.")
+                self._record_copy(file_path, file_hash)
                 return
 
             # Ensure collection exists (idempotent)
             self.create_collection()
 
-            vector_store = QdrantVectorStore(
-                client=self.client,
-                collection_name=self.collection_name,
-                embedding=self.embedding,
-            )
+            # Pages are split and embedded as they are parsed, instead of after the whole file is read.
+            # IDs derive from content, so re-ingesting the same file upserts in place
+            parsed = [0]
+
+            def chunks():
+                for i, text in enumerate(self.chunker.split_file(file_path)):
+                    parsed[0] = i + 1
+                    yield chunk_point_id(file_hash, i), text, {"source": file_path, "chunk": i}
 
-            ids = [str(uuid4()) for _ in texts]
-            vector_store.add_texts(texts=texts, ids=ids)
-            print(f"Added {len(texts)} chunks successfully.")
+            dedup_stats = {}
+            stats = self._ingest_chunks(chunks(), self._previous_chunks(file_path, file_hash), dedup_stats)
+            if not parsed[0]:
+                print("No texts to add (empty or failed to read).")
+                return
+
+            # The manifest counts every chunk index, including skipped duplicates
+            self._record_file(file_path, file_hash, parsed[0])
+            print(f"Added {stats['chunks']} chunks successfully "
+                  f"({stats['chunks_per_sec']:.1f} chunks/s over {stats['seconds']:.1f}s"
+                  f"{self._dedup_summary(dedup_stats)}).")
         except Exception as e:
             print(f"Error occurred while adding texts to collection: {e}")
 
-    def find_similar_texts(self, query: str, k: int = 3):
+    def add_files(
+        self,
+        file_paths: list[str],
+        max_workers: int | None = None,
+        progress: Callable[[dict], None] | None = None,
+        names: dict | None = None,
+        errors: dict | None = None,
+    ) -> dict:
+        """Parse files in a process pool and ingest them through one shared embed/upsert pipeline.
+
+        Files are parsed in the store's long-lived worker processes (stopped by close());
+        max_workers, if given, parses this call's files in a pool of that size instead.
+
+        Returns {file_path: chunk_count} for every file that is now indexed; unreadable files are left out.
+        Each worker returns a whole file's chunks (see parse_file), so memory grows with the
+        largest files being parsed at once, not with the total upload.
+        progress, if given, receives {"files_parsed", "chunks_parsed", "chunks_written"} as work completes.
+        names maps a path to the name it is recorded under in the manifest and chunk metadata,
+        e.g. the original name of an upload saved to a temporary directory.
+        errors, if given, receives {file_path: message} for files that could not be read or parsed.
+        Connection, embedding and upsert failures raise; files of a failed run are not recorded.
+        """
+        names = names or {}
+        errors = errors if errors is not None else {}
+        indexed = {}
+        self._ensure_connected()
+
+        pending = []
+        for path in file_paths:
+            name = names.get(path, path)
+            try:
+                file_hash = self._content_key(file_sha256(path))
+            except OSError as e:
+                print(f"Error reading '{name}': {e}")
+                errors[path] = str(e)
+                continue
+            if self._is_indexed(file_hash):
+                print(f"'{name}' is unchanged since last ingest, skipping.")
+                indexed[path] = self._record_copy(name, file_hash)
+            else:
+                pending.append((path, name, file_hash))
+        if not pending:
+            return indexed
+
+        self.create_collection()
+
+        parsed = []
+        counts = {"files_parsed": len(indexed), "chunks_parsed": 0, "chunks_written": 0}
+        # PDF text extraction is CPU-bound and holds the GIL, so files are parsed in the
+        # store's worker processes while the embed/upsert stage consumes finished ones;
+        # max_workers asks for a pool of that size for this call only
+        pool = _process_pool(min(len(pending), max_workers)) if max_workers else self._parser_pool()
+        futures = {}
         try:
-            self._ensure_connected()
-            vector_store = QdrantVectorStore(
-                client=self.client,
+            futures = {pool.submit(parse_file, path, chunker=self.chunker): (path, name, file_hash)
+                       for path, name, file_hash in pending}
+
+            ignore = set()
+            for _, name, file_hash in pending:
+                ignore.update(self._previous_chunks(name, file_hash))
+
+            def chunks():
+                for future in as_completed(futures):
+                    # Dropping the future frees its chunk list once this file is consumed
+                    path, name, file_hash = futures.pop(future)
+                    try:
+                        texts = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        # One unreadable file does not fail the others
+                        print(f"Error parsing '{name}': {e}")
+                        errors[path] = str(e)
+                        texts = None
+                    counts["files_parsed"] += 1
+                    counts["chunks_parsed"] += len(texts or ())
+                    if progress:
+                        progress(dict(counts))
+                    if texts is None:
+                        continue
+                    parsed.append((path, name, file_hash, len(texts)))
+                    for i, text in enumerate(texts):
+                        yield chunk_point_id(file_hash, i), text, {"source": name, "chunk": i}
+
+            def written(points):
+                self._on_written(points)
+                counts["chunks_written"] += len(points)
+                if progress:
+                    progress(dict(counts))
+
+            dedup_stats = {}
+            stats = self._ingest_chunks(chunks(), ignore, dedup_stats, on_upsert=written)
+        except BrokenProcessPool:
+            if not max_workers:
+                self._drop_parser_pool(pool)
+            raise
+        finally:
+            # Files still queued when the run failed are not parsed for nothing
+            for future in futures:
+                future.cancel()
+            if max_workers:
+                pool.shutdown()
+
+        for path, name, file_hash, count in parsed:
+            if count:
+                self._record_file(name, file_hash, count)
+                indexed[path] = count
+            else:
+                print(f"No texts to add from '{name}' (empty file).")
+                errors[path] = "No text found in file"
+        print(f"Added {stats['chunks']} chunks from {len(parsed)} files "
+              f"({stats['chunks_per_sec']:.1f} chunks/s over {stats['seconds']:.1f}s"
+              f"{self._dedup_summary(dedup_stats)}).")
+        return indexed
+
+    def _content_key(self, file_hash: str) -> str:
+        """What the manifest and point IDs record for a file: its hash, plus the chunker unless it is the default.
+
+        Re-ingesting with another chunker then counts as a change, and its chunks replace the old ones.
+        """
+        if self.chunker.key == RecursiveChunker().key:
+            return file_hash
+        return f"{file_hash}:{self.chunker.key}"
+
+    def _ingest_chunks(self, chunks, ignore, dedup_stats: dict, on_upsert: Callable[[list], None] | None = None) -> dict:
+        """Drop near-duplicates, then embed and upsert the rest through the pipeline.
+
+        A kept chunk only becomes an original for later near-duplicates once its point is
+        written, so a failed run leaves no signatures behind for points that do not exist.
+        """
+        on_upsert = on_upsert or self._on_written
+        if self.dedup is None:
+            return self._pipeline().run(chunks, on_upsert=on_upsert)
+        run = uuid4().hex
+
+        def written(points):
+            self.dedup.confirm(self.collection_name, [point.id for point in points])
+            on_upsert(points)
+
+        try:
+            filtered = self.dedup.filter(self.collection_name, chunks, ignore=ignore, stats=dedup_stats, run=run)
+            return self._pipeline().run(filtered, on_upsert=written)
+        finally:
+            self.dedup.discard(self.collection_name, run)
+
+    def _dedup_summary(self, stats: dict) -> str:
+        return f", {stats['skipped']} near-duplicates skipped" if stats.get("skipped") else ""
+
+    def _previous_chunks(self, file_path: str, file_hash: str) -> list:
+        """Point IDs of the version of file_path this ingest replaces, if it changed.
+
+        Point IDs derive from content, so they are shared by every path with the same hash;
+        they are only stale once no other path in the manifest still has that content.
+        """
+        previous = self.manifest.get(self.collection_name, file_path)
+        if not previous or previous["hash"] == file_hash:
+            return []
+        others = set(self.manifest.paths_with_hash(self.collection_name, previous["hash"]))
+        if others - {os.path.abspath(file_path)}:
+            return []
+        return [chunk_point_id(previous["hash"], i) for i in range(previous["chunks"])]
+
+    def _pipeline(self) -> IngestionPipeline:
+        return IngestionPipeline(
+            self.client,
+            self.collection_name,
+            self.embedding,
+            batch_size=self.embed_batch_size,
+            embed_workers=self.embed_workers,
+            queue_size=self.ingest_queue_size,
+        )
+
+    def add_change_listener(self, listener: Callable[[list], None]):
+        """Call listener(point_ids) whenever points are written or deleted, e.g. to invalidate caches."""
+        self._change_listeners.append(listener)
+
+    def _on_written(self, points: list):
+        # Keep the lexical index in step once it exists; until then it is built from Qdrant on first use
+        self._update_lexical(added=points)
+        self._notify_changed([point.id for point in points])
+
+    def _update_lexical(self, added: list = (), removed: list = ()):
+        with self._lexical_lock:
+            if self._lexical is not None:
+                _apply_lexical(self._lexical, added, removed)
+            elif self._lexical_backlog is not None:
+                self._lexical_backlog.append((added, removed))
+
+    def _notify_changed(self, point_ids: list):
+        for listener in self._change_listeners:
+            try:
+                listener(point_ids)
+            except Exception as e:
+                print(f"Error in change listener: {e}")
+
+    def _record_file(self, file_path: str, file_hash: str, chunks: int):
+        stale = self._previous_chunks(file_path, file_hash)
+        if stale:
+            self.client.delete(collection_name=self.collection_name, points_selector=stale)
+            self._update_lexical(removed=stale)
+            self._notify_changed(stale)
+            print(f"Removed {len(stale)} chunks of the previous version of '{file_path}'.")
+            if self.dedup is not None:
+                self._restore_orphans(self.dedup.remove(self.collection_name, stale), stale)
+        self.manifest.record(self.collection_name, file_path, file_hash, chunks)
+
+    def _record_copy(self, file_path: str, file_hash: str) -> int:
+        """Record file_path for content that is already indexed (e.g. the same file uploaded under
+        another name), so its points stay referenced; returns the chunk count."""
+        chunks = self.manifest.find_hash(self.collection_name, file_hash)["chunks"]
+        current = self.manifest.get(self.collection_name, file_path)
+        if current is None or current["hash"] != file_hash:
+            self._record_file(file_path, file_hash, chunks)
+        return chunks
+
+    def _restore_orphans(self, orphans: list, removed: list):
+        # Chunks of other files that were skipped as copies of a removed chunk now need storing themselves
+        if not orphans:
+            return
+        stats = self._ingest_chunks(iter(orphans), set(removed), {})
+        print(f"Re-checked {len(orphans)} copies of removed chunks, stored {stats['chunks']}.")
+
+    def _is_indexed(self, file_hash: str) -> bool:
+        entry = self.manifest.find_hash(self.collection_name, file_hash)
+        if entry is None or entry["chunks"] == 0:
+            return False
+        # The manifest can outlive the collection (e.g. Qdrant storage wiped), so confirm a point exists
+        first = chunk_point_id(file_hash, 0)
+        if self.dedup is not None:
+            # The first chunk may have been skipped as a copy of another file's chunk
+            first = self.dedup.resolve(self.collection_name, first)
+        try:
+            points = self.client.retrieve(
                 collection_name=self.collection_name,
-                embedding=self.embedding,
+                ids=[first],
+                with_payload=False,
             )
-            results = vector_store.similarity_search(query, k=k)
-            return results
+            return bool(points)
+        except Exception:
+            return False
+
+    def find_similar_texts(self, query: str, k: int = 3, mode: str = "dense"):
+        """Search the collection. mode is "dense" (embedding + Qdrant), "lexical" (local BM25,
+        no embedding call) or "hybrid" (both, fused by reciprocal rank)."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        try:
+            if mode == "lexical":
+                return self._lexical_search(query, k)
+            self._ensure_connected()
+            depth = self._fusion_depth(k) if mode == "hybrid" else k
+            with stage("vector_store", "embed_query"):
+                vector = self.embedding.embed_query(query)
+            with stage("vector_store", "search"):
+                response = self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=vector,
+                    limit=depth,
+                    with_payload=True,
+                    search_params=self._search_params(),
+                )
+            dense = [self._to_document(point) for point in response.points]
+            if mode == "hybrid":
+                return self._fuse(dense, self._lexical_search(query, depth), k)
+            return dense
         except Exception as e:
             print(f"Error occurred while finding similar texts: {e}")
             return None
 
-    def _get_texts(self):
-        text = read_file(self.file_path)
-        if text is None:
-            return []
-        return split_documents(text)
+    async def afind_similar_texts(self, query: str, k: int = 3, mode: str = "dense"):
+        """Async find_similar_texts: embeds and searches without blocking the event loop."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        try:
+            if mode != "dense":
+                await self._alexical_index()
+            if mode == "lexical":
+                return self._lexical_search(query, k)
+            if self.aclient is None:
+                raise RuntimeError("Qdrant client is not connected. Call connect_client() first.")
+            depth = self._fusion_depth(k) if mode == "hybrid" else k
+            with stage("vector_store", "embed_query"):
+                vector = await self.embedding.aembed_query(query)
+            with stage("vector_store", "search"):
+                response = await self.aclient.query_points(
+                    collection_name=self.collection_name,
+                    query=vector,
+                    limit=depth,
+                    with_payload=True,
+                    search_params=self._search_params(),
+                )
+            dense = [self._to_document(point) for point in response.points]
+            if mode == "hybrid":
+                return self._fuse(dense, self._lexical_search(query, depth), k)
+            return dense
+        except Exception as e:
+            print(f"Error occurred while finding similar texts: {e}")
+            return None
+
+    def find_similar_texts_batch(self, queries: list[str], k: int = 3, mode: str = "dense"):
+        """find_similar_texts for many queries: one embedding call and one batched Qdrant search.
+
+        Returns one result list per query, in order.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        try:
+            if mode == "lexical":
+                return [self._lexical_search(query, k) for query in queries]
+            self._ensure_connected()
+            depth = self._fusion_depth(k) if mode == "hybrid" else k
+            with stage("vector_store", "embed_queries"):
+                vectors = self.embedding.embed_queries(queries) if queries else []
+            with stage("vector_store", "search_batch"):
+                responses = self.client.query_batch_points(
+                    collection_name=self.collection_name, requests=self._batch_requests(vectors, depth)
+                ) if vectors else []
+            return self._batch_results(queries, responses, k, mode)
+        except Exception as e:
+            print(f"Error occurred while finding similar texts: {e}")
+            return None
+
+    async def afind_similar_texts_batch(self, queries: list[str], k: int = 3, mode: str = "dense"):
+        """Async find_similar_texts_batch."""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+        try:
+            if mode != "dense":
+                await self._alexical_index()
+            if mode == "lexical":
+                return [self._lexical_search(query, k) for query in queries]
+            if self.aclient is None:
+                raise RuntimeError("Qdrant client is not connected. Call connect_client() first.")
+            depth = self._fusion_depth(k) if mode == "hybrid" else k
+            with stage("vector_store", "embed_queries"):
+                vectors = await self.embedding.aembed_queries(queries) if queries else []
+            with stage("vector_store", "search_batch"):
+                responses = await self.aclient.query_batch_points(
+                    collection_name=self.collection_name, requests=self._batch_requests(vectors, depth)
+                ) if vectors else []
+            return self._batch_results(queries, responses, k, mode)
+        except Exception as e:
+            print(f"Error occurred while finding similar texts: {e}")
+            return None
+
+    def _batch_requests(self, vectors: list, limit: int) -> list:
+        params = self._search_params()
+        return [QueryRequest(query=vector, limit=limit, with_payload=True, params=params) for vector in vectors]
+
+    def _batch_results(self, queries: list, responses: list, k: int, mode: str) -> list:
+        results = []
+        for query, response in zip(queries, responses):
+            dense = [self._to_document(point) for point in response.points]
+            if mode == "hybrid":
+                dense = self._fuse(dense, self._lexical_search(query, self._fusion_depth(k)), k)
+            results.append(dense)
+        return results
+
+    def _lexical_index(self) -> BM25Index:
+        if self._lexical is None:
+            with self._lock:
+                if self._lexical is None:
+                    self._ensure_connected()
+                    with self._lexical_lock:
+                        self._lexical_backlog = []
+                    try:
+                        index = BM25Index()
+                        # Built once from the collection's payloads, then kept current by ingestion
+                        offset = None
+                        while True:
+                            points, offset = self.client.scroll(
+                                collection_name=self.collection_name,
+                                limit=1000,
+                                offset=offset,
+                                with_payload=True,
+                                with_vectors=False,
+                            )
+                            for point in points:
+                                payload = point.payload or {}
+                                index.add(point.id, payload.get("page_content", ""), payload.get("metadata"))
+                            if offset is None:
+                                break
+                        with self._lexical_lock:
+                            # Replaying is safe for points the scroll already saw: add() replaces
+                            for added, removed in self._lexical_backlog:
+                                _apply_lexical(index, added, removed)
+                            self._lexical = index
+                    finally:
+                        with self._lexical_lock:
+                            self._lexical_backlog = None
+                    print(f"Built lexical index over {len(index)} chunks.")
+        return self._lexical
+
+    async def _alexical_index(self) -> BM25Index:
+        # The first build scrolls the whole collection; keep it off the event loop
+        if self._lexical is None:
+            await asyncio.to_thread(self._lexical_index)
+        return self._lexical
+
+    def _lexical_search(self, query: str, k: int) -> list:
+        docs = []
+        with stage("vector_store", "lexical_search"):
+            hits = self._lexical_index().search(query, k=k)
+        for doc_id, score, text, metadata in hits:
+            metadata = dict(metadata or {})
+            metadata["_id"] = doc_id
+            metadata["_collection_name"] = self.collection_name
+            docs.append(Document(page_content=text, metadata=metadata))
+        return docs
+
+    def _fusion_depth(self, k: int) -> int:
+        # Look deeper than k in each ranking so fusion has overlap to work with
+        return max(k * 3, 10)
+
+    def _fuse(self, dense: list, lexical: list, k: int) -> list:
+        by_id = {}
+        for doc in [*lexical, *dense]:
+            by_id[str(doc.metadata.get("_id"))] = doc
+        ranked = reciprocal_rank_fusion(
+            [[str(d.metadata.get("_id")) for d in dense], [str(d.metadata.get("_id")) for d in lexical]], k
+        )
+        return [by_id[doc_id] for doc_id in ranked]
+
+    def _to_document(self, point) -> Document:
+        # Same shape langchain's QdrantVectorStore.similarity_search returns
+        payload = point.payload or {}
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self.collection_name
+        return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+    def query_cache_stats(self) -> dict:
+        return self.embedding.queries.stats() if self.embedding.queries else {}
+
+
+def quantization_config(quantization: str | None):
+    """Qdrant quantization_config for a QUANTIZATION_MODES entry, or None for full precision."""
+    if quantization == "scalar":
+        # int8 per dimension: 4x smaller than float32
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if quantization == "binary":
+        # One bit per dimension: 32x smaller, needs rescoring to keep recall up
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def quantized_search_params(quantization: str | None, rescore: bool = True, oversampling: float = 2.0):
+    if quantization is None:
+        return None
+    return SearchParams(quantization=QuantizationSearchParams(rescore=rescore, oversampling=oversampling))
+
+
+def _apply_lexical(index: BM25Index, added: list, removed: list):
+    for point in added:
+        index.add(point.id, point.payload["page_content"], point.payload.get("metadata"))
+    if removed:
+        index.remove(removed)
+
+
+_shared: dict = {}
+_shared_lock = threading.Lock()
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """A process pool whose workers are started by a fork server (or spawned), never forked from here.
+
+    The server process runs an event loop, job and pipeline threads and SQLite connections;
+    a child forked from it can inherit a lock another thread held and deadlock.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def get_vector_store(
+    qdrant_url: str = "http://localhost:6333",
+    collection_name: str = "metacloud",
+    embedding_model: str = "llama3.2:3b",
+    backend: str | None = None,
+) -> QdrantVector:
+    """Return the process-wide, connected QdrantVector for this configuration, creating it on first use.
+
+    backend defaults to the VECTOR_BACKEND environment variable ("qdrant", "numpy" or "memory").
+    """
+    backend = backend or DEFAULT_BACKEND
+    # Storage options apply when the collection is created; use migrate_storage() for existing ones
+    key = (qdrant_url, collection_name, embedding_model, backend)
+    with _shared_lock:
+        vector = _shared.get(key)
+        if vector is None:
+            vector = QdrantVector(
+                qdrant_url=qdrant_url,
+                collection_name=collection_name,
+                embedding_model=embedding_model,
+                backend=backend,
+                quantization=os.environ.get("VECTOR_QUANTIZATION") or None,
+                chunker=os.environ.get("VECTOR_CHUNKER") or None,
+                on_disk_vectors=os.environ.get("VECTOR_ON_DISK") == "1",
+            )
+            _shared[key] = vector
+        vector.connect_client()
+    return vector
 
 
 if __name__ == "__main__":